@@ -0,0 +1,109 @@
+"""Admission control: capacity pools that bound how much heavy work runs and waits at the same time."""
+from collections import deque
+from typing import Optional
+import math
+import threading
+import time
+
+import metrics
+
+# Retry-After of a full pool that has not finished any work yet to estimate from
+DEFAULT_RETRY_AFTER_SECONDS = 5
+MAX_RETRY_AFTER_SECONDS = 300
+# Run times kept per pool for the Retry-After estimate
+RECENT_RUN_COUNT = 20
+
+class PoolFullError(Exception):
+    """Raised when a pool has no running slot or queue place left for another task."""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"The {pool} pool is at capacity, retry in {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+class CapacityPool:
+    """Up to concurrency tasks run at once and up to queue_size more wait; anything beyond is rejected.
+
+    threads is the CPU thread budget of the whole pool, split evenly between its running tasks.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, threads: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.threads = max(1, threads)
+        self.slots = threading.Semaphore(self.concurrency)
+        self.lock = threading.Lock()
+        # Tasks holding a place, running or waiting
+        self.admitted = 0
+        self.running = 0
+        self.recent_run_seconds = deque(maxlen=RECENT_RUN_COUNT)
+
+    @property
+    def threads_per_task(self) -> int:
+        return max(1, self.threads // self.concurrency)
+
+    def admit(self) -> "Admission":
+        """Reserve a place for one task, raising PoolFullError when running and waiting tasks fill the pool."""
+        with self.lock:
+            if self.admitted >= self.concurrency + self.queue_size:
+                metrics.ADMISSION_REJECTIONS.inc(pool=self.name)
+                raise PoolFullError(self.name, self.get_retry_after())
+            self.admitted += 1
+        return Admission(self)
+
+    def get_retry_after(self) -> int:
+        """Estimate the seconds until a place frees up: the time for one of the running tasks to finish."""
+        if not self.recent_run_seconds:
+            return DEFAULT_RETRY_AFTER_SECONDS
+        average = sum(self.recent_run_seconds) / len(self.recent_run_seconds)
+        return min(max(1, math.ceil(average / self.concurrency)), MAX_RETRY_AFTER_SECONDS)
+
+    def get_status(self) -> dict:
+        with self.lock:
+            return {
+                "concurrency": self.concurrency,
+                "queue_size": self.queue_size,
+                "threads": self.threads,
+                "threads_per_task": self.threads_per_task,
+                "running": self.running,
+                "queued": self.admitted - self.running,
+                "retry_after": self.get_retry_after() if self.admitted >= self.concurrency + self.queue_size else 0
+            }
+
+class Admission:
+    """A place reserved in a pool; entering it waits for a running slot, leaving it gives the place back."""
+
+    def __init__(self, pool: CapacityPool):
+        self.pool = pool
+        self.released = False
+        self.started_at: Optional[float] = None
+        self.admitted_at = time.perf_counter()
+
+    def __enter__(self) -> "Admission":
+        self.pool.slots.acquire()
+        self.started_at = time.perf_counter()
+        metrics.ADMISSION_WAIT_SECONDS.observe(self.started_at - self.admitted_at, pool=self.pool.name)
+        with self.pool.lock:
+            self.pool.running += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        run_seconds = time.perf_counter() - self.started_at
+        with self.pool.lock:
+            self.pool.running -= 1
+            self.pool.recent_run_seconds.append(run_seconds)
+        self.pool.slots.release()
+        self.release()
+
+    def run(self, fn, *args, **kwargs):
+        """Wait for a running slot, call fn and give the place back."""
+        with self:
+            return fn(*args, **kwargs)
+
+    def release(self):
+        """Give the place back; safe to call more than once, and for a task that never ran."""
+        with self.pool.lock:
+            if not self.released:
+                self.released = True
+                self.pool.admitted -= 1
@@ -0,0 +1,238 @@
+"""Replay a mixed editing workload against a running API, to tune the capacity pools for sustained throughput.
+
+Virtual editors loop over uploads, renders, previews and transcriptions in the given mix. A 429 is counted
+as a rejection and the editor waits out its Retry-After, as the frontend would, before its next request:
+
+    uvicorn main:app --port 8000
+    python benchmarks/load.py --url http://localhost:8000 --users 10 --duration 300 --mix upload=1,render=5,preview=3,transcribe=2
+
+Uploads run side by side, and each one queues sidecar builds (proxy, audio, sprite, waveform) that compete
+with renders for the CPU; leave upload out of the mix to measure renders and transcriptions alone.
+
+Renders use a random crop position so they are not served from the render cache. Transcriptions are only
+cached per input and language, so use --inputs to spread them over more distinct uploads.
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import tempfile
+import time
+
+from run import generate_video, percentile, summarize
+
+OPERATIONS = ("upload", "render", "preview", "transcribe")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the API")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual editors")
+    parser.add_argument("--duration", type=float, default=120, help="Seconds to generate load for")
+    parser.add_argument("--mix", default="upload=1,render=5,preview=3,transcribe=2", help=f"Relative weights of {', '.join(OPERATIONS)}")
+    parser.add_argument("--think-time", type=float, default=1, help="Mean seconds an editor pauses between requests")
+    parser.add_argument("--inputs", type=int, default=2, help="Distinct synthetic videos to upload (ignored with --video)")
+    parser.add_argument("--input-duration", type=int, default=30, help="Length of the synthetic videos in seconds")
+    parser.add_argument("--resolution", default="1280x720", help="WIDTHxHEIGHT of the synthetic videos")
+    parser.add_argument("--video", action="append", help="Upload this file instead of synthetic videos (repeatable)")
+    parser.add_argument("--language", default="english", help="Language passed to /transcribe")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, so a workload can be replayed exactly")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    return parser.parse_args()
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for entry in mix.split(","):
+        name, _, weight = entry.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Unknown operation {name!r} in --mix, expected {', '.join(OPERATIONS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+class Stats:
+    """Outcomes and latencies of one kind of operation."""
+
+    def __init__(self):
+        self.latencies = []
+        self.media_seconds = 0.0
+        self.rejected = 0
+        self.failed = 0
+
+    def to_dict(self, elapsed: float) -> dict:
+        attempts = len(self.latencies) + self.rejected + self.failed
+        return {
+            "attempts": attempts,
+            "completed": len(self.latencies),
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "rejection_rate": round(self.rejected / attempts, 3) if attempts else None,
+            "completed_per_minute": round(len(self.latencies) / elapsed * 60, 2),
+            # Media seconds completed per wall second, the number to maximize when tuning
+            "throughput": round(self.media_seconds / elapsed, 3),
+            "latency_ms": summarize(self.latencies) if self.latencies else None
+        }
+
+class Rejected(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+def check_response(response):
+    if response.status_code == 429:
+        raise Rejected(float(response.headers.get("retry-after", 1)))
+    response.raise_for_status()
+
+def probe_duration(path: Path) -> float:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(path)],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip())
+
+async def upload(client, path: Path, duration: float) -> dict:
+    with open(path, "rb") as f:
+        response = await client.post("/api/upload", files={"file": (path.name, f, "video/mp4")})
+    check_response(response)
+    return {"file_id": response.json()["data"]["file_id"], "duration": duration, "path": path}
+
+async def wait_for_job(client, job_id: str) -> dict:
+    while True:
+        job = (await client.get(f"/api/jobs/{job_id}")).json()["data"]
+        if job["status"] in ("completed", "failed", "cancelled"):
+            return job
+        await asyncio.sleep(0.25)
+
+async def run_render(client, video: dict, rng: random.Random, preview: bool, args) -> float:
+    """Queue a render and wait for it, returning the media seconds it produced."""
+    # Editors share the uploads, so their renders must not supersede each other
+    body = {"target_ratio": "9:16", "position": round(rng.uniform(0, 100), 2), "supersede": False}
+    media_seconds = video["duration"]
+    if preview:
+        body.update(preview=True, preview_start=round(rng.uniform(0, max(0, video["duration"] - 5)), 2), preview_duration=5)
+        media_seconds = min(5, video["duration"])
+    response = await client.post(f"/api/videos/{video['file_id']}/process", json=body)
+    check_response(response)
+    job = await wait_for_job(client, response.json()["data"]["job_id"])
+    if job["status"] != "completed":
+        raise RuntimeError(job["error"])
+    return media_seconds
+
+async def run_transcribe(client, video: dict, args) -> float:
+    response = await client.post(f"/api/videos/{video['file_id']}/transcribe", json={"language": args.language})
+    check_response(response)
+    return video["duration"]
+
+async def editor(client, videos: list, weights: dict, stats: dict, deadline: float, rng: random.Random, args):
+    """One virtual editor: pick an operation by weight, run it, think, repeat until the deadline."""
+    names, values = list(weights), list(weights.values())
+    while time.monotonic() < deadline:
+        name = rng.choices(names, values)[0]
+        video = rng.choice(videos)
+        start_time = time.monotonic()
+        pause = rng.expovariate(1 / args.think_time) if args.think_time > 0 else 0
+        try:
+            if name == "upload":
+                # A fresh upload of the same file, so its sidecars are built again
+                media_seconds = (await upload(client, video["path"], video["duration"]))["duration"]
+            elif name == "transcribe":
+                media_seconds = await run_transcribe(client, video, args)
+            else:
+                media_seconds = await run_render(client, video, rng, name == "preview", args)
+            stats[name].latencies.append(time.monotonic() - start_time)
+            stats[name].media_seconds += media_seconds
+        except Rejected as e:
+            stats[name].rejected += 1
+            pause = max(pause, e.retry_after)
+        except Exception as e:
+            stats[name].failed += 1
+            print(f"{name} failed: {e}", flush=True)
+        await asyncio.sleep(min(pause, max(0, deadline - time.monotonic())))
+
+async def sample_capacity(client, samples: list, deadline: float):
+    """Poll the capacity pools once a second for the peak running and queued counts."""
+    while time.monotonic() < deadline:
+        try:
+            samples.append((await client.get("/api/capacity")).json()["data"])
+        except Exception:
+            pass
+        await asyncio.sleep(1)
+
+def summarize_capacity(samples: list) -> dict:
+    summary = {}
+    for pool in (samples[0] if samples else {}):
+        queued = [sample[pool]["queued"] for sample in samples]
+        running = [sample[pool]["running"] for sample in samples]
+        summary[pool] = {
+            "concurrency": samples[0][pool]["concurrency"],
+            "queue_size": samples[0][pool]["queue_size"],
+            "threads": samples[0][pool]["threads"],
+            "mean_running": round(sum(running) / len(running), 2),
+            "peak_queued": max(queued),
+            "p90_queued": round(percentile(queued, 0.9), 1)
+        }
+    return summary
+
+async def run_load(args) -> dict:
+    import httpx
+
+    rng = random.Random(args.seed)
+    weights = parse_mix(args.mix)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+        if args.video:
+            paths = [Path(path) for path in args.video]
+        else:
+            width, height = (int(part) for part in args.resolution.split("x"))
+            input_dir = Path(tempfile.mkdtemp(prefix="video-editor-load-"))
+            paths = []
+            for index in range(args.inputs):
+                path = input_dir / f"load_{index}.mp4"
+                # Distinct durations give each input its own audio, so transcriptions do not share a cache entry
+                generate_video(path, width, height, args.input_duration + index, "h264")
+                paths.append(path)
+
+        videos = await asyncio.gather(*(upload(client, path, probe_duration(path)) for path in paths))
+        print(f"Uploaded {len(videos)} videos, running {args.users} editors for {args.duration:.0f}s", flush=True)
+
+        stats = {name: Stats() for name in weights}
+        samples = []
+        start_time = time.monotonic()
+        deadline = start_time + args.duration
+        await asyncio.gather(
+            sample_capacity(client, samples, deadline),
+            *(editor(client, videos, weights, stats, deadline, random.Random(rng.random()), args) for _ in range(args.users))
+        )
+        # Editors finish the operation in flight after the deadline, so the window includes it
+        elapsed = time.monotonic() - start_time
+
+    operations = {name: stat.to_dict(elapsed) for name, stat in stats.items()}
+    return {
+        "config": vars(args),
+        "elapsed_seconds": round(elapsed, 1),
+        "throughput": round(sum(stat.media_seconds for stat in stats.values()) / elapsed, 3),
+        "operations": operations,
+        "capacity": summarize_capacity(samples)
+    }
+
+def main():
+    args = parse_args()
+    report = asyncio.run(run_load(args))
+
+    print(f"\n{'operation':<12} {'done':>6} {'429':>6} {'failed':>7} {'per min':>9} {'p50 ms':>10} {'p90 ms':>10}")
+    for name, result in report["operations"].items():
+        latency = result["latency_ms"] or {}
+        print(
+            f"{name:<12} {result['completed']:>6} {result['rejected']:>6} {result['failed']:>7} "
+            f"{result['completed_per_minute']:>9} {latency.get('p50', '-'):>10} {latency.get('p90', '-'):>10}"
+        )
+    print(f"\nSustained throughput: {report['throughput']} media seconds per second")
+    for pool, summary in report["capacity"].items():
+        print(f"{pool}: {summary['mean_running']} running on average, peak queue {summary['peak_queued']}/{summary['queue_size']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Benchmark upload, render and transcription through the API, in-process, on synthetic media.
+
+Inputs are generated with ffmpeg's lavfi sources, so runs are reproducible on any machine with ffmpeg.
+Results are written as JSON keyed by scenario, and --compare prints the change against an earlier run:
+
+    python benchmarks/run.py --output before.json
+    git checkout my-branch
+    python benchmarks/run.py --output after.json --compare before.json
+"""
+from pathlib import Path
+from typing import Optional
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+VIDEO_CODECS = {
+    "h264": ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p"],
+    "hevc": ["-c:v", "libx265", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-tag:v", "hvc1"],
+    "mpeg4": ["-c:v", "mpeg4", "-q:v", "5"]
+}
+
+# A voiced tone with a wandering pitch, syllable-rate amplitude modulation and regular pauses,
+# so silence detection and chunking behave roughly as they do on speech
+SPEECH_LIKE_AUDIO = (
+    "aevalsrc="
+    "'0.4*sin(2*PI*(140+30*sin(2*PI*0.7*t))*t)*(0.55+0.45*sin(2*PI*4*t))*gt(sin(2*PI*0.25*t),-0.5)"
+    "+0.01*(random(0)-0.5)'"
+    ":s=48000:d={duration}"
+)
+
+SUBTITLE_STYLES = {
+    "fontSize": 16,
+    "color": "#ffffff",
+    "borderColor": "#000000",
+    "borderSize": 1,
+    "marginV": 20,
+    "alignment": "2",
+    "fontType": "Arial",
+    "verticalPosition": 80,
+    "volume": 100,
+    "textDirection": "ltr"
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", default="640x360,1280x720,1920x1080", help="Comma-separated WIDTHxHEIGHT list")
+    parser.add_argument("--durations", default="10,60", help="Comma-separated input durations in seconds")
+    parser.add_argument("--codecs", default="h264", help=f"Comma-separated source codecs: {', '.join(VIDEO_CODECS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario")
+    parser.add_argument("--target-ratio", default="9:16", help="Aspect ratio the render benchmarks crop to")
+    parser.add_argument("--transcribe", choices=["auto", "on", "off"], default="auto", help="Benchmark /transcribe (auto: if Whisper is installed)")
+    parser.add_argument("--language", default="english", help="Language passed to /transcribe")
+    parser.add_argument("--output", help="Write results to this JSON file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--keep-workdir", action="store_true", help="Keep the temporary working directory")
+    return parser.parse_args()
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize(values: list) -> dict:
+    """Latency percentiles in milliseconds."""
+    return {
+        "min": round(min(values) * 1000, 1),
+        "p50": round(percentile(values, 0.5) * 1000, 1),
+        "p90": round(percentile(values, 0.9) * 1000, 1),
+        "p99": round(percentile(values, 0.99) * 1000, 1),
+        "max": round(max(values) * 1000, 1),
+        "mean": round(sum(values) / len(values) * 1000, 1)
+    }
+
+def get_cpu_seconds() -> float:
+    """CPU time of this process plus every child it has waited for, such as ffmpeg."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def get_peak_rss_mb() -> dict:
+    # ru_maxrss is in KiB on Linux and bytes on macOS; both peaks only ever grow during a run
+    scale = 1 / 1024 / 1024 if sys.platform == "darwin" else 1 / 1024
+    return {
+        "process": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale, 1)
+    }
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def get_ffmpeg_version() -> Optional[str]:
+    try:
+        return subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout.splitlines()[0]
+    except (OSError, IndexError):
+        return None
+
+def generate_video(path: Path, width: int, height: int, duration: int, codec: str):
+    """Render a test pattern with speech-like audio."""
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=30:duration={duration}",
+        "-f", "lavfi", "-i", SPEECH_LIKE_AUDIO.format(duration=duration),
+        *VIDEO_CODECS[codec],
+        "-g", "60",
+        "-c:a", "aac",
+        "-b:a", "128k",
+        "-shortest",
+        str(path)
+    ]
+    subprocess.run(cmd, check=True)
+
+def build_srt(duration: int) -> str:
+    """One two-second cue every three seconds."""
+    def timestamp(seconds: int) -> str:
+        return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d},000"
+
+    return "\n".join(
+        f"{index}\n{timestamp(start)} --> {timestamp(start + 2)}\nBenchmark subtitle line {index}\n"
+        for index, start in enumerate(range(0, duration - 1, 3), 1)
+    )
+
+def clear_caches(main):
+    """Drop cached renders and transcriptions so every run does the full work."""
+    for cache_dir in (main.RENDER_CACHE_DIR, main.TRANSCRIPTION_CACHE_DIR):
+        for path in cache_dir.iterdir():
+            if path.is_file():
+                path.unlink()
+
+async def wait_for_job(client, job_id: str) -> dict:
+    while True:
+        job = (await client.get(f"/api/jobs/{job_id}")).json()["data"]
+        if job["status"] in ("completed", "failed", "cancelled"):
+            return job
+        await asyncio.sleep(0.05)
+
+async def run_scenario(name: str, runs: int, output_seconds: float, action) -> dict:
+    """Run action repeatedly, measuring wall time and CPU time per run."""
+    latencies = []
+    extra = {}
+    cpu_start = get_cpu_seconds()
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        extra = await action() or extra
+        latencies.append(time.perf_counter() - start_time)
+    cpu_seconds = get_cpu_seconds() - cpu_start
+    total_seconds = sum(latencies)
+
+    result = {
+        "scenario": name,
+        "runs": runs,
+        "latency_ms": summarize(latencies),
+        # Media seconds handled per wall-clock second
+        "throughput": round(output_seconds * runs / total_seconds, 3) if total_seconds else None,
+        "cpu_seconds_per_output_second": round(cpu_seconds / (output_seconds * runs), 4) if output_seconds else None,
+        "peak_rss_mb": get_peak_rss_mb(),
+        **extra
+    }
+    print(f"{name}: p50 {result['latency_ms']['p50']} ms, throughput {result['throughput']}x, "
+          f"{result['cpu_seconds_per_output_second']} CPU s per output s", flush=True)
+    return result
+
+async def run_benchmarks(args, main, input_dir: Path) -> list:
+    import httpx
+
+    resolutions = [tuple(int(part) for part in value.split("x")) for value in args.resolutions.split(",")]
+    durations = [int(value) for value in args.durations.split(",")]
+    codecs = args.codecs.split(",")
+    transcribe = args.transcribe == "on" or (args.transcribe == "auto" and importlib.util.find_spec("whisper") is not None)
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for codec in codecs:
+            for width, height in resolutions:
+                for duration in durations:
+                    label = f"{codec}_{width}x{height}_{duration}s"
+                    input_path = input_dir / f"{label}.mp4"
+                    generate_video(input_path, width, height, duration, codec)
+                    payload = input_path.read_bytes()
+                    input_info = {"codec": codec, "width": width, "height": height, "duration": duration, "bytes": len(payload)}
+                    file_ids = []
+                    response_seconds = []
+
+                    async def upload():
+                        response = await client.post("/api/upload", files={"file": (input_path.name, payload, "video/mp4")})
+                        response.raise_for_status()
+                        file_ids.append(response.json()["data"]["file_id"])
+                        # In-process, the client also waits for the ingest sidecars; Server-Timing "total"
+                        # stops when the response starts, which is what a real client waits for
+                        timing = dict(
+                            entry.split(";dur=") for entry in response.headers.get("server-timing", "").split(", ") if ";dur=" in entry
+                        )
+                        if "total" in timing:
+                            response_seconds.append(float(timing["total"]) / 1000)
+
+                    # Latency covers upload plus ingest (probe, PCM, waveform, proxy, sprite)
+                    result = await run_scenario(f"upload_{label}", args.repeat, duration, upload)
+                    if response_seconds:
+                        result["response_latency_ms"] = summarize(response_seconds)
+                    results.append({**result, "input": input_info})
+                    file_id = file_ids[-1]
+
+                    for burn_subtitles in (False, True):
+                        body = {"target_ratio": args.target_ratio, "burn_subtitles": burn_subtitles}
+                        if burn_subtitles:
+                            body["subtitles"] = {"text": build_srt(duration), "styles": SUBTITLE_STYLES}
+
+                        async def render():
+                            clear_caches(main)
+                            response = await client.post(f"/api/videos/{file_id}/process", json=body)
+                            response.raise_for_status()
+                            job = await wait_for_job(client, response.json()["data"]["job_id"])
+                            if job["status"] != "completed":
+                                raise RuntimeError(f"Render failed: {job['error']}")
+                            return {"speed_factor": job["speed_factor"]}
+
+                        name = f"process{'_subtitles' if burn_subtitles else ''}_{label}"
+                        result = await run_scenario(name, args.repeat, duration, render)
+                        results.append({**result, "input": input_info})
+
+                    if transcribe:
+                        async def transcribe_video():
+                            clear_caches(main)
+                            response = await client.post(f"/api/videos/{file_id}/transcribe", json={"language": args.language})
+                            response.raise_for_status()
+
+                        result = await run_scenario(f"transcribe_{label}", args.repeat, duration, transcribe_video)
+                        results.append({**result, "input": input_info})
+
+    return results
+
+def compare(results: list, baseline_path: Path):
+    """Print the latency and CPU change of every scenario also present in the baseline."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {result["scenario"]: result for result in json.load(f)["results"]}
+
+    print(f"\n{'scenario':<48} {'p50 ms':>18} {'CPU s / output s':>22}")
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if not before:
+            continue
+        p50_change = result["latency_ms"]["p50"] / before["latency_ms"]["p50"] - 1 if before["latency_ms"]["p50"] else 0
+        cpu_before, cpu_after = before.get("cpu_seconds_per_output_second"), result.get("cpu_seconds_per_output_second")
+        cpu_change = f"{cpu_after / cpu_before - 1:+.1%}" if cpu_before and cpu_after else "n/a"
+        print(f"{result['scenario']:<48} {result['latency_ms']['p50']:>9} ({p50_change:+.1%}) {cpu_after!s:>12} ({cpu_change})")
+
+def main():
+    args = parse_args()
+    # Resolved before changing into the working directory
+    output_path = Path(args.output).resolve() if args.output else None
+    compare_path = Path(args.compare).resolve() if args.compare else None
+    work_dir = Path(tempfile.mkdtemp(prefix="video-editor-bench-"))
+    input_dir = work_dir / "inputs"
+    input_dir.mkdir()
+
+    # The API keeps its uploads, outputs, caches and registry relative to the working directory
+    os.chdir(work_dir)
+    os.environ.setdefault("MEDIA_REGISTRY_PATH", str(work_dir / "media_registry.db"))
+    sys.path.insert(0, str(BACKEND_DIR))
+    import main as api
+
+    try:
+        started_at = time.time()
+        results = asyncio.run(run_benchmarks(args, api, input_dir))
+    finally:
+        if not args.keep_workdir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    commit = get_commit()
+    report = {
+        "commit": commit,
+        "started_at": started_at,
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "ffmpeg": get_ffmpeg_version()
+        },
+        "config": {
+            "resolutions": args.resolutions,
+            "durations": args.durations,
+            "codecs": args.codecs,
+            "repeat": args.repeat,
+            "target_ratio": args.target_ratio,
+            "render_workers": api.RENDER_WORKERS,
+            "segment_workers": api.SEGMENT_WORKERS,
+            "encoder_profile": api.get_encoder_profile_name()
+        },
+        "results": results
+    }
+
+    output_path = output_path or BACKEND_DIR / "benchmarks" / "results" / f"{commit or int(started_at)}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output_path}")
+
+    if compare_path:
+        compare(results, compare_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Cancellation of render and transcription work, down to the subprocesses it started."""
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+import contextvars
+import functools
+import os
+import signal
+import subprocess
+import threading
+
+import metrics
+
+class Cancelled(Exception):
+    """Raised in a worker when the work it is doing was cancelled."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Cancelled ({reason})")
+        self.reason = reason
+
+def kill_process_tree(process: subprocess.Popen):
+    """Kill a process started by popen together with everything it spawned."""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "posix":
+            # popen starts every process as the leader of its own group
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+    except ProcessLookupError:
+        pass
+
+class CancelToken:
+    """Cancellation state of one job, shared with the threads and subprocesses doing its work."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.reason: Optional[str] = None
+        self.lock = threading.Lock()
+        self.processes = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str) -> bool:
+        """Cancel the work and kill its running subprocesses; returns False if it was already cancelled."""
+        with self.lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+            processes = list(self.processes)
+        metrics.CANCELLATIONS.inc(kind=self.kind, reason=reason)
+        for process in processes:
+            kill_process_tree(process)
+        return True
+
+    def check(self):
+        if self.reason is not None:
+            raise Cancelled(self.reason)
+
+    @contextmanager
+    def track(self, process: subprocess.Popen):
+        """Kill process if the work is cancelled while it runs."""
+        with self.lock:
+            self.processes.add(process)
+            cancelled = self.reason is not None
+        if cancelled:
+            kill_process_tree(process)
+        try:
+            yield process
+        finally:
+            with self.lock:
+                self.processes.discard(process)
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn with this token as the current one, so the work it does can be cancelled."""
+        reset_token = current_token.set(self)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            current_token.reset(reset_token)
+
+# Token of the cancellable work running in this thread, if any
+current_token = contextvars.ContextVar("current_token", default=None)
+
+def check():
+    """Raise Cancelled if the current work was cancelled; does nothing outside cancellable work."""
+    token = current_token.get()
+    if token is not None:
+        token.check()
+
+def bind(fn):
+    """Wrap fn to run with the current token, for work handed to another thread."""
+    token = current_token.get()
+    return fn if token is None else functools.partial(token.run, fn)
+
+@contextmanager
+def popen(cmd: list, **kwargs):
+    """Start a subprocess in its own process group, killed with its children if the current work is cancelled."""
+    check()
+    process = subprocess.Popen(cmd, start_new_session=True, **kwargs)
+    token = current_token.get()
+    try:
+        with token.track(process) if token else nullcontext(process):
+            yield process
+    finally:
+        # An exception in the caller must not leave the process running
+        if process.poll() is None:
+            kill_process_tree(process)
+            process.wait()
+
+def run_process(cmd: list) -> subprocess.CompletedProcess:
+    """Like subprocess.run with captured text output, but raising Cancelled if the current work is cancelled."""
+    with popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as process:
+        stdout, stderr = process.communicate()
+    check()
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
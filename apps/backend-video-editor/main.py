@@ -1,16 +1,41 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Body
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Body, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 import os
 import subprocess
 import uuid
 from pathlib import Path
 import logging
-from typing import Optional
-import whisper
+import json
+import shutil
+import tempfile
+import asyncio
+import hashlib
+import bisect
+import functools
+import threading
+import sqlite3
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Optional, List, Callable
+from multipart.multipart import MultipartParser, parse_options_header
+import transcription
+import metrics
+import admission
+import cancellation
+from subtitles import SubtitleError, parse_srt, validate_srt, parse_hex_color, build_ass, shift_cues, cues_to_srt, cues_to_text
+import numpy as np
 import time
 import re
+import mimetypes
+import anyio
+from email.utils import parsedate_to_datetime
 
 FONTS_DIR_PATH = Path(__file__).parent.parent / "static" / "fonts"
 
@@ -37,15 +62,161 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Retry-After"],
 )
+# Outermost, so request timings include the other middleware
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Create necessary directories
 UPLOAD_DIR = Path("uploads")
 OUTPUT_DIR = Path("outputs")
 TRANSCRIPTS_DIR = Path("transcripts")
+UPLOAD_SESSIONS_DIR = Path("upload_sessions")
+CACHE_DIR = Path("cache")
+RENDER_CACHE_DIR = CACHE_DIR / "renders"
+TRANSCRIPTION_CACHE_DIR = CACHE_DIR / "transcriptions"
+# SQLite database with the paths and probe metadata of every upload
+MEDIA_REGISTRY_PATH = Path(os.getenv("MEDIA_REGISTRY_PATH", "media_registry.db"))
+
+# Chunk size limits for resumable upload sessions
+UPLOAD_SESSION_DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024  # 8 MiB
+UPLOAD_SESSION_MIN_CHUNK_SIZE = 256 * 1024  # 256 KiB
+UPLOAD_SESSION_MAX_CHUNK_SIZE = 64 * 1024 * 1024  # 64 MiB
+
+# Size limit of the render cache; least recently used renders are evicted first
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))
+# Bump when the render pipeline changes so stale cached outputs are not reused
+RENDER_CACHE_VERSION = 3
+# Files are hashed in chunks of this size so memory use stays flat
+HASH_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+# Number of file digests remembered; the least recently used are forgotten first
+FILE_HASH_MEMO_SIZE = 4096
+
+# Size limit of the transcription cache; least recently used results are evicted first
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPTION_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+
+# Storage lifecycle: a background sweep deletes artifacts unused for longer than the TTL of their class
+# (0 keeps them) and, while the managed directories exceed the quota (0 for none), the least recently used ones
+STORAGE_QUOTA_BYTES = int(os.getenv("STORAGE_QUOTA_BYTES", "0"))
+UPLOAD_TTL_SECONDS = float(os.getenv("UPLOAD_TTL_SECONDS", str(7 * 24 * 3600)))
+OUTPUT_TTL_SECONDS = float(os.getenv("OUTPUT_TTL_SECONDS", str(2 * 24 * 3600)))
+PREVIEW_TTL_SECONDS = float(os.getenv("PREVIEW_TTL_SECONDS", str(3600)))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", str(14 * 24 * 3600)))
+UPLOAD_SESSION_TTL_SECONDS = float(os.getenv("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+# Files no registry entry refers to, such as leftovers of a crash, are deleted once this old
+ORPHAN_TTL_SECONDS = 24 * 3600
+# Files used this recently are never evicted to meet the quota, so active editors keep their work
+STORAGE_MIN_IDLE_SECONDS = 15 * 60
+STORAGE_SWEEP_INTERVAL_SECONDS = float(os.getenv("STORAGE_SWEEP_INTERVAL_SECONDS", "300"))
+# Sweeps requested by new uploads and renders run at most this often
+STORAGE_SWEEP_MIN_INTERVAL_SECONDS = 10
+# Last-access times are written to the registry at most this often per file
+ACCESS_TOUCH_INTERVAL_SECONDS = 60
+
+# Whisper consumes 16 kHz mono audio; uploads get a PCM sidecar in this format
+AUDIO_SAMPLE_RATE = 16000
+
+# Parallel transcription: split audio at silences and transcribe chunks in worker processes.
+# Each worker holds its own copy of the Whisper model, so this also bounds memory use.
+TRANSCRIBE_PARALLEL = os.getenv("TRANSCRIBE_PARALLEL", "false").lower() == "true"
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "2"))
+# Transcriptions that may wait before requests get 429, and the CPU threads running ones share;
+# transcription.TRANSCRIBE_CONCURRENCY sets how many run at the same time
+TRANSCRIBE_QUEUE_SIZE = int(os.getenv("TRANSCRIBE_QUEUE_SIZE", "4"))
+TRANSCRIBE_THREADS = int(os.getenv("TRANSCRIBE_THREADS", str(os.cpu_count() or 1)))
+# Target chunk length and how far a split may move from it to land on a silence
+TRANSCRIBE_CHUNK_SECONDS = 120
+TRANSCRIBE_SPLIT_SEARCH_SECONDS = 15
+# Streaming transcription uses shorter chunks so the first subtitles arrive quickly
+STREAM_TRANSCRIBE_CHUNK_SECONDS = 30
+# Energy analysis window and smoothing used to find silences
+VAD_FRAME_SECONDS = 0.03
+VAD_SMOOTHING_SECONDS = 0.5
+
+# Maximum number of ffmpeg renders running at the same time
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+# Renders that may wait for a worker before requests get 429, and the CPU threads running renders
+# share (split into ffmpeg -threads per render)
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", "8"))
+RENDER_THREADS = int(os.getenv("RENDER_THREADS", str(os.cpu_count() or 1)))
+# How long finished render jobs stay available for status and result lookups
+RENDER_JOB_TTL_SECONDS = 60 * 60
+# Long videos are cut at keyframes and the segments encoded in parallel
+SEGMENTED_RENDER_MIN_DURATION = float(os.getenv("SEGMENTED_RENDER_MIN_DURATION", "120"))
+SEGMENT_WORKERS = int(os.getenv("SEGMENT_WORKERS", str(os.cpu_count() or 1)))
+# How far before a trim start to look for the keyframe a stream-copied cut has to start on
+KEYFRAME_SEARCH_SECONDS = 30
+
+# Named encoder profiles, selectable per render request
+ENCODER_PROFILES = {
+    # Cheapest per frame, for checking crop and subtitles before a final render
+    "fast-preview": {
+        "video": ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "30", "-pix_fmt", "yuv420p"],
+        "audio": ["-c:a", "aac", "-b:a", "128k"]
+    },
+    "balanced": {
+        "video": ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p"],
+        "audio": ["-c:a", "aac", "-b:a", "192k"]
+    },
+    # Slowest and smallest for a given quality
+    "archival": {
+        "video": ["-c:v", "libx264", "-preset", "slow", "-crf", "18", "-pix_fmt", "yuv420p"],
+        "audio": ["-c:a", "aac", "-b:a", "256k"]
+    }
+}
+DEFAULT_ENCODER_PROFILE = os.getenv("DEFAULT_ENCODER_PROFILE", "balanced")
+# Source codecs that can be stream-copied into the MP4 output unchanged
+MP4_COPY_VIDEO_CODECS = {"h264", "mpeg4", "av1"}
+MP4_COPY_AUDIO_CODECS = {"aac", "mp3", "alac"}
+
+# Low-resolution proxies built at ingest make preview renders cheap
+PROXY_HEIGHT = int(os.getenv("PROXY_HEIGHT", "360"))
+PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", "2"))
+PREVIEW_QUEUE_SIZE = int(os.getenv("PREVIEW_QUEUE_SIZE", "4"))
+PREVIEW_THREADS = int(os.getenv("PREVIEW_THREADS", str(PREVIEW_WORKERS)))
+PREVIEW_DEFAULT_SECONDS = 5
+PREVIEW_MAX_SECONDS = 30
+
+# Scrubbing visuals built at ingest: a sprite sheet of evenly spaced thumbnails and waveform peaks
+THUMBNAIL_COUNT = int(os.getenv("THUMBNAIL_COUNT", "60"))
+THUMBNAIL_HEIGHT = int(os.getenv("THUMBNAIL_HEIGHT", "90"))
+THUMBNAIL_COLUMNS = 10
+WAVEFORM_PEAKS_PER_SECOND = int(os.getenv("WAVEFORM_PEAKS_PER_SECOND", "100"))
+# Peaks /waveform merges down to when no bucket count is asked for, about one per pixel of a wide timeline
+WAVEFORM_DEFAULT_BUCKETS = 2000
+
+# Sidecar builds (proxy, PCM, sprite, peaks) running at the same time, how many uploads may wait for one
+# (the sidecars of the rest are built on first use), and the CPU threads running builds share
+SIDECAR_WORKERS = int(os.getenv("SIDECAR_WORKERS", "1"))
+SIDECAR_QUEUE_SIZE = int(os.getenv("SIDECAR_QUEUE_SIZE", "16"))
+SIDECAR_THREADS = int(os.getenv("SIDECAR_THREADS", str(max(1, (os.cpu_count() or 1) // 2))))
+
+# Most deliverables one batch render may produce from a single decode
+BATCH_MAX_OUTPUTS = 8
+
+# Target HLS segment length; segments can only start on keyframes, so actual lengths vary
+HLS_SEGMENT_SECONDS = 6
+
+# Content types of the files the API serves, where mimetypes has no or a wrong entry
+MEDIA_TYPES = {
+    ".mp4": "video/mp4",
+    ".m4s": "video/iso.segment",
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".srt": "application/x-subrip; charset=utf-8",
+    ".ass": "text/x-ssa; charset=utf-8",
+    ".txt": "text/plain; charset=utf-8"
+}
+
+# How often job event streams check for new progress
+JOB_EVENTS_INTERVAL_SECONDS = 0.5
+# A render is cancelled when its last event stream closes and no client reconnects within this many seconds
+# (0 keeps abandoned renders running)
+RENDER_ABANDON_GRACE_SECONDS = float(os.getenv("RENDER_ABANDON_GRACE_SECONDS", "10"))
+# How often a transcription request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 1
 
 # Create directories with proper permissions
-for directory in [UPLOAD_DIR, OUTPUT_DIR, TRANSCRIPTS_DIR]:
+for directory in [UPLOAD_DIR, OUTPUT_DIR, TRANSCRIPTS_DIR, UPLOAD_SESSIONS_DIR, CACHE_DIR, RENDER_CACHE_DIR, TRANSCRIPTION_CACHE_DIR]:
     try:
         directory.mkdir(exist_ok=True)
         # Ensure directory is writable
@@ -62,15 +233,6 @@ for directory in [UPLOAD_DIR, OUTPUT_DIR, TRANSCRIPTS_DIR]:
             }
         )
 
-# Initialize Whisper model
-whisper_model = None
-
-def get_whisper_model():
-    global whisper_model
-    if whisper_model is None:
-        whisper_model = whisper.load_model("medium")
-    return whisper_model
-
 def format_timestamp(seconds):
     """Convert seconds to SRT timestamp format."""
     hours = int(seconds // 3600)
@@ -79,6 +241,13 @@ def format_timestamp(seconds):
     millis = int((seconds - int(seconds)) * 1000)
     return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
 
+def segments_to_srt(segments) -> str:
+    """Render transcription segments as SRT text."""
+    return "\n".join(
+        f"{i + 1}\n{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}\n{segment['text'].strip()}\n"
+        for i, segment in enumerate(segments)
+    )
+
 def create_srt_file(segments, output_path):
     """Create SRT file from transcription segments."""
     with open(output_path, 'w', encoding='utf-8') as f:
@@ -97,35 +266,36 @@ def create_txt_file(segments, output_path):
             f.write(f"{segment['text'].strip()}\n")
     return output_path
 
-def transcribe_audio(input_path: str, language: Optional[str] = None):
-    """Transcribe audio using Whisper."""
-    model = get_whisper_model()
-    
-    # Set language options
-    if language == "hebrew":
-        language = "he"
-    elif language == "english":
-        language = "en"
-    
-    # Transcribe audio
-    options = {"language": language} if language else {}
-    result = model.transcribe(input_path, **options)
-    
+def transcribe_audio(audio, language: Optional[str] = None, initial_prompt: Optional[str] = None, backend: Optional[str] = None):
+    """Transcribe audio using Whisper, from a media path, a PCM sidecar range or a 16 kHz mono float32 array."""
+    # Model choice, loading, hosting and the inference backend are handled by the transcription module
+    result = transcription.transcribe(audio, language, initial_prompt, backend)
+    metrics.record_transcription(result["metrics"])
     return result
 
-def get_video_dimensions(file_path: str) -> tuple:
-    """Get video dimensions using ffprobe."""
+def parse_frame_rate(rate: Optional[str]) -> Optional[float]:
+    """Convert an ffprobe frame rate such as "30000/1001" to frames per second."""
+    try:
+        numerator, _, denominator = (rate or "").partition("/")
+        fps = float(numerator) / float(denominator or 1)
+        return round(fps, 3) if fps > 0 else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def probe_video(file_path: str) -> dict:
+    """Read dimensions, duration, frame rate, codecs and rotation of a video with a single ffprobe run."""
     cmd = [
         "ffprobe",
         "-v", "error",
-        "-select_streams", "v:0",
-        "-show_entries", "stream=width,height",
-        "-of", "csv=s=x:p=0",
+        "-show_streams",
+        "-show_format",
+        "-of", "json",
         file_path
     ]
     
     logger.info(f"Running ffprobe command: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    with metrics.timed("ffprobe"):
+        result = subprocess.run(cmd, capture_output=True, text=True)
     
     if result.returncode != 0:
         logger.error(f"ffprobe error output: {result.stderr}")
@@ -136,21 +306,329 @@ def get_video_dimensions(file_path: str) -> tuple:
                 "error": result.stderr
             }
         )
-    
-    try:
-        width, height = map(int, result.stdout.strip().split('x'))
-        logger.info(f"Video dimensions: {width}x{height}")
-        return width, height
-    except ValueError as e:
-        logger.error(f"Error parsing dimensions: {result.stdout}")
+
+    probe = json.loads(result.stdout or "{}")
+    streams = probe.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if not video or not video.get("width") or not video.get("height"):
+        logger.error(f"No video stream found: {result.stdout}")
         raise HTTPException(
             status_code=400,
             detail={
                 "message": "Invalid video dimensions format",
-                "error": str(e)
+                "error": "No video stream found"
+            }
+        )
+
+    # Phones store portrait video as landscape frames plus a rotation to apply on display
+    rotation = 0
+    if video.get("tags", {}).get("rotate"):
+        rotation = int(float(video["tags"]["rotate"])) % 360
+    for side_data in video.get("side_data_list", []):
+        if "rotation" in side_data:
+            rotation = -int(float(side_data["rotation"])) % 360
+
+    try:
+        duration = float(probe.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        duration = None
+
+    metadata = {
+        "width": int(video["width"]),
+        "height": int(video["height"]),
+        "duration": duration,
+        "fps": parse_frame_rate(video.get("avg_frame_rate")) or parse_frame_rate(video.get("r_frame_rate")),
+        "video_codec": video.get("codec_name"),
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "rotation": rotation
+    }
+    logger.info(f"Video metadata: {metadata}")
+    return metadata
+
+def get_display_dimensions(metadata: dict) -> tuple:
+    """Get the width and height of a video as ffmpeg presents it to filters, after applying rotation."""
+    if metadata["rotation"] in (90, 270):
+        return metadata["height"], metadata["width"]
+    return metadata["width"], metadata["height"]
+
+# Media registry
+
+# One row per file_id, so endpoints never have to scan the upload directories
+registry_lock = threading.Lock()
+registry_db = sqlite3.connect(MEDIA_REGISTRY_PATH, check_same_thread=False)
+registry_db.row_factory = sqlite3.Row
+registry_db.execute("PRAGMA journal_mode=WAL")
+registry_db.execute("""
+    CREATE TABLE IF NOT EXISTS media (
+        file_id TEXT PRIMARY KEY,
+        input_path TEXT NOT NULL,
+        original_filename TEXT,
+        size INTEGER,
+        sha256 TEXT,
+        width INTEGER,
+        height INTEGER,
+        duration REAL,
+        fps REAL,
+        video_codec TEXT,
+        audio_codec TEXT,
+        rotation INTEGER,
+        output_path TEXT,
+        transcript_files TEXT,
+        preview_path TEXT,
+        batch_output_paths TEXT,
+        hls_path TEXT,
+        created_at REAL,
+        last_accessed_at REAL
+    )
+""")
+# Registries created before a column existed get it added
+registry_columns = {row["name"] for row in registry_db.execute("PRAGMA table_info(media)")}
+for column, column_type in (("preview_path", "TEXT"), ("batch_output_paths", "TEXT"), ("hls_path", "TEXT"), ("last_accessed_at", "REAL")):
+    if column not in registry_columns:
+        registry_db.execute(f"ALTER TABLE media ADD COLUMN {column} {column_type}")
+registry_db.commit()
+# file_id -> when its last access was written to the registry, so busy files are not written on every request
+media_touches = {}
+
+def register_media(file_id: str, input_path: Path, original_filename: str, metadata: dict, file_hash: Optional[str] = None):
+    """Record a newly ingested file and its probe metadata."""
+    with registry_lock:
+        registry_db.execute(
+            """
+            INSERT OR REPLACE INTO media (
+                file_id, input_path, original_filename, size, sha256, width, height, duration,
+                fps, video_codec, audio_codec, rotation, output_path, transcript_files, created_at, last_accessed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, '{}', ?, ?)
+            """,
+            (
+                file_id, str(input_path), original_filename, input_path.stat().st_size, file_hash,
+                metadata["width"], metadata["height"], metadata["duration"], metadata["fps"],
+                metadata["video_codec"], metadata["audio_codec"], metadata["rotation"], time.time(), time.time()
+            )
+        )
+        registry_db.commit()
+
+def get_media(file_id: str) -> Optional[dict]:
+    """Look up a file_id in the registry, registering uploads that predate it on first access."""
+    with registry_lock:
+        row = registry_db.execute("SELECT * FROM media WHERE file_id = ?", (file_id,)).fetchone()
+
+    if row is None:
+        # Uploads from before the registry existed are found by one directory scan and then registered
+        legacy_files = [path for path in UPLOAD_DIR.glob(f"{file_id}_*") if path.is_file()]
+        if not legacy_files:
+            return None
+        input_path = legacy_files[0]
+        register_media(file_id, input_path, input_path.name[len(file_id) + 1:], probe_video(str(input_path)))
+        return get_media(file_id)
+
+    media = parse_media_row(row)
+    if not media["input_path"].exists():
+        logger.warning(f"Registered input of {file_id} is missing: {media['input_path']}")
+        return None
+    if media["sha256"]:
+        remember_file_hash(media["input_path"], media["sha256"])
+    touch_media(file_id)
+    return media
+
+def parse_media_row(row: sqlite3.Row) -> dict:
+    media = dict(row)
+    media["input_path"] = Path(media["input_path"])
+    media["transcript_files"] = json.loads(media["transcript_files"] or "{}")
+    media["batch_output_paths"] = json.loads(media["batch_output_paths"] or "[]")
+    return media
+
+def list_media() -> list:
+    """Return every registry entry, without checking its files or counting as an access."""
+    with registry_lock:
+        rows = registry_db.execute("SELECT * FROM media").fetchall()
+    return [parse_media_row(row) for row in rows]
+
+def touch_media(file_id: str):
+    """Record that a file_id was used, writing to the registry at most once per ACCESS_TOUCH_INTERVAL_SECONDS."""
+    now = time.time()
+    if now - media_touches.get(file_id, 0) < ACCESS_TOUCH_INTERVAL_SECONDS:
+        return
+    media_touches[file_id] = now
+    with registry_lock:
+        registry_db.execute("UPDATE media SET last_accessed_at = ? WHERE file_id = ?", (now, file_id))
+        registry_db.commit()
+
+def get_media_or_404(file_id: str) -> dict:
+    """Look up a file_id in the registry, raising 404 if there is no input file for it."""
+    media = get_media(file_id)
+    if media is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "message": "File not found",
+                "error": f"No input file found for ID: {file_id}"
+            }
+        )
+    return media
+
+def update_media(file_id: str, **values):
+    """Record the latest rendered output, transcript files or preview of a file_id."""
+    for column in ("transcript_files", "batch_output_paths"):
+        if column in values:
+            values[column] = json.dumps(values[column])
+    assignments = ", ".join(f"{column} = ?" for column in values)
+    with registry_lock:
+        registry_db.execute(
+            f"UPDATE media SET {assignments} WHERE file_id = ?",
+            (*(str(value) if isinstance(value, Path) else value for value in values.values()), file_id)
+        )
+        registry_db.commit()
+
+def delete_media(file_id: Optional[str] = None):
+    """Remove a file_id from the registry, or every entry if no file_id is given."""
+    with registry_lock:
+        if file_id is None:
+            registry_db.execute("DELETE FROM media")
+            media_touches.clear()
+        else:
+            registry_db.execute("DELETE FROM media WHERE file_id = ?", (file_id,))
+            media_touches.pop(file_id, None)
+        registry_db.commit()
+
+async def save_multipart_upload(request: Request, field_name: str, get_destination: Callable[[str], Path]) -> tuple:
+    """Stream one file field of a multipart body straight from the socket to disk, returning its filename, size and SHA-256.
+
+    get_destination maps the client's filename to the path to write, so the body is written once and never spooled.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid upload",
+                "error": "Expected a multipart/form-data body"
+            }
+        )
+
+    part = {"headers": {}, "field": b"", "value": b"", "file": None}
+    upload = {"file": None, "filename": None, "size": 0}
+    digest = hashlib.sha256()
+    start_time = time.perf_counter()
+
+    def on_part_begin():
+        part.update(headers={}, field=b"", value=b"", file=None)
+
+    def on_header_field(data: bytes, start: int, end: int):
+        part["field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["field"].lower()] = part["value"]
+        part["field"], part["value"] = b"", b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        if options.get(b"name") == field_name.encode() and b"filename" in options and upload["file"] is None:
+            upload["filename"] = options[b"filename"].decode("utf-8", "replace")
+            upload["file"] = part["file"] = open(get_destination(upload["filename"]), "wb")
+
+    def on_part_data(data: bytes, start: int, end: int):
+        # Other form fields are skipped rather than buffered
+        if part["file"] is not None:
+            part["file"].write(data[start:end])
+            digest.update(data[start:end])
+            upload["size"] += end - start
+
+    def on_part_end():
+        part["file"] = None
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    finally:
+        if upload["file"] is not None:
+            upload["file"].close()
+
+    if upload["file"] is None:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid upload",
+                "error": f"The request has no '{field_name}' file field"
+            }
+        )
+    metrics.record_upload(upload["size"], time.perf_counter() - start_time)
+    return upload["filename"], upload["size"], digest.hexdigest()
+
+def finalize_upload(file_id: str, temp_path: Path, input_path: Path, original_filename: str, file_hash: Optional[str] = None) -> dict:
+    """Validate a fully written upload in place, atomically move it to its final path and register it."""
+    # Check if it's a video file by probing it, rather than relying on content type
+    # Some video files might come as application/octet-stream
+    try:
+        metadata = probe_video(str(temp_path))
+        logger.info(f"Valid video file detected: {metadata['width']}x{metadata['height']}")
+    except Exception as e:
+        logger.error(f"Invalid video file: {str(e)}")
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid video file",
+                "error": "File must be a valid video format",
+                "technical_details": str(e)
+            }
+        )
+
+    # Same filesystem, so this is an atomic rename rather than a copy
+    os.replace(temp_path, input_path)
+    logger.info(f"File saved successfully: {input_path}")
+    if file_hash:
+        remember_file_hash(input_path, file_hash)
+    register_media(file_id, input_path, original_filename, metadata, file_hash)
+    request_storage_sweep()
+    return metadata
+
+def get_upload_session(upload_id: str) -> tuple:
+    """Load the manifest of a resumable upload session."""
+    try:
+        # Session IDs are UUIDs; anything else must not be turned into a path
+        session_dir = UPLOAD_SESSIONS_DIR / str(uuid.UUID(upload_id))
+    except ValueError:
+        session_dir = None
+
+    manifest_path = session_dir / "manifest.json" if session_dir else None
+    if manifest_path is None or not manifest_path.exists():
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "message": "Upload session not found",
+                "error": f"No upload session found for ID: {upload_id}"
             }
         )
 
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    return session_dir, manifest
+
+def get_missing_chunks(session_dir: Path, manifest: dict) -> list:
+    """Return the indexes of chunks that have not been fully received yet."""
+    # Each completed chunk leaves an empty chunk_<index> marker next to the data file
+    received = {
+        int(name.split("_", 1)[1])
+        for name in os.listdir(session_dir)
+        if name.startswith("chunk_")
+    }
+    return [index for index in range(manifest["total_chunks"]) if index not in received]
+
 class SubtitleStyles(BaseModel):
     fontSize: int
     color: str
@@ -174,183 +652,188 @@ class ProcessVideoRequest(BaseModel):
     language: Optional[str] = None
     burn_subtitles: bool = False
     subtitles: Optional[SubtitlesData] = None
+    # Encode keyframe-aligned segments in parallel; by default only for long videos
+    segmented: Optional[bool] = None
+    # Encoder profile name from ENCODER_PROFILES; defaults to DEFAULT_ENCODER_PROFILE
+    profile: Optional[str] = None
+    # Render only a short window of the low-resolution proxy, to check settings quickly
+    preview: bool = False
+    preview_start: float = 0
+    preview_duration: float = PREVIEW_DEFAULT_SECONDS
+    # Also package the output as an HLS playlist with fMP4 segments for in-browser playback
+    hls: bool = False
+    # Keep only this part of the source, in seconds; trim_end defaults to the end of the video
+    trim_start: float = 0
+    trim_end: Optional[float] = None
+    # Without filters the video is stream-copied, which can only cut on keyframes: move trim_start
+    # back to the previous keyframe instead of re-encoding when it does not land on one
+    snap_to_keyframes: bool = False
+    # Cancel the render (or preview) of this video that is still in flight, as its output is outdated
+    supersede: bool = True
+
+class BatchProcessRequest(BaseModel):
+    # Each output is rendered as if it were its own /process request
+    outputs: List[ProcessVideoRequest]
+    supersede: bool = True
 
 class TranscribeRequest(BaseModel):
     language: str
+    # Split the audio and transcribe chunks in parallel; defaults to TRANSCRIBE_PARALLEL
+    parallel: Optional[bool] = None
+    # Inference backend, e.g. "whisper-int8" on CPU-only nodes; defaults to TRANSCRIPTION_BACKEND
+    backend: Optional[str] = None
 
-def create_custom_srt_file(text: str, output_path: Path) -> Path:
-    """Create SRT file from custom subtitle text with proper RTL formatting."""
-    # Split text into lines and process each subtitle entry
-    lines = text.split('\n')
-    subtitle_entries = []
-    current_entry = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            if current_entry:
-                subtitle_entries.append(current_entry)
-                current_entry = []
-        elif line.isdigit() and len(current_entry) == 0:
-            # This is a subtitle number
-            current_entry.append(line)
-        elif ' --> ' in line:
-            # This is a timestamp line
-            if len(current_entry) == 1:  # We have the subtitle number
-                current_entry.append(line)
-            else:
-                # If we somehow get a timestamp without a number, start a new entry
-                if current_entry:
-                    subtitle_entries.append(current_entry)
-                current_entry = [str(len(subtitle_entries) + 1), line]
-        else:
-            # This is a text line - process it for RTL
-            if len(current_entry) >= 2:  # We have number and timestamp
-                # Add RTL control characters to the text
-                rtl_mark = "‏"
-                isolate_start = "⁧"
-                isolate_end = "⁩"
-                processed_text = f"{rtl_mark}{isolate_start}{line.strip()}{isolate_end}"
-                current_entry.append(processed_text)
-            else:
-                # If we somehow get text without number and timestamp, skip it
-                continue
-    
-    # Add the last entry if exists
-    if current_entry:
-        subtitle_entries.append(current_entry)
-    
-    # Write the SRT file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        for entry in subtitle_entries:
-            if len(entry) >= 3:  # Ensure we have number, timestamp, and text
-                f.write(f"{entry[0]}\n")  # Subtitle number
-                f.write(f"{entry[1]}\n")  # Timestamp
-                f.write(f"{entry[2]}\n")  # Text with RTL formatting
-                if len(entry) > 3:  # Additional text lines
-                    for text_line in entry[3:]:
-                        f.write(f"{text_line}\n")
-                f.write("\n")
-    
-    return output_path
+class PreloadModelsRequest(BaseModel):
+    # API languages whose Whisper models to load; "auto" is the model used when no language is set
+    languages: List[str] = ["auto"]
+    warm_up: bool = True
+    backend: Optional[str] = None
 
-def create_custom_ass_file(srt_path: Path, styles: SubtitleStyles, output_path: Path) -> Path:
-    """Convert SRT to ASS with custom styles."""
-    # First, convert SRT to basic ASS
-    convert_cmd = [
+class CreateUploadSessionRequest(BaseModel):
+    filename: str
+    total_size: int
+    chunk_size: int = UPLOAD_SESSION_DEFAULT_CHUNK_SIZE
+
+def get_encoder_profile_name(profile: Optional[str] = None) -> str:
+    """Resolve a requested encoder profile name, falling back to the configured default."""
+    return profile or DEFAULT_ENCODER_PROFILE
+
+def build_ffmpeg_command(input_path: str, output_path: str, video_filter: Optional[str], volume_factor: Optional[float], profile: dict, start: float = 0, end: Optional[float] = None, threads: Optional[int] = None) -> list:
+    """Build FFmpeg command with proper encoding settings; a stream without a filter is copied as is."""
+    filter_complex = []
+    if video_filter is not None:
+        filter_complex.append(f"[0:v]{video_filter}[v]")
+    if volume_factor is not None:
+        filter_complex.append(f"[0:a]volume={volume_factor}[a]")
+
+    cmd = [
         "ffmpeg",
         "-y",
-        "-i", str(srt_path),
-        str(output_path)
+        # Machine-readable key=value progress on stdout, human-readable stats off
+        "-progress", "pipe:1",
+        "-nostats",
+        # Input-side seek, so only the requested window is decoded
+        *(["-ss", f"{start:.6f}"] if start > 0 else []),
+        *(["-t", f"{end - start:.6f}"] if end is not None else []),
+        "-i", input_path
     ]
-    subprocess.run(convert_cmd, check=True, capture_output=True)
-    
-    # Read the ASS file
-    with open(output_path, 'r', encoding='utf-8') as f:
-        ass_content = f.readlines()
-    
-    # Find the Style section and modify it
-    style_line_index = -1
-    for i, line in enumerate(ass_content):
-        if line.startswith('Style: Default'):
-            style_line_index = i
-            break
-    
-    if style_line_index >= 0:
-        # Convert hex color to ASS format (AABBGGRR)
-        font_color = styles.color.lstrip('#')
-        border_color = styles.borderColor.lstrip('#')
-        
-        # Convert RGB to ASS color format (AABBGGRR)
-        def rgb_to_ass_color(hex_color: str) -> str:
-            r = int(hex_color[0:2], 16)
-            g = int(hex_color[2:4], 16)
-            b = int(hex_color[4:6], 16)
-            return f"&H00{b:02X}{g:02X}{r:02X}&"  # ASS uses BGR, we add 00 for alpha
-        
-        ass_font_color = rgb_to_ass_color(font_color)
-        ass_border_color = rgb_to_ass_color(border_color)
-        
-        # Use the provided margin_v and alignment values
-        margin_v = styles.marginV
-        alignment = styles.alignment
-        
-        # Create new style line with custom properties
-        # Format: Name, Font, Size, Primary, Secondary, Outline, Back, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-        new_style = f"Style: Default,Arial,{styles.fontSize},{ass_font_color},&H000000FF&,{ass_border_color},&H00000000&,0,0,0,0,100,100,0,0,1,{styles.borderSize},0,{alignment},10,10,{margin_v},1\n"
-        
-        ass_content[style_line_index] = new_style
-        
-        # Process RTL text if needed
-        if styles.textDirection == "rtl":
-            for i, line in enumerate(ass_content):
-                if line.startswith("Dialogue:"):
-                    # Split the dialogue line into parts
-                    parts = line.split(",", 9)  # Split into 10 parts (Dialogue: + 9 style parameters)
-                    if len(parts) == 10:
-                        # Process the text part (last part)
-                        text = parts[9].strip()
-                        processed_text = process_rtl_text(text)
-                        parts[9] = processed_text
-                        ass_content[i] = ",".join(parts)
-        
-        # Write modified content back to file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.writelines(ass_content)
-    
-    return output_path
-
-def process_rtl_text(text: str) -> str:
-    """Process text to handle RTL (Hebrew) text properly with correct punctuation positioning."""
-    if not text:
-        return text
-
-    rtl_mark = "‏"  # RTL mark
-    isolate_start = "⁧"  # RTL isolate start
-    isolate_end = "⁩"  # RTL isolate end
-
-    lines = text.splitlines()
-    processed_lines = []
-    for line in lines:
-        stripped = line.strip()
-        if not stripped:
-            processed_lines.append("")
-            continue
-
-        # Move punctuation to the end of the line
-        match = re.match(r"^([!?.,]+)(.+)", stripped)
-        if match:
-            stripped = match.group(2).strip() + match.group(1)
+    if filter_complex:
+        cmd += ["-filter_complex", ";".join(filter_complex)]
+    if video_filter is not None:
+        cmd += ["-map", "[v]", *profile["video"]]
+    else:
+        cmd += ["-map", "0:v:0", "-c:v", "copy"]
+    if volume_factor is not None:
+        cmd += ["-map", "[a]", *profile["audio"]]
+    else:
+        cmd += ["-map", "0:a:0", "-c:a", "copy"]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    cmd += ["-movflags", "+faststart", output_path]
+    return cmd
 
-        processed_line = f"{rtl_mark}{isolate_start}{stripped}{isolate_end}"
-        processed_lines.append(processed_line)
+def build_batch_ffmpeg_command(input_path: str, outputs: list, start: float = 0, end: Optional[float] = None, threads: Optional[int] = None) -> list:
+    """Build one FFmpeg command that decodes the input once and writes a (path, video filter, volume factor, profile) output each."""
+    video_branches = [index for index, output in enumerate(outputs) if output[1] is not None]
+    audio_branches = [index for index, output in enumerate(outputs) if output[2] is not None]
 
-    return "\n".join(processed_lines)
+    # split/asplit hand the same decoded frames to every output's own filter chain
+    filter_complex = []
+    if video_branches:
+        filter_complex.append(f"[0:v]split={len(video_branches)}" + "".join(f"[vin{index}]" for index in video_branches))
+        filter_complex += [f"[vin{index}]{outputs[index][1]}[v{index}]" for index in video_branches]
+    if audio_branches:
+        filter_complex.append(f"[0:a]asplit={len(audio_branches)}" + "".join(f"[ain{index}]" for index in audio_branches))
+        filter_complex += [f"[ain{index}]volume={outputs[index][2]}[a{index}]" for index in audio_branches]
 
-def build_ffmpeg_command(input_path: str, output_path: str, filter_complex: list) -> list:
-    """Build FFmpeg command with proper encoding settings."""
-    return [
+    cmd = [
         "ffmpeg",
         "-y",
-        "-i", input_path,
-        "-filter_complex", "".join(filter_complex),
-        "-map", "[v]",
-        "-map", "[a]",
-        "-c:v", "mpeg4",
-        "-q:v", "5",
-        "-pix_fmt", "yuv420p",
-        "-movflags", "+faststart",
-        "-c:a", "aac",
-        "-b:a", "192k",
-        output_path
+        "-progress", "pipe:1",
+        "-nostats",
+        *(["-ss", f"{start:.6f}"] if start > 0 else []),
+        *(["-t", f"{end - start:.6f}"] if end is not None else []),
+        "-i", input_path
     ]
+    if filter_complex:
+        cmd += ["-filter_complex", ";".join(filter_complex)]
+    for index, (output_path, video_filter, volume_factor, profile) in enumerate(outputs):
+        if video_filter is not None:
+            cmd += ["-map", f"[v{index}]", *profile["video"]]
+        else:
+            cmd += ["-map", "0:v:0", "-c:v", "copy"]
+        if volume_factor is not None:
+            cmd += ["-map", f"[a{index}]", *profile["audio"]]
+        else:
+            cmd += ["-map", "0:a:0", "-c:a", "copy"]
+        # The outputs encode side by side, so they split the budget
+        if threads:
+            cmd += ["-threads", str(max(1, threads // len(outputs)))]
+        cmd += ["-movflags", "+faststart", output_path]
+    return cmd
 
-def crop_video(input_path: str, output_path: str, target_ratio: str, position: float = 50, volume: float = 100, language: Optional[str] = None, burn_subtitles: bool = False, subtitles_data: Optional[SubtitlesData] = None):
-    """Crop video to target aspect ratio, adjust volume, and optionally burn in subtitles."""
-    width, height = get_video_dimensions(input_path)
-    
-    logger.info(f"Processing video: {width}x{height}, ratio: {target_ratio}, position: {position}, volume: {volume}%")
-    
+def parse_ffmpeg_progress(progress: dict, duration: Optional[float] = None) -> dict:
+    """Convert one block of ffmpeg -progress output into numeric progress values."""
+    out_time = None
+    # out_time_ms is in microseconds as well, despite its name
+    for key in ("out_time_us", "out_time_ms"):
+        try:
+            out_time = int(progress[key]) / 1_000_000
+            break
+        except (KeyError, ValueError):
+            continue
+
+    try:
+        speed = float(progress.get("speed", "").rstrip("x"))
+    except ValueError:
+        speed = None
+
+    try:
+        fps = float(progress.get("fps", ""))
+    except ValueError:
+        fps = None
+
+    percent = None
+    if progress.get("progress") == "end":
+        percent = 100.0
+    elif out_time is not None and duration:
+        percent = round(min(max(out_time / duration, 0), 1) * 100, 1)
+
+    return {
+        "out_time": out_time,
+        "speed": speed,
+        "fps": fps,
+        "percent": percent
+    }
+
+def run_ffmpeg(cmd: list, duration: Optional[float] = None, progress_callback=None, kind: str = "render") -> subprocess.CompletedProcess:
+    """Run an ffmpeg command that writes -progress output to stdout, reporting progress as it goes."""
+    logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
+    start_time = time.perf_counter()
+
+    # stderr goes to a file so a chatty encode cannot fill the pipe and stall ffmpeg
+    with tempfile.TemporaryFile() as stderr_file:
+        # Cancelling the job kills ffmpeg, which ends the progress stream
+        with cancellation.popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file, text=True) as process:
+            progress = {}
+            for line in process.stdout:
+                key, _, value = line.strip().partition("=")
+                progress[key] = value
+                # Every progress block ends with progress=continue or progress=end
+                if key == "progress" and progress_callback:
+                    progress_callback(parse_ffmpeg_progress(progress, duration))
+            returncode = process.wait()
+
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode("utf-8", errors="replace")
+
+    # A killed ffmpeg is a cancelled job rather than a failed render
+    cancellation.check()
+    metrics.record_ffmpeg_run(kind, returncode, time.perf_counter() - start_time, duration)
+    return subprocess.CompletedProcess(cmd, returncode, "", stderr)
+
+def get_crop_geometry(width: int, height: int, target_ratio: str, position: float = 50) -> tuple:
+    """Compute the crop rectangle (width, height, x offset, y offset) for a target aspect ratio."""
     # Initialize variables
     new_width = width
     new_height = height
@@ -370,85 +853,126 @@ def crop_video(input_path: str, output_path: str, target_ratio: str, position: f
     # Ensure dimensions are even numbers (required by some codecs)
     new_width = new_width - (new_width % 2)
     new_height = new_height - (new_height % 2)
+
+    return new_width, new_height, x_offset, y_offset
+
+def build_subtitle_filter(ass_path: Path) -> str:
+    """Build the ffmpeg filter that burns in an ASS script, with the bundled fonts available to libass."""
+    # Filter arguments need ':' and '\\' escaped
+    ass_path_str = str(ass_path).replace('\\', '/').replace(':', '\\:')
+    fonts_dir_str = str(FONTS_DIR_PATH).replace('\\', '/').replace(':', '\\:')
+    logger.info(f"Added subtitle filter with path: {ass_path_str}")
+    return f"ass='{ass_path_str}':fontsdir='{fonts_dir_str}'"
+
+def build_render_filters(metadata: dict, target_ratio: str, position: float = 50, volume: float = 100, burn_subtitles: bool = False, subtitles_data: Optional[SubtitlesData] = None, start: float = 0, end: Optional[float] = None) -> tuple:
+    """Build the video filter and volume factor of a render of start-end; None means the stream is copied.
+
+    Also returns the temporary ASS file the subtitle filter reads, which the caller removes after encoding.
+    """
+    width, height = get_display_dimensions(metadata)
+    codecs = {"video": metadata["video_codec"], "audio": metadata["audio_codec"]}
+    
+    logger.info(f"Processing video: {width}x{height}, ratio: {target_ratio}, position: {position}, volume: {volume}%")
+    
+    new_width, new_height, x_offset, y_offset = get_crop_geometry(width, height, target_ratio, position)
     
     logger.info(f"Output dimensions: {new_width}x{new_height}")
     
-    # Calculate volume factor (1.0 = 100%)
+    # Calculate volume factor (1.0 = 100%); unchanged audio in a compatible codec is copied
     volume_factor = volume / 100
+    if volume == 100 and codecs.get("audio") in MP4_COPY_AUDIO_CODECS:
+        logger.info(f"Copying {codecs['audio']} audio stream")
+        volume_factor = None
 
     # Handle subtitles
-    temp_srt_path = None
+    temp_ass_path = None
+    video_filters = []
+    if (new_width, new_height) != (width, height):
+        video_filters.append(f"crop={new_width}:{new_height}:{x_offset}:{y_offset}")
     
     try:
         if burn_subtitles and subtitles_data:
             # Use custom subtitles
             logger.info("Using custom subtitles")
-            temp_srt_path = TRANSCRIPTS_DIR / f"temp_{uuid.uuid4()}.srt"
-            create_custom_srt_file(subtitles_data.text, temp_srt_path)
-            
-            if temp_srt_path and temp_srt_path.exists():
-                # Convert hex colors to FFmpeg format (AABBGGRR)
-                def hex_to_ffmpeg_color(hex_color: str) -> str:
-                    hex_color = hex_color.lstrip('#')
-                    r = hex_color[0:2]
-                    g = hex_color[2:4]
-                    b = hex_color[4:6]
-                    return f"&H00{b}{g}{r}&"
-                
-                primary_color = hex_to_ffmpeg_color(subtitles_data.styles.color)
-                outline_color = hex_to_ffmpeg_color(subtitles_data.styles.borderColor)
-                
-                # Ensure alignment is a number
-                alignment = int(subtitles_data.styles.alignment)
-                
-                # Create subtitle filter with styling
-                logger.info(f"FontType: {subtitles_data.styles.fontType}")
-                subtitle_style = (
-                    f"FontName={str(subtitles_data.styles.fontType)},"
-                    f"FontFile={FONTS_DIR_PATH}/{str(subtitles_data.styles.fontType)}.ttf,"
-                    f"Fontsdir={FONTS_DIR_PATH},"
-                    f"FontSize={int(subtitles_data.styles.fontSize)},"
-                    f"PrimaryColour={primary_color},"
-                    f"OutlineColour={outline_color},"
-                    f"Outline={int(subtitles_data.styles.borderSize)},"
-                    f"MarginV={int(subtitles_data.styles.marginV)},"
-                    f"Alignment={alignment},"
-                    f"MarginL=0,"
-                    f"MarginR=0,"
-                    f"Bold=0,"
-                    f"Italic=0,"
-                    f"Spacing=0,"
-                    f"BorderStyle=1,"
-                    f"Shadow=0,"                )
-                
-                # Add subtitle filter with proper escaping
-                srt_path_str = str(temp_srt_path).replace('\\', '/').replace(':', '\\:')
-                filter_complex = [
-                    f"[0:v]crop={new_width}:{new_height}:{x_offset}:{y_offset},subtitles='{srt_path_str}':force_style='{subtitle_style}'[v];",
-                    f"[0:a]volume={volume_factor}[a]"
-                ]
-                logger.info(f"Added subtitle filter with path: {srt_path_str}")
-                logger.info(f"$$$$$$$$$$$$$$$$$$$$ {subtitle_style} @@@@@@@@@@@@@@@@@@@@@@@@")
-            else:
-                filter_complex = [f"[0:v]crop={new_width}:{new_height}:{x_offset}:{y_offset}[v];[0:a]volume={volume_factor}[a]"]
-        else:
-            filter_complex = [f"[0:v]crop={new_width}:{new_height}:{x_offset}:{y_offset}[v];[0:a]volume={volume_factor}[a]"]
+            temp_ass_path = TRANSCRIPTS_DIR / f"temp_{uuid.uuid4()}.ass"
+            with metrics.timed("subtitles"), open(temp_ass_path, 'w', encoding='utf-8') as f:
+                # Input seeking restarts timestamps at zero, so the cues move with the cut
+                f.write(build_ass(shift_cues(parse_srt(subtitles_data.text), start, end), subtitles_data.styles))
+            video_filters.append(build_subtitle_filter(temp_ass_path))
     except Exception as e:
         logger.error(f"Subtitle processing error: {str(e)}")
-        filter_complex = [f"[0:v]crop={new_width}:{new_height}:{x_offset}:{y_offset}[v];[0:a]volume={volume_factor}[a]"]
-    
-    # Build and execute FFmpeg command
-    cmd = build_ffmpeg_command(input_path, output_path, filter_complex)
-    logger.info(f"Running FFmpeg command: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    # Clean up temporary files
-    if temp_srt_path and temp_srt_path.exists():
-        try:
-            temp_srt_path.unlink()
-        except Exception as e:
-            logger.warning(f"Could not clean up temporary SRT file {temp_srt_path}: {e}")
+
+    # Nothing to change in the picture: copy the video stream when the MP4 can hold it
+    video_filter = ",".join(video_filters) or None
+    if video_filter is None:
+        if codecs.get("video") in MP4_COPY_VIDEO_CODECS:
+            logger.info(f"Copying {codecs['video']} video stream")
+        else:
+            video_filter = "null"
+
+    return video_filter, volume_factor, temp_ass_path
+
+def find_cut_keyframe(input_path: str, metadata: dict, start: float, snap_to_keyframes: bool = False) -> Optional[float]:
+    """Return the keyframe a stream-copied cut at start begins on, or None if the video has to be re-encoded instead."""
+    # A stream-copied cut starts on the keyframe at or before the seek point
+    keyframes = get_keyframe_times(input_path, max(0, start - KEYFRAME_SEARCH_SECONDS), start + 1)
+    tolerance = 0.5 / (metadata["fps"] or 30)
+    index = bisect.bisect_right(keyframes, start + tolerance) - 1
+    if index >= 0 and (snap_to_keyframes or start - keyframes[index] <= tolerance):
+        return keyframes[index]
+    return None
+
+def resolve_cut_start(input_path: str, metadata: dict, video_filter: Optional[str], start: float, snap_to_keyframes: bool = False) -> tuple:
+    """Return the video filter and start a trimmed render really uses, moving a stream-copied cut to a keyframe or re-encoding instead."""
+    if video_filter is not None or start <= 0:
+        return video_filter, start
+    keyframe = find_cut_keyframe(input_path, metadata, start, snap_to_keyframes)
+    if keyframe is None:
+        logger.info(f"Trim start {start:.3f}s is not on a keyframe, re-encoding video")
+        return "null", start
+    logger.info(f"Cutting at keyframe {keyframe:.3f}s for trim start {start:.3f}s")
+    return video_filter, keyframe
+
+def crop_video(input_path: str, output_path: str, target_ratio: str, position: float = 50, volume: float = 100, language: Optional[str] = None, burn_subtitles: bool = False, subtitles_data: Optional[SubtitlesData] = None, progress_callback=None, segmented: Optional[bool] = None, profile: Optional[str] = None, metadata: Optional[dict] = None, start: float = 0, end: Optional[float] = None, snap_to_keyframes: bool = False, threads: Optional[int] = None) -> tuple:
+    """Crop video to target aspect ratio, adjust volume, and optionally burn in subtitles, keeping only start-end.
+
+    Returns the duration and the start the output really begins at, which a stream-copied cut moves to a keyframe.
+    """
+    metadata = metadata or probe_video(input_path)
+    encoder_profile = ENCODER_PROFILES[get_encoder_profile_name(profile)]
+
+    video_filter, volume_factor, temp_ass_path = build_render_filters(metadata, target_ratio, position, volume, burn_subtitles, subtitles_data, start, end)
+    if video_filter is None:
+        segmented = False
+    video_filter, start = resolve_cut_start(input_path, metadata, video_filter, start, snap_to_keyframes)
+
+    duration = metadata["duration"]
+    if duration and (start or end is not None):
+        duration = max(0, min(end if end is not None else duration, duration) - start)
+
+    if segmented is None:
+        segmented = bool(duration and duration >= SEGMENTED_RENDER_MIN_DURATION and SEGMENT_WORKERS > 1)
+
+    try:
+        if segmented and duration:
+            result = render_segmented(input_path, output_path, video_filter, volume_factor, encoder_profile, duration, progress_callback, start, end)
+        else:
+            # Build and execute FFmpeg command
+            cmd = build_ffmpeg_command(input_path, output_path, video_filter, volume_factor, encoder_profile, start, end, threads)
+            result = run_ffmpeg(cmd, duration, progress_callback)
+    finally:
+        # Clean up temporary files
+        if temp_ass_path and temp_ass_path.exists():
+            try:
+                temp_ass_path.unlink()
+            except Exception as e:
+                logger.warning(f"Could not clean up temporary ASS file {temp_ass_path}: {e}")
     
+    check_ffmpeg_result(result)
+    return duration, start
+
+def check_ffmpeg_result(result: subprocess.CompletedProcess):
+    """Raise a retryable 500 error if an ffmpeg render failed."""
     if result.returncode != 0:
         logger.error(f"FFmpeg error output: {result.stderr}")
         raise HTTPException(
@@ -461,94 +985,1863 @@ def crop_video(input_path: str, output_path: str, target_ratio: str, position: f
             }
         )
 
-# API Endpoints
+# Segmented rendering
 
-@app.get("/api/status")
-async def get_status():
-    """Check API health status"""
-    return {
-        "status": "ok",
-        "version": "1.0.0",
-        "service": "Video Editor API"
-    }
+# Segment encodes from all concurrent renders share this pool, so the total number of
+# ffmpeg processes stays bounded by SEGMENT_WORKERS
+segment_executor = ThreadPoolExecutor(max_workers=SEGMENT_WORKERS, thread_name_prefix="segment")
+
+def get_keyframe_times(file_path: str, start: Optional[float] = None, end: Optional[float] = None) -> list:
+    """List video keyframe timestamps in seconds from the start of the file, reading packets without decoding."""
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags:format=start_time",
+        # Only demux the packets around the window of interest
+        *(["-read_intervals", f"{start or 0:.6f}%{'' if end is None else f'{end:.6f}'}"] if start or end is not None else []),
+        "-of", "json",
+        file_path
+    ]
+    with metrics.timed("keyframe_scan"):
+        result = cancellation.run_process(cmd)
+    if result.returncode != 0:
+        logger.warning(f"Could not read keyframes of {file_path}: {result.stderr}")
+        return []
+
+    probe = json.loads(result.stdout)
+    start_time = float(probe.get("format", {}).get("start_time", 0) or 0)
+    keyframes = sorted(
+        float(packet["pts_time"]) - start_time
+        for packet in probe.get("packets", [])
+        if "K" in packet.get("flags", "") and packet.get("pts_time") not in (None, "N/A")
+    )
+    return keyframes
+
+def choose_segment_boundaries(keyframes: list, duration: float, segment_count: int) -> list:
+    """Split [0, duration] into up to segment_count (start, end) ranges that start on keyframes."""
+    cut_points = []
+    for k in range(1, segment_count):
+        target = duration * k / segment_count
+        index = bisect.bisect_left(keyframes, target)
+        candidates = keyframes[max(0, index - 1):index + 1]
+        if not candidates:
+            continue
+        nearest = min(candidates, key=lambda t: abs(t - target))
+        if nearest > (cut_points[-1] if cut_points else 0) and nearest < duration:
+            cut_points.append(nearest)
+
+    edges = [0.0, *cut_points]
+    # The last segment runs to the end of the input rather than to a probed duration
+    return [(start, end) for start, end in zip(edges, [*cut_points, None])]
+
+def render_segmented(input_path: str, output_path: str, video_filter: str, volume_factor: Optional[float], profile: dict, duration: float, progress_callback=None, trim_start: float = 0, trim_end: Optional[float] = None) -> subprocess.CompletedProcess:
+    """Encode keyframe-aligned video segments of trim_start-trim_end in parallel and mux them with a single-pass audio track."""
+    # Segment times are relative to trim_start, like the output and the shifted subtitle cues
+    keyframes = [
+        keyframe - trim_start
+        for keyframe in get_keyframe_times(input_path, trim_start, trim_end)
+        if keyframe > trim_start
+    ]
+    boundaries = choose_segment_boundaries(keyframes, duration, SEGMENT_WORKERS)
+    if trim_end is not None:
+        boundaries[-1] = (boundaries[-1][0], duration)
+    work_dir = Path(tempfile.mkdtemp(prefix="temp_segments_", dir=OUTPUT_DIR))
+    # At most SEGMENT_WORKERS segment encodes run across all renders, so they split the render budget
+    threads_per_segment = str(max(1, RENDER_THREADS // SEGMENT_WORKERS))
+    logger.info(f"Rendering {input_path} in {len(boundaries)} segments")
+
+    segment_progress = {}
+    start_time = time.time()
+
+    def update_segment_progress(index: int, progress: dict):
+        segment_progress[index] = progress.get("out_time") or 0
+        if progress_callback:
+            encoded = sum(segment_progress.values())
+            elapsed = time.time() - start_time
+            progress_callback({
+                "out_time": encoded,
+                "speed": round(encoded / elapsed, 3) if elapsed > 0 else None,
+                "fps": None,
+                "percent": round(min(encoded / duration, 1) * 100, 1)
+            })
 
-@app.post("/api/upload")
-async def upload_video(file: UploadFile = File(...)):
-    """Upload a video file for processing"""
     try:
-        # Log the incoming file details
-        logger.info(f"Received upload request for file: {file.filename}, content_type: {file.content_type}")
-        
-        # Check if it's a video file by attempting to get dimensions, rather than relying on content type
-        # Some video files might come as application/octet-stream
+        futures = []
+        segment_paths = []
+        for index, (start, end) in enumerate(boundaries):
+            segment_path = work_dir / f"segment_{index:04d}.mp4"
+            segment_paths.append(segment_path)
+            cmd = [
+                "ffmpeg",
+                "-y",
+                "-progress", "pipe:1",
+                "-nostats",
+                # Input-side seek to a keyframe, so each worker only decodes its own range
+                "-ss", f"{trim_start + start:.6f}",
+                *(["-t", f"{end - start:.6f}"] if end is not None else []),
+                "-i", input_path,
+                # Restore source timestamps around the filters so burned-in subtitles line up
+                "-filter_complex", f"[0:v]setpts=PTS+{start:.6f}/TB,{video_filter},setpts=PTS-STARTPTS[v]",
+                "-map", "[v]",
+                "-an",
+                *profile["video"],
+                "-threads", threads_per_segment,
+                str(segment_path)
+            ]
+            segment_duration = (end if end is not None else duration) - start
+            # Segments run on other threads but belong to the same job, so they are cancelled with it
+            futures.append(segment_executor.submit(
+                cancellation.bind(run_ffmpeg), cmd, segment_duration,
+                lambda progress, index=index: update_segment_progress(index, progress),
+                "segment"
+            ))
+
+        # Audio is cheap to encode and would click at segment joins, so it is done in one pass
+        audio_path = work_dir / "audio.mp4"
+        audio_cmd = [
+            "ffmpeg",
+            "-y",
+            "-progress", "pipe:1",
+            "-nostats",
+            *(["-ss", f"{trim_start:.6f}"] if trim_start > 0 else []),
+            *(["-t", f"{duration:.6f}"] if trim_end is not None else []),
+            "-i", input_path,
+            "-map", "0:a:0",
+            "-vn",
+            *(["-af", f"volume={volume_factor}", *profile["audio"]] if volume_factor is not None else ["-c:a", "copy"]),
+            str(audio_path)
+        ]
+        futures.append(segment_executor.submit(cancellation.bind(run_ffmpeg), audio_cmd, duration, None, "audio"))
+
+        for future in futures:
+            result = future.result()
+            if result.returncode != 0:
+                return result
+
+        concat_list_path = work_dir / "segments.txt"
+        with open(concat_list_path, 'w', encoding='utf-8') as f:
+            for segment_path in segment_paths:
+                f.write(f"file '{segment_path.resolve()}'\n")
+
+        # Stream copy: joining the segments costs no re-encode
+        mux_cmd = [
+            "ffmpeg",
+            "-y",
+            "-progress", "pipe:1",
+            "-nostats",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", str(concat_list_path),
+            "-i", str(audio_path),
+            "-map", "0:v",
+            "-map", "1:a",
+            "-c", "copy",
+            "-movflags", "+faststart",
+            output_path
+        ]
+        result = run_ffmpeg(mux_cmd, kind="mux")
+        if result.returncode == 0 and progress_callback:
+            progress_callback(parse_ffmpeg_progress({"progress": "end"}))
+        return result
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+# Render cache
+
+# SHA-256 digests keyed by (path, size, mtime) so unchanged files are hashed once, least recently used first
+file_hashes: OrderedDict = OrderedDict()
+file_hashes_lock = threading.Lock()
+# Named locks so identical work (renders, audio extraction) collapses into a single run, with their holder counts
+keyed_locks: dict = {}
+keyed_locks_guard = threading.Lock()
+# file_id -> transcriptions and sidecar builds reading its files, which the storage sweep leaves alone
+media_in_use: dict = {}
+media_in_use_lock = threading.Lock()
+
+def memo_file_hash(memo_key: tuple, file_hash: str):
+    with file_hashes_lock:
+        file_hashes[memo_key] = file_hash
+        file_hashes.move_to_end(memo_key)
+        while len(file_hashes) > FILE_HASH_MEMO_SIZE:
+            file_hashes.popitem(last=False)
+
+def remember_file_hash(file_path: Path, file_hash: str):
+    """Record an already computed SHA-256 for a file."""
+    stat = file_path.stat()
+    memo_file_hash((str(file_path), stat.st_size, stat.st_mtime_ns), file_hash)
+
+def get_file_hash(file_path: Path, compute: bool = True) -> Optional[str]:
+    """Get the SHA-256 of a file, hashing it only if it is not known yet (and compute is set)."""
+    stat = file_path.stat()
+    memo_key = (str(file_path), stat.st_size, stat.st_mtime_ns)
+    with file_hashes_lock:
+        file_hash = file_hashes.get(memo_key)
+        if file_hash is not None:
+            file_hashes.move_to_end(memo_key)
+    if file_hash is not None or not compute:
+        return file_hash
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+
+    memo_file_hash(memo_key, digest.hexdigest())
+    return digest.hexdigest()
+
+def get_canonical_request(request: ProcessVideoRequest) -> str:
+    """Serialize the settings that affect a render's output, ignoring how it is executed."""
+    # The language only steers transcription, never the rendered video
+    settings = request.model_dump(exclude={"segmented", "hls", "supersede", "language"} if request.preview else {"segmented", "hls", "supersede", "language", "preview_start", "preview_duration"})
+    settings["profile"] = "fast-preview" if request.preview else get_encoder_profile_name(request.profile)
+    return json.dumps(settings, sort_keys=True, separators=(",", ":"))
+
+def get_render_cache_key(input_hash: str, request: ProcessVideoRequest) -> str:
+    """Build the render cache key from the input content and a canonical form of the request."""
+    canonical_request = get_canonical_request(request)
+    return hashlib.sha256(f"{RENDER_CACHE_VERSION}:{input_hash}:{canonical_request}".encode("utf-8")).hexdigest()
+
+@contextmanager
+def get_keyed_lock(key: str):
+    """Hold a named lock; the lock is dropped once nobody holds or waits for it."""
+    with keyed_locks_guard:
+        entry = keyed_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with keyed_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del keyed_locks[key]
+
+@contextmanager
+def use_media(file_id: str):
+    """Mark a file_id as read by background work for as long as the block runs, so storage sweeps skip it."""
+    with media_in_use_lock:
+        media_in_use[file_id] = media_in_use.get(file_id, 0) + 1
+    try:
+        yield
+    finally:
+        with media_in_use_lock:
+            media_in_use[file_id] -= 1
+            if media_in_use[file_id] == 0:
+                del media_in_use[file_id]
+
+def link_or_copy(source: Path, destination: Path):
+    """Hard link a file into place, falling back to a copy across filesystems."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+def get_cached_render(cache_key: str) -> Optional[Path]:
+    """Return the cached render for a key and mark it as recently used."""
+    cache_path = RENDER_CACHE_DIR / f"{cache_key}.mp4"
+    try:
+        # The modification time doubles as the LRU timestamp
+        os.utime(cache_path)
+    except FileNotFoundError:
+        return None
+    return cache_path
+
+def store_cached_render(output_path: Path, cache_key: str):
+    """Add a finished render to the cache and evict old entries beyond the size limit."""
+    cache_path = RENDER_CACHE_DIR / f"{cache_key}.mp4"
+    temp_path = RENDER_CACHE_DIR / f"temp_{uuid.uuid4()}.mp4"
+    try:
+        link_or_copy(output_path, temp_path)
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        logger.warning(f"Could not cache render {output_path}: {e}")
+        if temp_path.exists():
+            temp_path.unlink()
+        return
+
+    # The size limit is enforced by the storage manager, off the render path
+    request_storage_sweep()
+
+def list_cache_entries(cache_dir: Path) -> list:
+    """List (last use, size, path) of the finished entries of a cache directory."""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and not entry.name.startswith("temp_"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+def enforce_cache_limit(cache_dir: Path, max_bytes: int):
+    """Delete the least recently used files in a cache directory until it fits in max_bytes."""
+    entries = list_cache_entries(cache_dir)
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_bytes:
+            break
         try:
-            # Create a temporary file to check if it's a valid video
-            temp_path = UPLOAD_DIR / f"temp_{uuid.uuid4()}_{file.filename}"
-            content = await file.read()
-            logger.info(f"Read {len(content)} bytes from uploaded file")
-            
-            with open(temp_path, "wb") as buffer:
-                buffer.write(content)
-            
-            # Try to get video dimensions - this will fail if it's not a valid video file
-            try:
-                width, height = get_video_dimensions(str(temp_path))
-                logger.info(f"Valid video file detected: {width}x{height}")
-            except Exception as e:
-                logger.error(f"Invalid video file: {str(e)}")
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "message": "Invalid video file",
-                        "error": "File must be a valid video format",
-                        "technical_details": str(e)
-                    }
-                )
-            finally:
-                # Clean up temporary file
-                if temp_path.exists():
-                    temp_path.unlink()
-            
-            # If we got here, it's a valid video file
-            file_id = str(uuid.uuid4())
-            input_path = UPLOAD_DIR / f"{file_id}_{file.filename}"
-            logger.info(f"Saving file to: {input_path}")
-            
-            # Write the content to the final location
-            with open(input_path, "wb") as buffer:
-                buffer.write(content)
-            logger.info("File saved successfully")
-            
-            # Verify file was written
-            if not input_path.exists():
-                raise Exception("File was not saved properly")
-            
-            if input_path.stat().st_size == 0:
-                raise Exception("Saved file is empty")
-            
+            os.unlink(path)
+            total_size -= size
+            metrics.STORAGE_REMOVALS.inc(artifact=f"{cache_dir.name}_cache", reason="cache_limit")
+            logger.info(f"Evicted cache entry: {path}")
+        except FileNotFoundError:
+            pass
+
+# Audio extraction
+
+def get_audio_pcm_path(file_id: str) -> Path:
+    # "{file_id}.audio.pcm" never matches the "{file_id}_*" pattern used to find the upload itself
+    return UPLOAD_DIR / f"{file_id}.audio.pcm"
+
+def extract_audio_pcm(input_path: Path, pcm_path: Path) -> bool:
+    """Decode the first audio stream into a raw 16 kHz mono int16 PCM file."""
+    temp_path = pcm_path.with_name(f"temp_{uuid.uuid4()}.pcm")
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-v", "error",
+        "-i", str(input_path),
+        "-map", "0:a:0",
+        "-vn",
+        "-ac", "1",
+        "-ar", str(AUDIO_SAMPLE_RATE),
+        "-c:a", "pcm_s16le",
+        "-f", "s16le",
+        str(temp_path)
+    ]
+
+    start_time = time.time()
+    with metrics.timed("audio_extract"):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+
+    if result.returncode != 0:
+        logger.warning(f"Could not extract audio from {input_path}: {result.stderr}")
+        if temp_path.exists():
+            temp_path.unlink()
+        return False
+
+    os.replace(temp_path, pcm_path)
+    logger.info(f"Extracted audio of {input_path} to {pcm_path} in {time.time() - start_time:.2f}s")
+    return True
+
+def ensure_audio_pcm(file_id: str, input_path: Path) -> Optional[Path]:
+    """Return the PCM sidecar of an upload, extracting it first if ingest has not done so yet."""
+    pcm_path = get_audio_pcm_path(file_id)
+    # Ingest and a transcription request may race; only one of them decodes
+    with use_media(file_id), get_keyed_lock(f"audio:{file_id}"):
+        if pcm_path.exists() or extract_audio_pcm(input_path, pcm_path):
+            return pcm_path
+    return None
+
+# Proxy media
+
+def get_proxy_path(file_id: str) -> Path:
+    return UPLOAD_DIR / f"{file_id}.proxy.mp4"
+
+def build_proxy(input_path: Path, proxy_path: Path, threads: Optional[int] = None) -> bool:
+    """Transcode an upload to a small, fast-seeking proxy for preview renders."""
+    temp_path = proxy_path.with_name(f"temp_{uuid.uuid4()}.mp4")
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-v", "error",
+        "-i", str(input_path),
+        "-map", "0:v:0",
+        "-map", "0:a:0?",
+        "-vf", f"scale=-2:{PROXY_HEIGHT}",
+        "-c:v", "libx264",
+        "-preset", "ultrafast",
+        "-crf", "28",
+        # A keyframe every second, whatever the frame rate, keeps preview seeks short
+        "-force_key_frames", "expr:gte(t,n_forced*1)",
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac",
+        "-b:a", "96k",
+        "-movflags", "+faststart",
+        *(["-threads", str(threads)] if threads else []),
+        str(temp_path)
+    ]
+
+    start_time = time.time()
+    with metrics.timed("proxy"):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+
+    if result.returncode != 0:
+        logger.warning(f"Could not build proxy of {input_path}: {result.stderr}")
+        if temp_path.exists():
+            temp_path.unlink()
+        return False
+
+    os.replace(temp_path, proxy_path)
+    logger.info(f"Built proxy of {input_path} at {proxy_path} in {time.time() - start_time:.2f}s")
+    return True
+
+def ensure_proxy(file_id: str, input_path: Path, threads: Optional[int] = None) -> Optional[Path]:
+    """Return the proxy of an upload, building it first if ingest has not done so yet."""
+    proxy_path = get_proxy_path(file_id)
+    with use_media(file_id), get_keyed_lock(f"proxy:{file_id}"):
+        if proxy_path.exists() or build_proxy(input_path, proxy_path, threads):
+            return proxy_path
+    return None
+
+# Scrubbing visuals
+
+def get_sprite_path(file_id: str) -> Path:
+    return UPLOAD_DIR / f"{file_id}.sprite.jpg"
+
+def get_peaks_path(file_id: str) -> Path:
+    return UPLOAD_DIR / f"{file_id}.peaks"
+
+def get_sprite_layout(media: dict) -> dict:
+    """Work out the thumbnail count, grid and tile size of an upload's sprite sheet."""
+    width, height = get_display_dimensions(media)
+    count = max(1, min(THUMBNAIL_COUNT, int(media["duration"] or 0)))
+    columns = min(THUMBNAIL_COLUMNS, count)
+    return {
+        "count": count,
+        "columns": columns,
+        "rows": -(-count // columns),
+        # Even dimensions keep the encoder's chroma subsampling happy
+        "width": max(2, round(THUMBNAIL_HEIGHT * width / height / 2) * 2),
+        "height": THUMBNAIL_HEIGHT,
+        "interval": (media["duration"] or 0) / count
+    }
+
+def build_sprite(input_path: Path, sprite_path: Path, layout: dict, duration: float, threads: Optional[int] = None) -> bool:
+    """Tile evenly spaced frames of a video into one JPEG in a single ffmpeg pass."""
+    temp_path = sprite_path.with_name(f"temp_{uuid.uuid4()}.jpg")
+    frame_rate = layout["count"] / duration if duration else 1
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-v", "error",
+        # One frame from the middle of each interval, so the first tile is not a black lead-in frame
+        "-ss", f"{layout['interval'] / 2:.6f}",
+        "-i", str(input_path),
+        "-map", "0:v:0",
+        "-vf", (
+            f"fps={frame_rate:.6f},"
+            f"scale={layout['width']}:{layout['height']},"
+            f"tile={layout['columns']}x{layout['rows']}"
+        ),
+        "-frames:v", "1",
+        "-q:v", "5",
+        *(["-threads", str(threads)] if threads else []),
+        str(temp_path)
+    ]
+
+    start_time = time.time()
+    with metrics.timed("sprite"):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+
+    if result.returncode != 0:
+        logger.warning(f"Could not build sprite sheet of {input_path}: {result.stderr}")
+        if temp_path.exists():
+            temp_path.unlink()
+        return False
+
+    os.replace(temp_path, sprite_path)
+    logger.info(f"Built sprite sheet of {input_path} at {sprite_path} in {time.time() - start_time:.2f}s")
+    return True
+
+def ensure_sprite(file_id: str, media: dict, threads: Optional[int] = None) -> Optional[Path]:
+    """Return the sprite sheet of an upload, building it first if ingest has not done so yet."""
+    sprite_path = get_sprite_path(file_id)
+    with use_media(file_id), get_keyed_lock(f"sprite:{file_id}"):
+        if sprite_path.exists():
+            return sprite_path
+        # The proxy decodes far faster than the original and is plenty for thumbnails
+        proxy_path = get_proxy_path(file_id)
+        sprite_input = proxy_path if proxy_path.exists() else media["input_path"]
+        if build_sprite(sprite_input, sprite_path, get_sprite_layout(media), media["duration"], threads):
+            return sprite_path
+    return None
+
+def compute_waveform_peaks(samples: np.ndarray, samples_per_peak: int) -> np.ndarray:
+    """Reduce int16 samples to interleaved min/max pairs, one pair per bucket of samples_per_peak."""
+    bucket_count = -(-len(samples) // samples_per_peak)
+    if bucket_count == 0:
+        return np.zeros(0, dtype=np.int16)
+    starts = np.arange(bucket_count) * samples_per_peak
+    peaks = np.empty((bucket_count, 2), dtype=np.int16)
+    # reduceat handles the shorter last bucket without padding the whole signal
+    peaks[:, 0] = np.minimum.reduceat(samples, starts)
+    peaks[:, 1] = np.maximum.reduceat(samples, starts)
+    return peaks.ravel()
+
+def build_waveform_peaks(pcm_path: Path, peaks_path: Path) -> bool:
+    """Write the min/max peaks of a PCM sidecar as raw interleaved int16 pairs."""
+    temp_path = peaks_path.with_name(f"temp_{uuid.uuid4()}.peaks")
+    start_time = time.time()
+    try:
+        samples = np.memmap(pcm_path, dtype=np.int16, mode="r") if pcm_path.stat().st_size else np.zeros(0, dtype=np.int16)
+        with metrics.timed("waveform"):
+            compute_waveform_peaks(samples, AUDIO_SAMPLE_RATE // WAVEFORM_PEAKS_PER_SECOND).tofile(temp_path)
+    except Exception as e:
+        logger.warning(f"Could not compute waveform peaks of {pcm_path}: {e}")
+        if temp_path.exists():
+            temp_path.unlink()
+        return False
+
+    os.replace(temp_path, peaks_path)
+    logger.info(f"Computed waveform peaks of {pcm_path} in {time.time() - start_time:.2f}s")
+    return True
+
+def ensure_waveform_peaks(file_id: str, input_path: Path) -> Optional[Path]:
+    """Return the waveform peaks of an upload, computing them first if ingest has not done so yet."""
+    peaks_path = get_peaks_path(file_id)
+    with use_media(file_id), get_keyed_lock(f"peaks:{file_id}"):
+        if peaks_path.exists():
+            return peaks_path
+        pcm_path = ensure_audio_pcm(file_id, input_path)
+        if pcm_path and build_waveform_peaks(pcm_path, peaks_path):
+            return peaks_path
+    return None
+
+def get_sidecar_paths(file_id: str) -> list:
+    """List the paths of all artifacts derived from an upload."""
+    return [get_audio_pcm_path(file_id), get_proxy_path(file_id), get_sprite_path(file_id), get_peaks_path(file_id)]
+
+def prepare_upload_sidecars(file_id: str, input_path: Path, threads: Optional[int] = None):
+    """Derive reusable artifacts from a new upload; runs in the sidecar pool after the upload response is sent."""
+    ensure_audio_pcm(file_id, input_path)
+    ensure_waveform_peaks(file_id, input_path)
+    ensure_proxy(file_id, input_path, threads)
+    media = get_media(file_id)
+    if media:
+        ensure_sprite(file_id, media, threads)
+
+# Parallel transcription
+
+transcription_pool = None
+
+def find_silence_split_points(samples: np.ndarray, chunk_seconds: float = TRANSCRIBE_CHUNK_SECONDS) -> list:
+    """Pick sample offsets near every chunk_seconds that fall in the quietest nearby audio."""
+    frame_size = int(AUDIO_SAMPLE_RATE * VAD_FRAME_SECONDS)
+    frame_count = len(samples) // frame_size
+    chunk_frames = int(chunk_seconds / VAD_FRAME_SECONDS)
+    search_frames = int(min(TRANSCRIBE_SPLIT_SEARCH_SECONDS, chunk_seconds / 4) / VAD_FRAME_SECONDS)
+
+    # RMS energy per frame, smoothed so a split lands in a pause rather than between two syllables
+    frames = np.asarray(samples[:frame_count * frame_size], dtype=np.float32).reshape(frame_count, frame_size)
+    energy = np.sqrt(np.mean(np.square(frames), axis=1))
+    smoothing_frames = max(1, int(VAD_SMOOTHING_SECONDS / VAD_FRAME_SECONDS))
+    energy = np.convolve(energy, np.ones(smoothing_frames) / smoothing_frames, mode="same")
+
+    split_points = []
+    position = 0
+    while frame_count - position > chunk_frames + search_frames:
+        window_start = position + chunk_frames - search_frames
+        window_end = position + chunk_frames + search_frames
+        split_frame = window_start + int(np.argmin(energy[window_start:window_end]))
+        split_points.append(split_frame * frame_size)
+        position = split_frame
+
+    return split_points
+
+def init_transcription_worker():
+    """Load the Whisper models once per worker process and share the CPU fairly between workers."""
+    transcription.set_thread_budget(max(1, TRANSCRIBE_THREADS // TRANSCRIBE_WORKERS))
+    transcription.preload(transcription.WHISPER_PRELOAD or ["auto"], warm_up=False)
+
+def transcribe_audio_chunk(pcm_path: str, start_sample: int, end_sample: int, language: Optional[str], backend: Optional[str] = None) -> dict:
+    """Transcribe one chunk of a PCM sidecar in a worker process, with timestamps relative to the whole file."""
+    result = transcribe_audio(transcription.PcmAudio(pcm_path, start_sample, end_sample), language, backend=backend)
+    offset = start_sample / AUDIO_SAMPLE_RATE
+    # Metrics go back with the segments, since this process's own metrics are never scraped
+    return {
+        "segments": [
+            {
+                "start": segment["start"] + offset,
+                "end": segment["end"] + offset,
+                "text": segment["text"]
+            }
+            for segment in result["segments"]
+        ],
+        "metrics": result["metrics"]
+    }
+
+def get_transcription_pool() -> ProcessPoolExecutor:
+    global transcription_pool
+    if transcription_pool is None:
+        # spawn rather than fork: forking a process that already runs threads (and maybe torch) is unsafe
+        transcription_pool = ProcessPoolExecutor(
+            max_workers=TRANSCRIBE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_transcription_worker
+        )
+    return transcription_pool
+
+def transcribe_audio_parallel(pcm_path: Path, language: Optional[str] = None, backend: Optional[str] = None) -> dict:
+    """Transcribe a PCM sidecar in silence-aligned chunks across the worker pool and merge the segments."""
+    samples = np.memmap(pcm_path, dtype=np.int16, mode="r")
+    boundaries = [0, *find_silence_split_points(samples), len(samples)]
+    logger.info(f"Transcribing {pcm_path} in {len(boundaries) - 1} chunks on {TRANSCRIBE_WORKERS} workers")
+
+    pool = get_transcription_pool()
+    futures = [
+        pool.submit(transcribe_audio_chunk, str(pcm_path), start, end, language, backend)
+        for start, end in zip(boundaries, boundaries[1:])
+    ]
+
+    # Chunks are submitted in order, so concatenating keeps segments sorted by time
+    segments = []
+    try:
+        for future in futures:
+            chunk = future.result()
+            metrics.record_transcription(chunk["metrics"])
+            segments.extend(chunk["segments"])
+            cancellation.check()
+    except cancellation.Cancelled:
+        # Chunks already being transcribed finish; the rest never start
+        for future in futures:
+            future.cancel()
+        raise
+    return {
+        "segments": segments,
+        "text": "".join(segment["text"] for segment in segments)
+    }
+
+# Transcription cache
+
+def get_audio_fingerprint(input_path: Path, pcm_path: Optional[Path]) -> str:
+    """Hash the decoded audio stream, so remuxes and re-uploads of the same audio share a fingerprint."""
+    if pcm_path is None:
+        logger.warning(f"No decodable audio in {input_path}, using file hash as fingerprint")
+        return "file:" + get_file_hash(input_path)
+
+    # The sidecar is the decoded 16 kHz mono stream Whisper consumes, so hashing it needs no decode
+    return "audio:" + get_file_hash(pcm_path)
+
+def get_transcription_model_id(language: Optional[str] = None, backend: Optional[str] = None) -> str:
+    """Identify the model and backend a transcription uses; the reference backend keeps bare model names."""
+    backend = transcription.get_backend_name(backend)
+    model_name = transcription.get_model_name(language)
+    return model_name if backend == "whisper" else f"{backend}/{model_name}"
+
+def get_transcription_cache_path(fingerprint: str, language: Optional[str], model_name: str) -> Path:
+    cache_key = hashlib.sha256(f"{fingerprint}:{language or 'auto'}:{model_name}".encode("utf-8")).hexdigest()
+    return TRANSCRIPTION_CACHE_DIR / f"{cache_key}.json"
+
+def load_cached_transcription(cache_path: Path) -> Optional[list]:
+    """Return cached transcription segments, or None on a cache miss."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        # The modification time doubles as the LRU timestamp
+        os.utime(cache_path)
+        logger.info(f"Transcription cache hit: {cache_path}")
+        return cached["segments"]
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError) as e:
+        logger.warning(f"Ignoring corrupt transcription cache entry {cache_path}: {e}")
+        return None
+
+def store_cached_transcription(cache_path: Path, language: Optional[str], segments: list, backend: Optional[str] = None):
+    """Write transcription segments to the cache and evict old entries beyond the size limit."""
+    temp_path = TRANSCRIPTION_CACHE_DIR / f"temp_{uuid.uuid4()}.json"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"language": language, "model": get_transcription_model_id(language, backend), "segments": segments}, f, ensure_ascii=False)
+        os.replace(temp_path, cache_path)
+        request_storage_sweep()
+    except Exception as e:
+        logger.warning(f"Could not cache transcription {cache_path}: {e}")
+        if temp_path.exists():
+            temp_path.unlink()
+
+def get_cached_transcription_segments(file_id: str, input_path: Path, language: Optional[str] = None, backend: Optional[str] = None) -> Optional[list]:
+    """Return the cached segments of a transcription, or None when Whisper has to run."""
+    pcm_path = ensure_audio_pcm(file_id, input_path)
+    cache_path = get_transcription_cache_path(get_audio_fingerprint(input_path, pcm_path), language, get_transcription_model_id(language, backend))
+    return load_cached_transcription(cache_path)
+
+def get_transcription_segments(file_id: str, input_path: Path, language: Optional[str] = None, parallel: Optional[bool] = None, backend: Optional[str] = None) -> list:
+    """Transcribe a video, reusing cached segments for audio that was already transcribed."""
+    with use_media(file_id):
+        pcm_path = ensure_audio_pcm(file_id, input_path)
+        cache_path = get_transcription_cache_path(get_audio_fingerprint(input_path, pcm_path), language, get_transcription_model_id(language, backend))
+
+        segments = load_cached_transcription(cache_path)
+        if segments is not None:
+            return segments
+
+        if parallel is None:
+            parallel = TRANSCRIBE_PARALLEL
+
+        start_time = time.time()
+        if parallel and pcm_path:
+            result = transcribe_audio_parallel(pcm_path, language, backend)
+        else:
+            # Prefer the PCM sidecar so Whisper does not decode the whole container again; only its path
+            # goes to a worker process, which reads the samples itself
+            audio = transcription.PcmAudio(str(pcm_path)) if pcm_path else str(input_path)
+            result = transcribe_audio(audio, language, backend=backend)
+        elapsed = time.time() - start_time
+        # int16 samples, so the sidecar size gives the audio length without reading it
+        audio_seconds = pcm_path.stat().st_size / 2 / AUDIO_SAMPLE_RATE if pcm_path else None
+        real_time_factor = f"{elapsed / audio_seconds:.3f}" if audio_seconds else "unknown"
+        logger.info(
+            f"Transcribed {input_path} in {elapsed:.2f}s with {transcription.get_backend_name(backend)} "
+            f"(parallel: {bool(parallel and pcm_path)}, real-time factor: {real_time_factor})"
+        )
+        segments = [
+            {
+                "start": segment["start"],
+                "end": segment["end"],
+                "text": segment["text"]
+            }
+            for segment in result["segments"]
+        ]
+
+        store_cached_transcription(cache_path, language, segments, backend)
+        return segments
+    # The client may have left while this waited for a place in the transcription pool
+    cancellation.check()
+
+def get_render_name(file_id: str) -> str:
+    """Name the files of one render; the random part keeps renders started in the same second apart."""
+    return f"{file_id}_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+
+def get_temp_output_path(output_path: Path) -> Path:
+    # ffmpeg only ever writes fresh files: outputs share their inode with render cache entries
+    return output_path.with_name(f"temp_{output_path.name}")
+
+def iter_transcription_segments(file_id: str, input_path: Path, language: Optional[str] = None, backend: Optional[str] = None):
+    """Yield transcription segments chunk by chunk as soon as Whisper produces them."""
+    with use_media(file_id):
+        pcm_path = ensure_audio_pcm(file_id, input_path)
+        cache_path = get_transcription_cache_path(get_audio_fingerprint(input_path, pcm_path), language, get_transcription_model_id(language, backend))
+
+        cached_segments = load_cached_transcription(cache_path)
+        if cached_segments is not None:
+            yield from cached_segments
+            return
+
+        if pcm_path is None:
+            # Without a sidecar there is nothing to chunk; fall back to a single pass
+            yield from get_transcription_segments(file_id, input_path, language, parallel=False, backend=backend)
+            return
+
+        samples = np.memmap(pcm_path, dtype=np.int16, mode="r")
+        boundaries = [0, *find_silence_split_points(samples, STREAM_TRANSCRIBE_CHUNK_SECONDS), len(samples)]
+
+        segments = []
+        for start_sample, end_sample in zip(boundaries, boundaries[1:]):
+            cancellation.check()
+            # The previous chunk's text keeps wording and spelling consistent across chunk boundaries
+            previous_text = "".join(segment["text"] for segment in segments[-3:]) or None
+            result = transcribe_audio(transcription.PcmAudio(str(pcm_path), start_sample, end_sample), language, previous_text, backend)
+            offset = start_sample / AUDIO_SAMPLE_RATE
+            for segment in result["segments"]:
+                segment = {
+                    "start": segment["start"] + offset,
+                    "end": segment["end"] + offset,
+                    "text": segment["text"]
+                }
+                segments.append(segment)
+                yield segment
+
+        store_cached_transcription(cache_path, language, segments, backend)
+
+def write_transcript_files(name: str, srt_text: str, start: float = 0, end: Optional[float] = None) -> dict:
+    """Save subtitles as transcript_{name}.srt and a plain-text transcript_{name}.txt, retimed to a start-end trim."""
+    if start or end is not None:
+        srt_text = cues_to_srt(shift_cues(parse_srt(srt_text), start, end))
+
+    # Save SRT file with timestamp
+    srt_path = TRANSCRIPTS_DIR / f"transcript_{name}.srt"
+    with open(srt_path, 'w', encoding='utf-8') as f:
+        f.write(srt_text)
+
+    # Save TXT file with timestamp
+    txt_path = TRANSCRIPTS_DIR / f"transcript_{name}.txt"
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        # Extract only the text lines from SRT format
+        f.write(cues_to_text(parse_srt(srt_text)))
+
+    return {"srt": str(srt_path), "txt": str(txt_path)}
+
+def get_cut_start(input_path: Path, metadata: dict, request: ProcessVideoRequest) -> float:
+    """Work out where a render of request starts its output without running it, for renders served from the cache."""
+    if request.trim_start <= 0 or (request.burn_subtitles and request.subtitles):
+        return request.trim_start
+    video_filter, _, _ = build_render_filters(metadata, request.target_ratio, request.position, request.volume, start=request.trim_start, end=request.trim_end)
+    return resolve_cut_start(str(input_path), metadata, video_filter, request.trim_start, request.snap_to_keyframes)[1]
+
+def render_video(file_id: str, input_path: Path, request: ProcessVideoRequest, progress_callback=None, threads: Optional[int] = None) -> dict:
+    """Render a processed video and its transcript files, returning the output paths."""
+    render_name = get_render_name(file_id)
+    output_path = OUTPUT_DIR / f"processed_{render_name}.mp4"
+    media = get_media_or_404(file_id)
+    previous_output = media["output_path"]
+
+    render_input, render_metadata = input_path, media
+    start, end, profile = request.trim_start, request.trim_end, request.profile
+    if request.preview:
+        output_path = OUTPUT_DIR / f"preview_{render_name}.mp4"
+        previous_output = media["preview_path"]
+        # The preview window is relative to the trimmed video
+        start = request.trim_start + request.preview_start
+        end = start + request.preview_duration if end is None else min(start + request.preview_duration, end)
+        profile = "fast-preview"
+        # Previews of a fresh upload use the source rather than wait for the whole proxy transcode
+        proxy_path = get_proxy_path(file_id)
+        if proxy_path.exists():
+            render_input, render_metadata = proxy_path, None
+        cancellation.check()
+
+    # Clean up the previous processed file for this video
+    if previous_output:
+        old_file = Path(previous_output)
+        try:
+            old_file.unlink(missing_ok=True)
+            logger.info(f"Cleaned up old processed file: {old_file}")
+        except Exception as e:
+            logger.warning(f"Could not clean up old file {old_file}: {e}")
+
+    cache_key = get_render_cache_key(get_file_hash(input_path), request)
+    temp_output_path = get_temp_output_path(output_path)
+    duration = None
+    cut_start = start
+
+    try:
+        # Identical renders wait for the first one and then hit the cache
+        with get_keyed_lock(f"render:{cache_key}"):
+            cached_path = get_cached_render(cache_key)
+            if cached_path:
+                logger.info(f"Render cache hit for {file_id}: {cached_path}")
+                link_or_copy(cached_path, output_path)
+                if request.subtitles and not request.preview:
+                    cut_start = get_cut_start(render_input, render_metadata, request)
+                if progress_callback:
+                    progress_callback(parse_ffmpeg_progress({"progress": "end"}))
+            else:
+                # Process video
+                duration, cut_start = crop_video(
+                    str(render_input),
+                    str(temp_output_path),
+                    request.target_ratio,
+                    request.position,
+                    request.volume,
+                    request.language,
+                    request.burn_subtitles,
+                    request.subtitles,
+                    progress_callback,
+                    request.segmented,
+                    profile,
+                    render_metadata,
+                    start,
+                    end,
+                    request.snap_to_keyframes,
+                    threads
+                )
+                store_cached_render(temp_output_path, cache_key)
+                # A render superseded as it finished still fills the cache, but never publishes its output
+                cancellation.check()
+                os.replace(temp_output_path, output_path)
+        cancellation.check()
+    except Exception:
+        for path in (temp_output_path, output_path):
+            if path.exists():
+                path.unlink()
+        raise
+
+    if request.preview:
+        update_media(file_id, preview_path=output_path)
+        return {
+            "output_file": str(output_path),
+            "transcript_files": {},
+            "duration": duration,
+            "cached": cached_path is not None
+        }
+
+    # Generate transcripts
+    transcript_files = {}
+
+    # Save custom subtitles if provided
+    if request.subtitles:
+        # Clean up old transcript files
+        for kind, old_path in media["transcript_files"].items():
+            old_file = Path(old_path)
+            try:
+                old_file.unlink(missing_ok=True)
+                logger.info(f"Cleaned up old {kind.upper()} file: {old_file}")
+            except Exception as e:
+                logger.warning(f"Could not clean up old {kind.upper()} file {old_file}: {e}")
+
+        # Shifted by where the output really starts, so they stay in sync after a keyframe snap
+        transcript_files = write_transcript_files(render_name, request.subtitles.text, cut_start, request.trim_end)
+
+    # Transcripts of an earlier render stay current until new subtitles replace them
+    update_media(file_id, output_path=output_path, transcript_files=transcript_files if request.subtitles else media["transcript_files"])
+
+    result = {
+        "output_file": str(output_path),
+        "transcript_files": transcript_files,
+        "duration": duration,
+        "cached": cached_path is not None
+    }
+
+    if media["hls_path"]:
+        shutil.rmtree(media["hls_path"], ignore_errors=True)
+        update_media(file_id, hls_path=None)
+    if request.hls:
+        hls_dir = package_hls(output_path)
+        update_media(file_id, hls_path=hls_dir)
+        result["hls_playlist"] = f"{hls_dir.name}/playlist.m3u8"
+
+    return result
+
+def render_video_batch(file_id: str, input_path: Path, request: BatchProcessRequest, progress_callback=None, threads: Optional[int] = None) -> dict:
+    """Render several outputs of one video, decoding the source once per distinct trim, and return the output paths of each."""
+    render_name = get_render_name(file_id)
+    media = get_media_or_404(file_id)
+
+    # Clean up the files of the previous batch for this video
+    for old_path in media["batch_output_paths"]:
+        old_file = Path(old_path)
+        try:
+            old_file.unlink(missing_ok=True)
+            logger.info(f"Cleaned up old batch file: {old_file}")
+        except Exception as e:
+            logger.warning(f"Could not clean up old batch file {old_file}: {e}")
+
+    input_hash = get_file_hash(input_path)
+    output_paths = [OUTPUT_DIR / f"processed_{render_name}_{index}.mp4" for index in range(len(request.outputs))]
+    cache_keys = [get_render_cache_key(input_hash, output) for output in request.outputs]
+    cached = [False] * len(request.outputs)
+    # cache key -> index of the output that encodes it, so duplicate specs are encoded once
+    encoded_by_key = {}
+    temp_ass_paths = []
+    # Where each output really starts, which a stream-copied cut moves to a keyframe
+    cut_starts = [output.trim_start for output in request.outputs]
+    duration = None
+
+    try:
+        for index, cache_key in enumerate(cache_keys):
+            cached_path = get_cached_render(cache_key)
+            if cached_path:
+                logger.info(f"Render cache hit for {file_id} output {index}: {cached_path}")
+                link_or_copy(cached_path, output_paths[index])
+                cached[index] = True
+                if request.outputs[index].subtitles:
+                    cut_starts[index] = get_cut_start(input_path, media, request.outputs[index])
+            elif cache_key not in encoded_by_key:
+                encoded_by_key[cache_key] = index
+
+        # Outputs with the same cut share one input seek and decode
+        decodes = {}
+        for index in encoded_by_key.values():
+            output = request.outputs[index]
+            video_filter, volume_factor, temp_ass_path = build_render_filters(
+                media,
+                output.target_ratio,
+                output.position,
+                output.volume,
+                output.burn_subtitles,
+                output.subtitles,
+                output.trim_start,
+                output.trim_end
+            )
+            temp_ass_paths.append(temp_ass_path)
+            video_filter, cut_starts[index] = resolve_cut_start(str(input_path), media, video_filter, output.trim_start, output.snap_to_keyframes)
+            profile = ENCODER_PROFILES[get_encoder_profile_name(output.profile)]
+            decodes.setdefault((cut_starts[index], output.trim_end), []).append(
+                (str(get_temp_output_path(output_paths[index])), video_filter, volume_factor, profile)
+            )
+
+        for (start, end), outputs in decodes.items():
+            decode_duration = media["duration"]
+            if decode_duration and (start or end is not None):
+                decode_duration = max(0, min(end if end is not None else decode_duration, decode_duration) - start)
+            duration = (duration or 0) + (decode_duration or 0)
+            logger.info(f"Rendering {len(outputs)} outputs of {file_id} from one decode")
+            cmd = build_batch_ffmpeg_command(str(input_path), outputs, start, end, threads)
+            check_ffmpeg_result(run_ffmpeg(cmd, decode_duration, progress_callback, "batch"))
+
+        for cache_key, index in encoded_by_key.items():
+            store_cached_render(get_temp_output_path(output_paths[index]), cache_key)
+            os.replace(get_temp_output_path(output_paths[index]), output_paths[index])
+        if not encoded_by_key and progress_callback:
+            progress_callback(parse_ffmpeg_progress({"progress": "end"}))
+
+        for index, cache_key in enumerate(cache_keys):
+            if not cached[index] and encoded_by_key[cache_key] != index:
+                link_or_copy(output_paths[encoded_by_key[cache_key]], output_paths[index])
+                cut_starts[index] = cut_starts[encoded_by_key[cache_key]]
+        cancellation.check()
+    except Exception:
+        for output_path in output_paths:
+            for path in (get_temp_output_path(output_path), output_path):
+                if path.exists():
+                    path.unlink()
+        raise
+    finally:
+        # Clean up temporary files
+        for temp_ass_path in temp_ass_paths:
+            if temp_ass_path and temp_ass_path.exists():
+                temp_ass_path.unlink()
+
+    results = []
+    for index, output in enumerate(request.outputs):
+        # Shifted by where the output really starts, as in render_video
+        transcript_files = write_transcript_files(f"{render_name}_{index}", output.subtitles.text, cut_starts[index], output.trim_end) if output.subtitles else {}
+        results.append({
+            "output_file": str(output_paths[index]),
+            "transcript_files": transcript_files,
+            "cached": cached[index]
+        })
+
+    update_media(file_id, batch_output_paths=[
+        path for result in results for path in [result["output_file"], *result["transcript_files"].values()]
+    ])
+
+    return {
+        "outputs": results,
+        "duration": duration,
+        "cached": all(cached)
+    }
+
+def package_hls(output_path: Path) -> Path:
+    """Repackage a rendered MP4 as an HLS playlist with fMP4 segments, without re-encoding."""
+    hls_dir = OUTPUT_DIR / f"{output_path.stem}_hls"
+    temp_dir = Path(tempfile.mkdtemp(prefix="temp_", dir=OUTPUT_DIR))
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-v", "error",
+        "-i", str(output_path),
+        "-c", "copy",
+        "-f", "hls",
+        "-hls_time", str(HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_segment_type", "fmp4",
+        "-hls_fmp4_init_filename", "init.mp4",
+        "-hls_segment_filename", str(temp_dir / "segment_%04d.m4s"),
+        str(temp_dir / "playlist.m3u8")
+    ]
+
+    try:
+        with metrics.timed("hls"):
+            result = cancellation.run_process(cmd)
+    except cancellation.Cancelled:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    if result.returncode != 0:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        check_ffmpeg_result(result)
+
+    shutil.rmtree(hls_dir, ignore_errors=True)
+    os.replace(temp_dir, hls_dir)
+    logger.info(f"Packaged {output_path} as HLS in {hls_dir}")
+    return hls_dir
+
+# Admission control
+
+# Each kind of heavy work has its own pool, so a burst of one never starves the others
+render_capacity = admission.CapacityPool("render", RENDER_WORKERS, RENDER_QUEUE_SIZE, RENDER_THREADS)
+preview_capacity = admission.CapacityPool("preview", PREVIEW_WORKERS, PREVIEW_QUEUE_SIZE, PREVIEW_THREADS)
+transcribe_capacity = admission.CapacityPool("transcribe", transcription.TRANSCRIBE_CONCURRENCY, TRANSCRIBE_QUEUE_SIZE, TRANSCRIBE_THREADS)
+sidecar_capacity = admission.CapacityPool("sidecar", SIDECAR_WORKERS, SIDECAR_QUEUE_SIZE, SIDECAR_THREADS)
+transcription.set_thread_budget(transcribe_capacity.threads_per_task)
+
+def admit(pool: admission.CapacityPool) -> admission.Admission:
+    """Reserve a place in a capacity pool, or fail with 429 and a Retry-After estimate when it is full."""
+    try:
+        return pool.admit()
+    except admission.PoolFullError as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "message": f"Server is busy, try again in {e.retry_after}s",
+                "error": str(e),
+                "retry_after": e.retry_after,
+                "can_retry": True
+            },
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+# Ingest transcodes get their own workers beside the renders, so an upload burst cannot take render slots
+sidecar_executor = ThreadPoolExecutor(max_workers=SIDECAR_WORKERS, thread_name_prefix="sidecar")
+
+def queue_upload_sidecars(file_id: str, input_path: Path):
+    """Build the sidecars of a new upload in the sidecar pool, or leave them to be built on first use when it is full."""
+    try:
+        ticket = sidecar_capacity.admit()
+    except admission.PoolFullError as e:
+        logger.warning(f"{e}; sidecars of {file_id} will be built on first use")
+        return
+    sidecar_executor.submit(ticket.run, prepare_upload_sidecars, file_id, input_path, sidecar_capacity.threads_per_task)
+
+# Render jobs
+
+@dataclass
+class RenderJob:
+    job_id: str
+    file_id: str
+    # file_id plus the canonical request, used to collapse duplicate submissions
+    request_key: str
+    # "render", "preview" or "batch"; a new job supersedes the in-flight one of the same kind and file
+    kind: str = "render"
+    status: str = "queued"  # "queued", "running", "completed", "failed" or "cancelled"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[dict] = None
+    error_status_code: int = 500
+    # Latest parsed ffmpeg progress: out_time, speed, fps and percent
+    progress: dict = field(default_factory=dict)
+    # Seconds of media encoded per second of wall time, for capacity planning
+    speed_factor: Optional[float] = None
+    # Open event streams; the job is cancelled when the last one closes and nobody reconnects
+    watchers: int = 0
+    # The queued work and its admission, so a job cancelled before it starts gives its place back
+    future: Optional[Future] = None
+    ticket: Optional[admission.Admission] = None
+
+    def __post_init__(self):
+        self.cancel_token = cancellation.CancelToken(self.kind)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "file_id": self.file_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "speed_factor": self.speed_factor,
+            "error": self.error
+        }
+
+# Renders run in a bounded pool so concurrent editors queue up instead of
+# oversubscribing the CPU; ffmpeg runs as a subprocess, so threads are enough
+render_executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+# Previews get their own workers so they are never stuck behind full-length encodes
+preview_executor = ThreadPoolExecutor(max_workers=PREVIEW_WORKERS, thread_name_prefix="preview")
+render_jobs: dict = {}
+# request_key -> job_id of the queued or running job for that exact render
+active_render_jobs: dict = {}
+# file_id and kind -> job_id of the newest job, which supersedes older ones still in flight
+latest_render_jobs: dict = {}
+# Submissions run on worker threads; this keeps finding and registering a job atomic
+render_jobs_lock = threading.Lock()
+
+def run_render_job(job: RenderJob, input_path: Path, request, threads: Optional[int] = None):
+    """Execute a queued render job on a render worker thread."""
+    job.status = "running"
+    job.started_at = time.time()
+    logger.info(f"Render job {job.job_id} started after {job.started_at - job.created_at:.2f}s in queue")
+    metrics.RENDER_QUEUE_SECONDS.observe(job.started_at - job.created_at, queue="preview" if getattr(request, "preview", False) else "render")
+
+    def update_progress(progress: dict):
+        job.progress = progress
+
+    try:
+        job.cancel_token.check()
+        render = render_video_batch if isinstance(request, BatchProcessRequest) else render_video
+        job.result = job.cancel_token.run(render, job.file_id, input_path, request, update_progress, threads)
+        job.status = "completed"
+
+        render_seconds = time.time() - job.started_at
+        if not job.result["cached"] and job.result.get("duration") and render_seconds > 0:
+            job.speed_factor = round(job.result["duration"] / render_seconds, 3)
+    except cancellation.Cancelled as e:
+        set_job_cancelled(job, e.reason)
+    except HTTPException as e:
+        job.error = e.detail
+        job.error_status_code = e.status_code
+        job.status = "failed"
+    except Exception as e:
+        logger.error(f"Render job {job.job_id} failed: {str(e)}")
+        job.error = {
+            "message": "Failed to process video",
+            "error": str(e)
+        }
+        job.status = "failed"
+    finally:
+        finish_render_job(job)
+        logger.info(f"Render job {job.job_id} {job.status} in {job.finished_at - job.started_at:.2f}s (speed factor: {job.speed_factor})")
+
+def finish_render_job(job: RenderJob):
+    job.finished_at = time.time()
+    if active_render_jobs.get(job.request_key) == job.job_id:
+        del active_render_jobs[job.request_key]
+    if latest_render_jobs.get(f"{job.file_id}:{job.kind}") == job.job_id:
+        del latest_render_jobs[f"{job.file_id}:{job.kind}"]
+    metrics.RENDER_JOBS.inc(status="cached" if job.result and job.result["cached"] else job.status)
+
+def set_job_cancelled(job: RenderJob, reason: str):
+    job.error = {
+        "message": "Render was cancelled",
+        "reason": reason
+    }
+    job.error_status_code = 409
+    job.status = "cancelled"
+
+def cancel_render_job(job: RenderJob, reason: str) -> bool:
+    """Cancel a queued or running render job, killing its ffmpeg processes; returns False if it already finished.
+
+    A running job deletes its partial outputs as it unwinds, then reports "cancelled".
+    """
+    if job.status not in ("queued", "running") or not job.cancel_token.cancel(reason):
+        return False
+    logger.info(f"Cancelling render job {job.job_id} for file {job.file_id} ({reason})")
+    # A job still waiting for a worker is taken off the queue and gives its place back
+    if job.future and job.future.cancel():
+        job.ticket.release()
+        set_job_cancelled(job, reason)
+        finish_render_job(job)
+    return True
+
+def supersede_render_jobs(job: RenderJob):
+    """Make job the newest of its kind for its file, cancelling the older one still in flight."""
+    key = f"{job.file_id}:{job.kind}"
+    previous_job = render_jobs.get(latest_render_jobs.get(key))
+    latest_render_jobs[key] = job.job_id
+    if previous_job and previous_job is not job:
+        cancel_render_job(previous_job, "superseded")
+
+def cancel_abandoned_render_job(job: RenderJob):
+    """Cancel a job whose last watcher disconnected, unless one came back in the grace period."""
+    if job.watchers == 0:
+        cancel_render_job(job, "abandoned")
+
+def submit_render_job(file_id: str, input_path: Path, request) -> RenderJob:
+    """Queue a render (a ProcessVideoRequest or BatchProcessRequest) on the worker pool and return its job record.
+
+    Cache hits are finished before returning, so call this from a worker thread rather than the event loop.
+    """
+    with render_jobs_lock:
+        job, cached = register_render_job(file_id, input_path, request)
+    if cached:
+        run_render_job(job, input_path, request)
+    return job
+
+def register_render_job(file_id: str, input_path: Path, request) -> tuple:
+    """Find or create the job for a render, queueing it unless every output is cached; returns (job, cached)."""
+    # Forget finished jobs nobody asked about for a while
+    now = time.time()
+    for job_id, old_job in list(render_jobs.items()):
+        if old_job.finished_at and now - old_job.finished_at > RENDER_JOB_TTL_SECONDS:
+            del render_jobs[job_id]
+
+    # Repeated clicks with the same settings share the job that is already in flight
+    if isinstance(request, BatchProcessRequest):
+        outputs = request.outputs
+        kind = "batch"
+        request_key = f"{file_id}:batch:[{','.join(get_canonical_request(output) for output in outputs)}]"
+    else:
+        outputs = [request]
+        kind = "preview" if request.preview else "render"
+        request_key = f"{file_id}:{get_canonical_request(request)}:hls={request.hls}"
+    active_job_id = active_render_jobs.get(request_key)
+    if active_job_id in render_jobs and not render_jobs[active_job_id].cancel_token.cancelled:
+        logger.info(f"Reusing in-flight render job {active_job_id} for file {file_id}")
+        return render_jobs[active_job_id], False
+
+    # Cache hits finish in milliseconds, so do not queue them behind running encodes
+    input_hash = get_file_hash(input_path, compute=False)
+    if input_hash and all(get_cached_render(get_render_cache_key(input_hash, output)) for output in outputs):
+        job = RenderJob(job_id=str(uuid.uuid4()), file_id=file_id, request_key=request_key, kind=kind)
+        render_jobs[job.job_id] = job
+        if request.supersede:
+            supersede_render_jobs(job)
+        return job, True
+
+    capacity = preview_capacity if kind == "preview" else render_capacity
+    # Fails with 429 before a job exists when both the workers and the queue are taken
+    ticket = admit(capacity)
+
+    job = RenderJob(job_id=str(uuid.uuid4()), file_id=file_id, request_key=request_key, kind=kind, ticket=ticket)
+    render_jobs[job.job_id] = job
+    active_render_jobs[request_key] = job.job_id
+    # Settings changed while the previous render was in flight: its output would be thrown away
+    if request.supersede:
+        supersede_render_jobs(job)
+    executor = preview_executor if kind == "preview" else render_executor
+    job.future = executor.submit(ticket.run, run_render_job, job, input_path, request, capacity.threads_per_task)
+    logger.info(f"Queued render job {job.job_id} for file {file_id}")
+    return job, False
+
+def get_render_job(job_id: str) -> RenderJob:
+    """Look up a render job or fail with 404."""
+    job = render_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "message": "Job not found",
+                "error": f"No render job found for ID: {job_id}"
+            }
+        )
+    return job
+
+def validate_process_request(request: ProcessVideoRequest):
+    """Reject render settings outside the supported values with a 400 error."""
+    if request.target_ratio not in ["9:16", "16:9"]:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid aspect ratio",
+                "accepted_values": ["9:16", "16:9"]
+            }
+        )
+
+    if not 0 <= request.position <= 100:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid position value",
+                "accepted_range": "0-100"
+            }
+        )
+
+    if not 0 <= request.volume <= 300:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid volume value",
+                "accepted_range": "0-300"
+            }
+        )
+
+    if request.language and request.language not in ["hebrew", "english"]:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid language",
+                "accepted_values": ["hebrew", "english"]
+            }
+        )
+
+    if request.preview and (request.preview_start < 0 or not 0 < request.preview_duration <= PREVIEW_MAX_SECONDS):
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid preview window",
+                "accepted_range": f"preview_start >= 0, preview_duration 0-{PREVIEW_MAX_SECONDS}"
+            }
+        )
+
+    if request.trim_start < 0 or (request.trim_end is not None and request.trim_end <= request.trim_start):
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid trim window",
+                "accepted_range": "trim_start >= 0, trim_end > trim_start"
+            }
+        )
+
+    # The preview window is relative to the trimmed video, so it has to start inside it
+    if request.preview and request.trim_end is not None and request.trim_start + request.preview_start >= request.trim_end:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid preview window",
+                "accepted_range": "0 <= preview_start < trim_end - trim_start"
+            }
+        )
+
+    if request.profile and request.profile not in ENCODER_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid encoder profile",
+                "accepted_values": list(ENCODER_PROFILES)
+            }
+        )
+
+    # Subtitles are parsed for the transcript files even when they are not burned in
+    if request.subtitles:
+        try:
+            if request.burn_subtitles:
+                validate_srt(request.subtitles.text)
+                parse_hex_color(request.subtitles.styles.color)
+                parse_hex_color(request.subtitles.styles.borderColor)
+            else:
+                # Without burning, subtitles without cues just give empty transcripts
+                parse_srt(request.subtitles.text)
+        except SubtitleError as e:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "message": "Invalid subtitles",
+                    "error": str(e)
+                }
+            )
+
+def validate_transcription_backend(backend: Optional[str]):
+    """Reject unknown transcription backends, and known ones whose packages are not installed, with a 400 error."""
+    if backend is not None and backend not in transcription.get_available_backends():
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid transcription backend",
+                "accepted_values": transcription.get_available_backends()
+            }
+        )
+
+# Storage lifecycle
+
+# Directories the storage manager accounts for; the cache is covered through its subdirectories
+MANAGED_DIRS = [UPLOAD_DIR, OUTPUT_DIR, TRANSCRIPTS_DIR, UPLOAD_SESSIONS_DIR, RENDER_CACHE_DIR, TRANSCRIPTION_CACHE_DIR]
+FILE_ID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+# Registry columns to clear once an artifact class of an entry is deleted
+ARTIFACT_COLUMNS = {
+    "preview": {"preview_path": None},
+    "renders": {"output_path": None, "transcript_files": {}, "batch_output_paths": [], "hls_path": None}
+}
+storage_sweep_requested = threading.Event()
+storage_manager = None
+last_storage_sweep = {}
+
+def get_media_artifacts(media: dict) -> dict:
+    """Group the files of a registry entry by artifact class: the upload with its sidecars, the preview and the renders."""
+    return {
+        "upload": [media["input_path"], *get_sidecar_paths(media["file_id"])],
+        "preview": [Path(media["preview_path"])] if media["preview_path"] else [],
+        "renders": [
+            Path(path)
+            for path in (media["output_path"], media["hls_path"], *media["transcript_files"].values(), *media["batch_output_paths"])
+            if path
+        ]
+    }
+
+def delete_paths(paths: list) -> list:
+    """Delete files and directory trees, returning the paths that existed and were removed."""
+    deleted = []
+    for path in paths:
+        try:
+            if path.is_dir():
+                shutil.rmtree(path)
+            elif path.exists():
+                path.unlink()
+            else:
+                continue
+            deleted.append(str(path))
+        except Exception as e:
+            logger.error(f"Error removing {path}: {str(e)}")
+    return deleted
+
+def remove_media_artifacts(media: dict, artifact: str, reason: str) -> list:
+    """Delete one artifact class of a registry entry; deleting the upload removes the entry and everything derived from it."""
+    artifacts = get_media_artifacts(media)
+    if artifact == "upload":
+        deleted = delete_paths([path for paths in artifacts.values() for path in paths])
+        delete_media(media["file_id"])
+    else:
+        deleted = delete_paths(artifacts[artifact])
+        update_media(media["file_id"], **ARTIFACT_COLUMNS[artifact])
+    metrics.STORAGE_REMOVALS.inc(artifact=artifact, reason=reason)
+    logger.info(f"Removed {artifact} of {media['file_id']} ({reason}): {len(deleted)} files")
+    return deleted
+
+def remove_cache_entry(path: Path, reason: str):
+    if delete_paths([path]):
+        metrics.STORAGE_REMOVALS.inc(artifact=f"{path.parent.name}_cache", reason=reason)
+        logger.info(f"Removed cache entry {path} ({reason})")
+
+def iter_file_stats(path: Path):
+    """Yield the stat of a file, or of every file in a directory tree."""
+    if path.is_dir():
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    yield os.lstat(os.path.join(root, name))
+                except FileNotFoundError:
+                    pass
+    else:
+        try:
+            yield path.lstat()
+        except FileNotFoundError:
+            pass
+
+def scan_storage() -> tuple:
+    """Map each top-level entry of the managed directories to the inodes under it.
+
+    Renders are hard-linked into the render cache, so space is counted per inode: it only comes back
+    once the last link to a file is deleted.
+    """
+    # (device, inode) -> [size, links within the managed directories]
+    inodes = {}
+    entries = {}
+    for directory in MANAGED_DIRS:
+        for entry in os.scandir(directory):
+            keys = []
+            for stat in iter_file_stats(Path(entry.path)):
+                key = (stat.st_dev, stat.st_ino)
+                inodes.setdefault(key, [stat.st_size, 0])[1] += 1
+                keys.append(key)
+            entries[Path(entry.path)] = keys
+    return entries, inodes
+
+def sweep_storage() -> dict:
+    """Delete artifacts past their TTL and orphaned files, then the least recently used artifacts beyond the quota."""
+    start_time = time.perf_counter()
+    now = time.time()
+    removed = {"ttl": 0, "orphan": 0, "quota": 0}
+    # Media with a queued or running render, a running transcription or a sidecar build are left alone until it finishes
+    busy = {job.file_id for job in list(render_jobs.values()) if job.status in ("queued", "running")}
+    with media_in_use_lock:
+        busy |= set(media_in_use)
+
+    def get_last_used(media: dict) -> float:
+        return media["last_accessed_at"] or media["created_at"] or now
+
+    for media in list_media():
+        if media["file_id"] in busy:
+            continue
+        idle_seconds = now - get_last_used(media)
+        artifacts = get_media_artifacts(media)
+        for artifact, ttl in (("upload", UPLOAD_TTL_SECONDS), ("renders", OUTPUT_TTL_SECONDS), ("preview", PREVIEW_TTL_SECONDS)):
+            if ttl and idle_seconds > ttl and artifacts[artifact]:
+                remove_media_artifacts(media, artifact, "ttl")
+                removed["ttl"] += 1
+                if artifact == "upload":
+                    break
+
+    for cache_dir, max_bytes in ((RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES), (TRANSCRIPTION_CACHE_DIR, TRANSCRIPTION_CACHE_MAX_BYTES)):
+        if CACHE_TTL_SECONDS:
+            for last_used, _, path in list_cache_entries(cache_dir):
+                if now - last_used > CACHE_TTL_SECONDS:
+                    remove_cache_entry(Path(path), "ttl")
+                    removed["ttl"] += 1
+        enforce_cache_limit(cache_dir, max_bytes)
+
+    if UPLOAD_SESSION_TTL_SECONDS:
+        for entry in os.scandir(UPLOAD_SESSIONS_DIR):
+            # Every received chunk adds a marker file, so the directory's mtime is the last activity
+            if entry.is_dir() and now - entry.stat().st_mtime > UPLOAD_SESSION_TTL_SECONDS and delete_paths([Path(entry.path)]):
+                metrics.STORAGE_REMOVALS.inc(artifact="upload_session", reason="ttl")
+                logger.info(f"Removed abandoned upload session {entry.name}")
+                removed["ttl"] += 1
+
+    media_entries = list_media()
+    referenced = {path for media in media_entries for paths in get_media_artifacts(media).values() for path in paths}
+    registered = {media["file_id"] for media in media_entries}
+    for directory in (UPLOAD_DIR, OUTPUT_DIR, TRANSCRIPTS_DIR):
+        for entry in os.scandir(directory):
+            path = Path(entry.path)
+            if path in referenced or now - entry.stat(follow_symlinks=False).st_mtime < ORPHAN_TTL_SECONDS:
+                continue
+            # Uploads from before the registry are registered, and aged from now, rather than deleted
+            match = FILE_ID_RE.match(entry.name)
+            if directory == UPLOAD_DIR and match and entry.name[match.end():].startswith("_") and match.group() not in registered:
+                try:
+                    if get_media(match.group()):
+                        continue
+                except HTTPException as e:
+                    # An unreadable legacy upload is kept for someone to look at, and the sweep goes on
+                    logger.warning(f"Could not register legacy upload {path}: {e.detail}")
+                    continue
+            if delete_paths([path]):
+                metrics.STORAGE_REMOVALS.inc(artifact=directory.name, reason="orphan")
+                logger.info(f"Removed orphaned {path}")
+                removed["orphan"] += 1
+
+    entries, inodes = scan_storage()
+    usage = sum(size for size, _ in inodes.values())
+    if STORAGE_QUOTA_BYTES and usage > STORAGE_QUOTA_BYTES:
+        # (last use, rank, paths, remove); at the same age previews go first and uploads last
+        candidates = []
+        for media in list_media():
+            last_used = get_last_used(media)
+            if media["file_id"] in busy or now - last_used < STORAGE_MIN_IDLE_SECONDS:
+                continue
+            artifacts = get_media_artifacts(media)
+            for rank, artifact in enumerate(("preview", "renders", "upload")):
+                if artifacts[artifact]:
+                    paths = [path for paths in artifacts.values() for path in paths] if artifact == "upload" else artifacts[artifact]
+                    candidates.append((last_used, rank, paths, functools.partial(remove_media_artifacts, media, artifact, "quota")))
+        for cache_dir in (RENDER_CACHE_DIR, TRANSCRIPTION_CACHE_DIR):
+            for last_used, _, path in list_cache_entries(cache_dir):
+                if now - last_used >= STORAGE_MIN_IDLE_SECONDS:
+                    candidates.append((last_used, 0, [Path(path)], functools.partial(remove_cache_entry, Path(path), "quota")))
+
+        for _, _, paths, remove in sorted(candidates, key=lambda candidate: candidate[:2]):
+            if usage <= STORAGE_QUOTA_BYTES:
+                break
+            remove()
+            removed["quota"] += 1
+            for path in paths:
+                for key in entries.pop(path, []):
+                    inodes[key][1] -= 1
+                    if inodes[key][1] == 0:
+                        usage -= inodes[key][0]
+        if usage > STORAGE_QUOTA_BYTES:
+            logger.warning(f"Storage uses {usage} bytes, over the {STORAGE_QUOTA_BYTES} byte quota, but everything left is in use")
+
+    last_storage_sweep.update({
+        "finished_at": time.time(),
+        "duration_seconds": round(time.perf_counter() - start_time, 3),
+        "usage_bytes": usage,
+        "removed": removed
+    })
+    logger.info(f"Storage sweep removed {removed}, {usage} bytes in use")
+    return last_storage_sweep
+
+def touch_media_file(filename: str):
+    """Count a download of an output or transcript as a use of the file_id in its name."""
+    match = FILE_ID_RE.search(filename)
+    if match:
+        touch_media(match.group())
+
+def request_storage_sweep():
+    """Ask the storage manager for a sweep soon, without waiting for it."""
+    storage_sweep_requested.set()
+
+def run_storage_manager():
+    while True:
+        storage_sweep_requested.clear()
+        try:
+            sweep_storage()
+        except Exception as e:
+            logger.error(f"Storage sweep failed: {str(e)}")
+        time.sleep(STORAGE_SWEEP_MIN_INTERVAL_SECONDS)
+        storage_sweep_requested.wait(max(0, STORAGE_SWEEP_INTERVAL_SECONDS - STORAGE_SWEEP_MIN_INTERVAL_SECONDS))
+
+def start_storage_manager():
+    global storage_manager
+    if storage_manager is None:
+        storage_manager = threading.Thread(target=run_storage_manager, name="storage-manager", daemon=True)
+        storage_manager.start()
+
+# Media delivery
+
+class MediaFileResponse(FileResponse):
+    """FileResponse that serves a single byte range and uses zero-copy sends when the server supports them."""
+
+    # Larger reads than FileResponse's 64 KiB default, for multi-hundred-MB videos
+    chunk_size = 1024 * 1024
+
+    def __init__(self, path: Path, stat_result: os.stat_result, **kwargs):
+        super().__init__(path, stat_result=stat_result, **kwargs)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["cache-control"] = "no-cache"
+        self.byte_range = None
+
+    def set_byte_range(self, start: int, end: int):
+        """Turn the response into a 206 for the inclusive byte range start-end."""
+        self.byte_range = (start, end)
+        self.status_code = 206
+        self.headers["content-range"] = f"bytes {start}-{end}/{self.stat_result.st_size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send):
+        start, end = self.byte_range or (0, self.stat_result.st_size - 1)
+        extensions = scope.get("extensions") or {}
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers
+        })
+
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopy" in extensions:
+            # The server sendfile()s straight from the page cache to the socket
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file,
+                    "offset": start,
+                    "count": end - start + 1,
+                    "more_body": False
+                })
+        elif self.byte_range is None and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(start)
+                remaining = end - start + 1
+                while True:
+                    chunk = await file.read(min(self.chunk_size, remaining)) if remaining > 0 else b""
+                    remaining -= len(chunk)
+                    more_body = bool(chunk) and remaining > 0
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                    if not more_body:
+                        break
+
+        if self.background is not None:
+            await self.background()
+
+def get_media_type(file_path: Path) -> str:
+    """Get the Content-Type to serve a file with."""
+    return MEDIA_TYPES.get(file_path.suffix.lower()) or mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+
+def parse_range_header(range_header: str, size: int) -> Optional[tuple]:
+    """Parse a single "bytes=" range into inclusive (start, end) offsets, or None to serve the whole file.
+
+    Raises ValueError if the range is valid but lies outside the file.
+    """
+    unit, _, spec = range_header.partition("=")
+    # Multiple ranges would need a multipart body; serving the whole file instead is allowed
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    # A syntactically invalid range is ignored, not rejected (RFC 7233, section 3.1)
+    match = re.fullmatch(r"\s*([0-9]*)\s*-\s*([0-9]*)\s*", spec)
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        return None
+
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # "bytes=-N" asks for the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        raise ValueError(f"Range {range_header} not satisfiable for {size} bytes")
+    return start, end
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Check a conditional GET against the file's validators."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def serve_media_file(request: Request, file_path: Path, download_name: Optional[str] = None) -> Response:
+    """Serve a file with conditional GET and Range support; raises 404 if it does not exist."""
+    try:
+        stat_result = file_path.stat()
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "message": "File not found",
+                "error": f"No file found with name: {file_path.name}"
+            }
+        )
+
+    response = MediaFileResponse(
+        file_path,
+        stat_result,
+        media_type=get_media_type(file_path),
+        filename=download_name,
+        content_disposition_type="attachment" if download_name else "inline"
+    )
+    etag = response.headers["etag"]
+    validators = {"etag": etag, "last-modified": response.headers["last-modified"]}
+
+    if is_not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=validators)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range: only honour the range if the client's copy is still the current file
+    if range_header and (if_range is None or if_range in validators.values()):
+        try:
+            byte_range = parse_range_header(range_header, stat_result.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={"content-range": f"bytes */{stat_result.st_size}"})
+        if byte_range:
+            response.set_byte_range(*byte_range)
+    return response
+
+# API Endpoints
+
+@app.on_event("startup")
+def preload_whisper_models():
+    """Load the WHISPER_PRELOAD models in the background, so the API starts serving right away"""
+    if transcription.WHISPER_PRELOAD:
+        # Transcriptions that arrive before the load finishes wait for it instead of loading again
+        threading.Thread(target=transcription.preload, name="whisper-preload", daemon=True).start()
+
+@app.on_event("startup")
+def start_storage_lifecycle():
+    """Start the background sweeps that apply the storage TTLs and quota"""
+    start_storage_manager()
+
+@app.on_event("shutdown")
+def stop_whisper_worker():
+    """Stop the Whisper worker process, if one is running"""
+    transcription.shutdown()
+
+@app.get("/api/status")
+async def get_status():
+    """Check API health status"""
+    return {
+        "status": "ok",
+        "version": "1.0.0",
+        "service": "Video Editor API"
+    }
+
+@app.post("/api/upload")
+async def upload_video(request: Request):
+    """Upload a video file for processing"""
+    file_id = str(uuid.uuid4())
+    original_filename = None
+    paths = {}
+
+    def get_upload_paths(client_filename: str) -> Path:
+        filename = Path(client_filename).name
+        paths["temp"] = UPLOAD_DIR / f"temp_{file_id}_{filename}"
+        paths["input"] = UPLOAD_DIR / f"{file_id}_{filename}"
+        return paths["temp"]
+
+    try:
+        logger.info(f"Received upload request, content_type: {request.headers.get('content-type')}")
+
+        try:
+            # Stream the upload straight to disk; it is only renamed into place once validated
+            original_filename, bytes_written, file_hash = await save_multipart_upload(request, "file", get_upload_paths)
+            temp_path, input_path = paths["temp"], paths["input"]
+            logger.info(f"Streamed {bytes_written} bytes of {original_filename} to: {temp_path}")
+
+            # ffprobe and the registry write run in a worker thread so other requests are served meanwhile
+            metadata = await run_in_threadpool(finalize_upload, file_id, temp_path, input_path, Path(original_filename).name, file_hash)
+            queue_upload_sidecars(file_id, input_path)
+
             return {
                 "success": True,
                 "data": {
                     "file_id": file_id,
-                    "original_filename": file.filename,
+                    "original_filename": original_filename,
                     "dimensions": {
-                        "width": width,
-                        "height": height
+                        "width": metadata["width"],
+                        "height": metadata["height"]
                     }
                 }
             }
-            
+
         except HTTPException:
             raise
         except Exception as e:
             logger.error(f"Error during file processing: {str(e)}")
-            if 'input_path' in locals() and input_path.exists():
+            input_path = paths.get("input")
+            if input_path and input_path.exists():
                 try:
                     input_path.unlink()
                     logger.info("Cleaned up failed upload file")
                 except Exception as cleanup_error:
                     logger.error(f"Error cleaning up file: {str(cleanup_error)}")
             raise
+        finally:
+            # Clean up the partial file if it was never moved into place
+            temp_path = paths.get("temp")
+            if temp_path and temp_path.exists():
+                temp_path.unlink()
             
     except HTTPException as he:
         raise he
@@ -561,141 +2854,257 @@ async def upload_video(file: UploadFile = File(...)):
                 "message": "Failed to process upload",
                 "error": error_msg,
                 "technical_details": {
-                    "file_name": file.filename if file else None,
-                    "content_type": file.content_type if file else None,
+                    "file_name": original_filename,
+                    "content_type": request.headers.get("content-type"),
                 }
             }
         )
 
-@app.post("/api/videos/{file_id}/process")
-async def process_video(
-    file_id: str,
-    request: ProcessVideoRequest
-):
-    """Process video with cropping and optional subtitles"""
+@app.post("/api/uploads")
+async def create_upload_session(request: CreateUploadSessionRequest):
+    """Start a resumable upload whose chunks can be sent in parallel and in any order"""
     try:
-        # Validate parameters
-        if request.target_ratio not in ["9:16", "16:9"]:
+        filename = Path(request.filename).name
+        if not filename:
             raise HTTPException(
                 status_code=400,
                 detail={
-                    "message": "Invalid aspect ratio",
-                    "accepted_values": ["9:16", "16:9"]
+                    "message": "Invalid filename",
+                    "error": "Filename must not be empty"
                 }
             )
-        
-        if not 0 <= request.position <= 100:
+
+        if request.total_size <= 0:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "message": "Invalid total size",
+                    "error": "total_size must be greater than 0"
+                }
+            )
+
+        if not UPLOAD_SESSION_MIN_CHUNK_SIZE <= request.chunk_size <= UPLOAD_SESSION_MAX_CHUNK_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "message": "Invalid chunk size",
+                    "accepted_range": f"{UPLOAD_SESSION_MIN_CHUNK_SIZE}-{UPLOAD_SESSION_MAX_CHUNK_SIZE}"
+                }
+            )
+
+        upload_id = str(uuid.uuid4())
+        total_chunks = -(-request.total_size // request.chunk_size)
+        session_dir = UPLOAD_SESSIONS_DIR / upload_id
+        session_dir.mkdir()
+
+        # Size the data file up front so every chunk can be written at its final offset
+        with open(session_dir / "data", "wb") as buffer:
+            buffer.truncate(request.total_size)
+
+        manifest = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "total_size": request.total_size,
+            "chunk_size": request.chunk_size,
+            "total_chunks": total_chunks,
+            "created_at": int(time.time())
+        }
+        with open(session_dir / "manifest.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+        logger.info(f"Created upload session {upload_id} for {filename}: {request.total_size} bytes in {total_chunks} chunks")
+
+        return {
+            "success": True,
+            "data": manifest
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Upload session error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": "Failed to create upload session",
+                "error": str(e)
+            }
+        )
+
+@app.get("/api/uploads/{upload_id}")
+async def get_upload_session_status(upload_id: str):
+    """Report which chunks of a resumable upload are still missing"""
+    session_dir, manifest = get_upload_session(upload_id)
+    missing_chunks = get_missing_chunks(session_dir, manifest)
+
+    return {
+        "success": True,
+        "data": {
+            **manifest,
+            "received_chunks": manifest["total_chunks"] - len(missing_chunks),
+            "missing_chunks": missing_chunks
+        }
+    }
+
+@app.put("/api/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(upload_id: str, index: int, request: Request):
+    """Upload one chunk of a resumable upload as the raw request body"""
+    try:
+        session_dir, manifest = get_upload_session(upload_id)
+
+        if not 0 <= index < manifest["total_chunks"]:
             raise HTTPException(
                 status_code=400,
                 detail={
-                    "message": "Invalid position value",
-                    "accepted_range": "0-100"
+                    "message": "Invalid chunk index",
+                    "accepted_range": f"0-{manifest['total_chunks'] - 1}"
                 }
             )
 
-        if not 0 <= request.volume <= 300:
+        offset = index * manifest["chunk_size"]
+        expected_size = min(manifest["chunk_size"], manifest["total_size"] - offset)
+        bytes_written = 0
+        start_time = time.perf_counter()
+
+        # Positioned writes let concurrent chunk requests share the data file without locking
+        fd = os.open(session_dir / "data", os.O_WRONLY)
+        try:
+            async for chunk in request.stream():
+                if bytes_written + len(chunk) > expected_size:
+                    raise HTTPException(
+                        status_code=400,
+                        detail={
+                            "message": "Chunk is larger than expected",
+                            "expected_size": expected_size
+                        }
+                    )
+                os.pwrite(fd, chunk, offset + bytes_written)
+                bytes_written += len(chunk)
+        finally:
+            os.close(fd)
+        metrics.record_upload(bytes_written, time.perf_counter() - start_time)
+
+        if bytes_written != expected_size:
             raise HTTPException(
                 status_code=400,
                 detail={
-                    "message": "Invalid volume value",
-                    "accepted_range": "0-300"
+                    "message": "Incomplete chunk",
+                    "expected_size": expected_size,
+                    "received_size": bytes_written
                 }
             )
-        
-        if request.language and request.language not in ["hebrew", "english"]:
+
+        (session_dir / f"chunk_{index}").touch()
+
+        return {
+            "success": True,
+            "data": {
+                "upload_id": upload_id,
+                "index": index,
+                "size": bytes_written
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Chunk upload error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": "Failed to upload chunk",
+                "error": str(e)
+            }
+        )
+
+@app.post("/api/uploads/{upload_id}/complete")
+async def complete_upload_session(upload_id: str):
+    """Validate a fully received upload and register it like a regular upload"""
+    try:
+        session_dir, manifest = get_upload_session(upload_id)
+
+        missing_chunks = get_missing_chunks(session_dir, manifest)
+        if missing_chunks:
             raise HTTPException(
-                status_code=400,
+                status_code=409,
                 detail={
-                    "message": "Invalid language",
-                    "accepted_values": ["hebrew", "english"]
+                    "message": "Upload is incomplete",
+                    "missing_chunks": missing_chunks
                 }
             )
-        
-        # Find input file
-        input_files = list(UPLOAD_DIR.glob(f"{file_id}_*"))
-        if not input_files:
-            raise HTTPException(
-                status_code=404,
-                detail={
-                    "message": "File not found",
-                    "error": f"No input file found for ID: {file_id}"
+
+        # Chunks were written in place, so the data file is already the complete video
+        input_path = UPLOAD_DIR / f"{upload_id}_{manifest['filename']}"
+        try:
+            metadata = await run_in_threadpool(finalize_upload, upload_id, session_dir / "data", input_path, manifest["filename"])
+        finally:
+            shutil.rmtree(session_dir, ignore_errors=True)
+
+        queue_upload_sidecars(upload_id, input_path)
+
+        return {
+            "success": True,
+            "data": {
+                "file_id": upload_id,
+                "original_filename": manifest["filename"],
+                "dimensions": {
+                    "width": metadata["width"],
+                    "height": metadata["height"]
                 }
-            )
-        
-        input_path = input_files[0]
-        
-        # Create unique output path with timestamp
-        timestamp = int(time.time())
-        output_path = OUTPUT_DIR / f"processed_{file_id}_{timestamp}.mp4"
-        
-        # Clean up any existing processed files for this video
-        for old_file in OUTPUT_DIR.glob(f"processed_{file_id}_*.mp4"):
-            try:
-                old_file.unlink()
-                logger.info(f"Cleaned up old processed file: {old_file}")
-            except Exception as e:
-                logger.warning(f"Could not clean up old file {old_file}: {e}")
-        
-        # Process video
-        crop_video(
-            str(input_path),
-            str(output_path),
-            request.target_ratio,
-            request.position,
-            request.volume,
-            request.language,
-            request.burn_subtitles,
-            request.subtitles
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Upload completion error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": "Failed to complete upload",
+                "error": str(e)
+            }
         )
+
+@app.delete("/api/uploads/{upload_id}")
+async def abort_upload_session(upload_id: str):
+    """Abort a resumable upload and discard the chunks received so far"""
+    session_dir, manifest = get_upload_session(upload_id)
+    shutil.rmtree(session_dir, ignore_errors=True)
+    logger.info(f"Aborted upload session {upload_id}")
+
+    return {
+        "success": True,
+        "data": {
+            "upload_id": upload_id
+        }
+    }
+
+@app.post("/api/videos/{file_id}/process", status_code=202)
+async def process_video(
+    file_id: str,
+    request: ProcessVideoRequest
+):
+    """Queue video processing with cropping and optional subtitles"""
+    try:
+        # Validate parameters
+        validate_process_request(request)
         
-        # Generate transcripts
-        transcript_files = {}
-        
-        # Save custom subtitles if provided
-        if request.subtitles:
-            # Save SRT file with timestamp
-            srt_path = TRANSCRIPTS_DIR / f"transcript_{file_id}_{timestamp}.srt"
-            with open(srt_path, 'w', encoding='utf-8') as f:
-                f.write(request.subtitles.text)
-            transcript_files["srt"] = str(srt_path)
-            
-            # Save TXT file with timestamp
-            txt_path = TRANSCRIPTS_DIR / f"transcript_{file_id}_{timestamp}.txt"
-            with open(txt_path, 'w', encoding='utf-8') as f:
-                # Extract only the text lines from SRT format
-                lines = request.subtitles.text.split('\n')
-                for i, line in enumerate(lines):
-                    if line and not line.isdigit() and not ' --> ' in line:
-                        f.write(line + '\n')
-            transcript_files["txt"] = str(txt_path)
-            
-            # Clean up old transcript files
-            for old_file in TRANSCRIPTS_DIR.glob(f"transcript_{file_id}_*.srt"):
-                try:
-                    old_file.unlink()
-                    logger.info(f"Cleaned up old SRT file: {old_file}")
-                except Exception as e:
-                    logger.warning(f"Could not clean up old SRT file {old_file}: {e}")
-            for old_file in TRANSCRIPTS_DIR.glob(f"transcript_{file_id}_*.txt"):
-                try:
-                    old_file.unlink()
-                    logger.info(f"Cleaned up old TXT file: {old_file}")
-                except Exception as e:
-                    logger.warning(f"Could not clean up old TXT file {old_file}: {e}")
-        
+        # Find input file
+        input_path = get_media_or_404(file_id)["input_path"]
+
+        # Hand the encode to the render pool so the event loop stays responsive; cache hits are
+        # finished during submission, including HLS packaging and transcript writes, so that runs off the loop too
+        job = await run_in_threadpool(submit_render_job, file_id, input_path, request)
+
         return {
             "success": True,
             "data": {
-                "output_file": str(output_path),
-                "transcript_files": transcript_files
+                "job_id": job.job_id,
+                "status": job.status
             }
         }
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Processing error: {str(e)}")
-        if 'output_path' in locals() and output_path.exists():
-            output_path.unlink()
         raise HTTPException(
             status_code=500,
             detail={
@@ -704,28 +3113,230 @@ async def process_video(
             }
         )
 
-@app.get("/api/files/{filename}")
-async def download_file(filename: str):
-    """Download processed video or transcript file"""
+@app.post("/api/videos/{file_id}/process/batch", status_code=202)
+async def process_video_batch(
+    file_id: str,
+    request: BatchProcessRequest
+):
+    """Queue several renders of one video that share a single decode"""
     try:
-        # Check both OUTPUT_DIR and TRANSCRIPTS_DIR
-        file_path = OUTPUT_DIR / filename
-        if not file_path.exists():
-            file_path = TRANSCRIPTS_DIR / filename
-            if not file_path.exists():
+        # Validate parameters
+        if not 1 <= len(request.outputs) <= BATCH_MAX_OUTPUTS:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "message": "Invalid number of outputs",
+                    "accepted_range": f"1-{BATCH_MAX_OUTPUTS}"
+                }
+            )
+
+        for output in request.outputs:
+            validate_process_request(output)
+            if output.preview or output.hls:
                 raise HTTPException(
-                    status_code=404,
+                    status_code=400,
                     detail={
-                        "message": "File not found",
-                        "error": f"No file found with name: {filename}"
+                        "message": "Preview and HLS renders cannot be batched"
                     }
                 )
-        
-        return FileResponse(
-            file_path,
-            filename=filename,
-            media_type='application/octet-stream'
+
+        # Find input file
+        input_path = get_media_or_404(file_id)["input_path"]
+
+        job = await run_in_threadpool(submit_render_job, file_id, input_path, request)
+
+        return {
+            "success": True,
+            "data": {
+                "job_id": job.job_id,
+                "status": job.status
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch processing error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": "Failed to process video",
+                "error": str(e)
+            }
+        )
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status of a render job"""
+    job = get_render_job(job_id)
+
+    return {
+        "success": True,
+        "data": job.to_dict()
+    }
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream render job status and progress as server-sent events"""
+    job = get_render_job(job_id)
+
+    async def event_stream():
+        job.watchers += 1
+        try:
+            last_payload = None
+            while True:
+                payload = json.dumps(job.to_dict())
+                if payload != last_payload:
+                    yield f"event: progress\ndata: {payload}\n\n"
+                    last_payload = payload
+                if job.status in ("completed", "failed", "cancelled"):
+                    break
+                await asyncio.sleep(JOB_EVENTS_INTERVAL_SECONDS)
+        finally:
+            # Runs when the client disconnects too, since that cancels the stream
+            job.watchers -= 1
+            if job.watchers == 0 and job.status in ("queued", "running") and RENDER_ABANDON_GRACE_SECONDS:
+                asyncio.get_running_loop().call_later(RENDER_ABANDON_GRACE_SECONDS, cancel_abandoned_render_job, job)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Get the output files of a completed render job"""
+    job = get_render_job(job_id)
+
+    if job.status in ("failed", "cancelled"):
+        raise HTTPException(status_code=job.error_status_code, detail=job.error)
+
+    if job.status != "completed":
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Job is not finished",
+                "status": job.status
+            }
+        )
+
+    return {
+        "success": True,
+        "data": job.result
+    }
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running render job, stopping its ffmpeg processes and deleting partial outputs"""
+    job = get_render_job(job_id)
+
+    if job.status in ("completed", "failed"):
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Job is already finished",
+                "status": job.status
+            }
+        )
+
+    cancel_render_job(job, "requested")
+
+    return {
+        "success": True,
+        "data": job.to_dict()
+    }
+
+@app.get("/api/videos/{file_id}/thumbnails")
+def get_thumbnails(file_id: str):
+    """Describe the thumbnail sprite sheet of a video, for scrubbing previews"""
+    media = get_media_or_404(file_id)
+    # Building a missing sprite takes a place in the sidecar pool, like ingest does
+    with admit(sidecar_capacity) if not get_sprite_path(file_id).exists() else nullcontext():
+        sprite_path = ensure_sprite(file_id, media, sidecar_capacity.threads_per_task)
+    if not sprite_path:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": "Failed to build thumbnails",
+                "error": f"Could not read video frames of {file_id}"
+            }
+        )
+
+    return {
+        "success": True,
+        "data": {
+            "sprite": f"/api/videos/{file_id}/thumbnails.jpg",
+            **get_sprite_layout(media)
+        }
+    }
+
+@app.api_route("/api/videos/{file_id}/thumbnails.jpg", methods=["GET", "HEAD"])
+def get_thumbnail_sprite(file_id: str, request: Request):
+    """Serve the thumbnail sprite sheet of a video"""
+    media = get_media_or_404(file_id)
+    with admit(sidecar_capacity) if not get_sprite_path(file_id).exists() else nullcontext():
+        sprite_path = ensure_sprite(file_id, media, sidecar_capacity.threads_per_task)
+    if not sprite_path:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": "Failed to build thumbnails",
+                "error": f"Could not read video frames of {file_id}"
+            }
+        )
+    return serve_media_file(request, sprite_path)
+
+@app.get("/api/videos/{file_id}/waveform")
+def get_waveform(file_id: str, buckets: int = WAVEFORM_DEFAULT_BUCKETS):
+    """Get min/max audio peaks of a video, merged down to at most a number of buckets"""
+    media = get_media_or_404(file_id)
+    if buckets < 1:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid number of buckets",
+                "accepted_range": "buckets >= 1"
+            }
+        )
+
+    with admit(sidecar_capacity) if not get_peaks_path(file_id).exists() else nullcontext():
+        peaks_path = ensure_waveform_peaks(file_id, media["input_path"])
+    if not peaks_path:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "message": "No audio track",
+                "error": f"Video {file_id} has no readable audio"
+            }
         )
+
+    peaks = np.fromfile(peaks_path, dtype=np.int16).reshape(-1, 2)
+    samples_per_peak = AUDIO_SAMPLE_RATE // WAVEFORM_PEAKS_PER_SECOND
+    if buckets < len(peaks):
+        # Merge neighbouring stored peaks; each bucket keeps the extremes of its group
+        starts = np.linspace(0, len(peaks), buckets, endpoint=False).astype(np.int64)
+        samples_per_peak = round(samples_per_peak * len(peaks) / buckets)
+        peaks = np.column_stack((np.minimum.reduceat(peaks[:, 0], starts), np.maximum.reduceat(peaks[:, 1], starts)))
+
+    return {
+        "success": True,
+        "data": {
+            "sample_rate": AUDIO_SAMPLE_RATE,
+            "samples_per_pixel": samples_per_peak,
+            "bits": 16,
+            "length": len(peaks),
+            "data": peaks.ravel().tolist()
+        }
+    }
+
+@app.api_route("/api/files/{filename}", methods=["GET", "HEAD"])
+async def download_file(filename: str, request: Request, inline: bool = False):
+    """Download processed video or transcript file, or stream it to a player with inline=true"""
+    try:
+        # Outputs and transcripts are told apart by name, so only one directory is looked at
+        file_path = (TRANSCRIPTS_DIR if filename.startswith("transcript_") else OUTPUT_DIR) / Path(filename).name
+        touch_media_file(filename)
+        return serve_media_file(request, file_path, None if inline else filename)
     except HTTPException:
         raise
     except Exception as e:
@@ -738,35 +3349,31 @@ async def download_file(filename: str):
             }
         )
 
+@app.api_route("/api/hls/{playlist_dir}/{filename}", methods=["GET", "HEAD"])
+async def get_hls_file(playlist_dir: str, filename: str, request: Request):
+    """Serve the playlist and segments of an HLS rendition"""
+    if not playlist_dir.endswith("_hls") or Path(playlist_dir).name != playlist_dir or playlist_dir.startswith("."):
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "message": "File not found",
+                "error": f"No HLS rendition found with name: {playlist_dir}"
+            }
+        )
+    touch_media_file(playlist_dir)
+    return serve_media_file(request, OUTPUT_DIR / playlist_dir / Path(filename).name)
+
 @app.delete("/api/files")
 async def delete_files(file_id: str):
     """Delete all files associated with the given file ID"""
     try:
         deleted_files = []
         
-        # Remove uploaded file
-        for file in UPLOAD_DIR.glob(f"{file_id}_*"):
-            try:
-                file.unlink()
-                deleted_files.append(str(file))
-            except Exception as e:
-                logger.error(f"Error removing uploaded file {file}: {str(e)}")
+        media = get_media(file_id)
+        if media:
+            deleted_files = remove_media_artifacts(media, "upload", "deleted")
 
-        # Remove processed file
-        for file in OUTPUT_DIR.glob(f"processed_{file_id}.mp4"):
-            try:
-                file.unlink()
-                deleted_files.append(str(file))
-            except Exception as e:
-                logger.error(f"Error removing processed file {file}: {str(e)}")
-
-        # Remove transcript files
-        for file in TRANSCRIPTS_DIR.glob(f"transcript_{file_id}.*"):
-            try:
-                file.unlink()
-                deleted_files.append(str(file))
-            except Exception as e:
-                logger.error(f"Error removing transcript file {file}: {str(e)}")
+        delete_media(file_id)
 
         return {
             "success": True,
@@ -784,22 +3391,18 @@ async def delete_files(file_id: str):
             }
         )
 
+async def cancel_on_disconnect(http_request: Request, token: cancellation.CancelToken):
+    """Cancel token once the client of http_request goes away."""
+    while not await http_request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+    token.cancel("disconnected")
+
 @app.post("/api/videos/{file_id}/transcribe")
-async def transcribe_video(file_id: str, request: TranscribeRequest):
+async def transcribe_video(file_id: str, request: TranscribeRequest, http_request: Request):
     """Transcribe video speech to text"""
     try:
         # Find input file
-        input_files = list(UPLOAD_DIR.glob(f"{file_id}_*"))
-        if not input_files:
-            raise HTTPException(
-                status_code=404,
-                detail={
-                    "message": "File not found",
-                    "error": f"No input file found for ID: {file_id}"
-                }
-            )
-        
-        input_path = input_files[0]
+        input_path = get_media_or_404(file_id)["input_path"]
         
         # Validate language
         if request.language not in ["hebrew", "english"]:
@@ -810,16 +3413,27 @@ async def transcribe_video(file_id: str, request: TranscribeRequest):
                     "accepted_values": ["hebrew", "english"]
                 }
             )
+
+        validate_transcription_backend(request.backend)
         
         # Transcribe audio
         try:
-            result = transcribe_audio(str(input_path), request.language)
+            # Cached results are served right away; a Whisper run takes a place in the transcription pool
+            segments = await anyio.to_thread.run_sync(get_cached_transcription_segments, file_id, input_path, request.language, request.backend)
+            if segments is None:
+                ticket = admit(transcribe_capacity)
+                # Chunks not yet transcribed are dropped if the client leaves; a single pass runs to the end
+                token = cancellation.CancelToken("transcription")
+                watcher = asyncio.create_task(cancel_on_disconnect(http_request, token))
+                try:
+                    segments = await anyio.to_thread.run_sync(
+                        token.run, ticket.run, get_transcription_segments, file_id, input_path, request.language, request.parallel, request.backend
+                    )
+                finally:
+                    watcher.cancel()
             
             # Convert segments to full text
-            full_text = "\n".join(
-                f"{i + 1}\n{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}\n{segment['text'].strip()}\n"
-                for i, segment in enumerate(result["segments"])
-            )
+            full_text = segments_to_srt(segments)
             
             return {
                 "success": True,
@@ -828,6 +3442,18 @@ async def transcribe_video(file_id: str, request: TranscribeRequest):
                 }
             }
             
+        except HTTPException:
+            raise
+        except cancellation.Cancelled as e:
+            logger.info(f"Transcription of {file_id} cancelled ({e.reason})")
+            # Nobody is left to read it; 499 is the usual status for a request the client closed
+            raise HTTPException(
+                status_code=499,
+                detail={
+                    "message": "Transcription was cancelled",
+                    "reason": e.reason
+                }
+            )
         except Exception as e:
             logger.error(f"Transcription error: {str(e)}")
             raise HTTPException(
@@ -850,38 +3476,168 @@ async def transcribe_video(file_id: str, request: TranscribeRequest):
             }
         )
 
+@app.post("/api/videos/{file_id}/transcribe/stream")
+async def transcribe_video_stream(file_id: str, request: TranscribeRequest):
+    """Transcribe video speech to text, streaming each subtitle segment as NDJSON as soon as it is decoded"""
+    # Find input file
+    input_path = get_media_or_404(file_id)["input_path"]
+
+    # Validate language
+    if request.language not in ["hebrew", "english"]:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Invalid language",
+                "accepted_values": ["hebrew", "english"]
+            }
+        )
+
+    validate_transcription_backend(request.backend)
+
+    # Admission is decided before the response starts, so a full pool is still a 429 rather than an error line
+    cached_segments = await anyio.to_thread.run_sync(get_cached_transcription_segments, file_id, input_path, request.language, request.backend)
+    ticket = admit(transcribe_capacity) if cached_segments is None else None
+
+    # A plain generator: Starlette iterates it in a worker thread, so Whisper never blocks the event loop
+    def segment_stream():
+        index = 0
+        try:
+            with ticket or nullcontext():
+                segments = cached_segments if cached_segments is not None else iter_transcription_segments(file_id, input_path, request.language, request.backend)
+                for segment in segments:
+                    index += 1
+                    yield json.dumps({
+                        "index": index,
+                        "start": segment["start"],
+                        "end": segment["end"],
+                        "start_timestamp": format_timestamp(segment["start"]),
+                        "end_timestamp": format_timestamp(segment["end"]),
+                        "text": segment["text"].strip()
+                    }, ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True, "count": index}) + "\n"
+        except Exception as e:
+            logger.error(f"Transcription error: {str(e)}")
+            yield json.dumps({
+                "error": {
+                    "message": "Failed to transcribe video",
+                    "error": str(e)
+                }
+            }) + "\n"
+
+    # Gives the place back even if the client leaves before the stream starts
+    background = BackgroundTask(ticket.release) if ticket else None
+    return StreamingResponse(segment_stream(), media_type="application/x-ndjson", background=background)
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Expose request, pipeline stage, ffmpeg and transcription metrics in the Prometheus text format"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/capacity")
+async def get_capacity():
+    """Report the running and queued work and the limits of each capacity pool"""
+    return {
+        "success": True,
+        "data": {
+            pool.name: pool.get_status()
+            for pool in (render_capacity, preview_capacity, transcribe_capacity, sidecar_capacity)
+        }
+    }
+
+@app.get("/api/storage")
+def get_storage():
+    """Report disk usage per directory against the quota, the TTLs and the outcome of the last storage sweep"""
+    entries, inodes = scan_storage()
+    directories = {str(directory): 0 for directory in MANAGED_DIRS}
+    for path, keys in entries.items():
+        directories[str(path.parent)] += sum(inodes[key][0] for key in keys)
+    return {
+        "success": True,
+        "data": {
+            # Hard-linked files are counted once in the total but in every directory holding a link
+            "usage_bytes": sum(size for size, _ in inodes.values()),
+            "quota_bytes": STORAGE_QUOTA_BYTES or None,
+            "directories": directories,
+            "ttl_seconds": {
+                "upload": UPLOAD_TTL_SECONDS,
+                "renders": OUTPUT_TTL_SECONDS,
+                "preview": PREVIEW_TTL_SECONDS,
+                "cache": CACHE_TTL_SECONDS,
+                "upload_session": UPLOAD_SESSION_TTL_SECONDS,
+                "orphan": ORPHAN_TTL_SECONDS
+            },
+            "last_sweep": last_storage_sweep or None
+        }
+    }
+
+@app.get("/api/transcription/models")
+def get_transcription_models():
+    """List the Whisper models each language uses, the models that are loaded and the speed of each backend"""
+    return {
+        "success": True,
+        "data": {
+            "models": {
+                language: transcription.get_model_name(None if language == "auto" else language)
+                for language in ["auto", "hebrew", "english"]
+            },
+            "default_backend": transcription.get_backend_name(),
+            "available_backends": transcription.get_available_backends(),
+            **transcription.get_model_status(),
+            "worker_process": transcription.use_worker_process()
+        }
+    }
+
+@app.post("/api/transcription/models/preload")
+def preload_transcription_models(request: PreloadModelsRequest):
+    """Load and warm up Whisper models ahead of the first transcription"""
+    try:
+        for language in request.languages:
+            if language not in ["auto", "hebrew", "english"]:
+                raise HTTPException(
+                    status_code=400,
+                    detail={
+                        "message": "Invalid language",
+                        "accepted_values": ["auto", "hebrew", "english"]
+                    }
+                )
+        validate_transcription_backend(request.backend)
+
+        start_time = time.time()
+        with metrics.timed("whisper_preload"):
+            model_names = transcription.preload(request.languages, request.warm_up, request.backend)
+
+        return {
+            "success": True,
+            "data": {
+                "models": model_names,
+                "seconds": round(time.time() - start_time, 2)
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Model preload error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "message": "Failed to load transcription models",
+                "error": str(e)
+            }
+        )
+
 @app.delete("/api/files/all")
 async def delete_all_files():
-    """Delete all files in outputs and uploads directories"""
+    """Delete all uploads, outputs, transcripts, upload sessions and cache entries"""
     try:
         deleted_files = []
-        
-        # Remove all files from uploads directory
-        for file in UPLOAD_DIR.glob("*"):
-            try:
-                file.unlink()
-                deleted_files.append(str(file))
-                logger.info(f"Deleted file: {file}")
-            except Exception as e:
-                logger.error(f"Error removing file {file}: {str(e)}")
 
-        # Remove all files from outputs directory
-        for file in OUTPUT_DIR.glob("*"):
-            try:
-                file.unlink()
-                deleted_files.append(str(file))
-                logger.info(f"Deleted file: {file}")
-            except Exception as e:
-                logger.error(f"Error removing file {file}: {str(e)}")
+        # Outputs hold HLS directories and the cache shares inodes with outputs, so every managed tree is cleared
+        for directory in MANAGED_DIRS:
+            for path in delete_paths(list(directory.glob("*"))):
+                deleted_files.append(path)
+                logger.info(f"Deleted file: {path}")
 
-        # Remove all files from transcripts directory
-        for file in TRANSCRIPTS_DIR.glob("*"):
-            try:
-                file.unlink()
-                deleted_files.append(str(file))
-                logger.info(f"Deleted file: {file}")
-            except Exception as e:
-                logger.error(f"Error removing file {file}: {str(e)}")
+        delete_media()
         
         return {
             "success": True,
@@ -0,0 +1,199 @@
+"""In-process counters and histograms in the Prometheus text format, plus per-request stage timings."""
+from contextlib import contextmanager
+from typing import Optional
+import bisect
+import contextvars
+import threading
+import time
+
+# Seconds, from a cached lookup up to a long encode or transcription
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+# Media seconds per wall second (speed factor) or the inverse (real-time factor)
+RATIO_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 4, 8, 16, 32)
+# Bytes per second
+THROUGHPUT_BUCKETS = (1e5, 1e6, 5e6, 1e7, 5e7, 1e8, 2.5e8, 5e8, 1e9)
+
+registry = []
+registry_lock = threading.Lock()
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(label_names: tuple, label_values: tuple, extra: Optional[dict] = None) -> str:
+    pairs = [
+        f'{name}="{escape_label_value(value)}"'
+        for name, value in [*zip(label_names, label_values), *(extra or {}).items()]
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """A monotonically increasing total, one per combination of label values."""
+
+    def __init__(self, name: str, description: str, label_names: tuple = ()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.values = {}
+        with registry_lock:
+            registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with registry_lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}")
+        return lines
+
+class Histogram:
+    """Observations counted into cumulative buckets, one set per combination of label values."""
+
+    def __init__(self, name: str, description: str, buckets: tuple = DURATION_BUCKETS, label_names: tuple = ()):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.label_names = label_names
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self.values = {}
+        with registry_lock:
+            registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with registry_lock:
+            series = self.values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else format_value(bound)
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names, key, {'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, key)} {count}")
+        return lines
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    with registry_lock:
+        lines = [line for metric in registry for line in metric.collect()]
+    return "\n".join(lines) + "\n"
+
+# Metrics of the API
+
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time to serve an API request", DURATION_BUCKETS, ("method", "route", "status"))
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Time spent in one stage of the pipeline", DURATION_BUCKETS, ("stage",))
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes received in uploads")
+UPLOAD_THROUGHPUT = Histogram("upload_throughput_bytes_per_second", "Upload bytes written to disk per second", THROUGHPUT_BUCKETS)
+FFMPEG_SECONDS = Histogram("ffmpeg_duration_seconds", "Wall time of ffmpeg runs", DURATION_BUCKETS, ("kind", "status"))
+FFMPEG_SPEED = Histogram("ffmpeg_speed_factor", "Media seconds encoded per wall second by ffmpeg", RATIO_BUCKETS, ("kind",))
+RENDER_QUEUE_SECONDS = Histogram("render_queue_wait_seconds", "Time render jobs wait for a worker", DURATION_BUCKETS, ("queue",))
+RENDER_JOBS = Counter("render_jobs_total", "Render jobs by outcome", ("status",))
+CANCELLATIONS = Counter("cancellations_total", "Renders and transcriptions cancelled before they finished", ("kind", "reason"))
+ADMISSION_WAIT_SECONDS = Histogram("admission_wait_seconds", "Time admitted tasks wait for a slot in their capacity pool", DURATION_BUCKETS, ("pool",))
+ADMISSION_REJECTIONS = Counter("admission_rejections_total", "Requests rejected because their capacity pool was full", ("pool",))
+STORAGE_REMOVALS = Counter("storage_removals_total", "Artifacts deleted by the storage lifecycle manager", ("artifact", "reason"))
+WHISPER_LOAD_SECONDS = Histogram("whisper_model_load_seconds", "Time to load (and warm up) a Whisper model", DURATION_BUCKETS, ("backend", "model"))
+TRANSCRIPTION_SECONDS = Histogram("transcription_duration_seconds", "Wall time of Whisper inference", DURATION_BUCKETS, ("backend", "model"))
+TRANSCRIPTION_RTF = Histogram("transcription_real_time_factor", "Whisper processing seconds per audio second", RATIO_BUCKETS, ("backend", "model"))
+TRANSCRIPTION_AUDIO_SECONDS = Counter("transcription_audio_seconds_total", "Seconds of audio transcribed", ("backend", "model"))
+
+def record_upload(byte_count: int, seconds: float):
+    UPLOAD_BYTES.inc(byte_count)
+    if seconds > 0:
+        UPLOAD_THROUGHPUT.observe(byte_count / seconds)
+    record_stage("upload", seconds)
+
+def record_ffmpeg_run(kind: str, returncode: int, seconds: float, media_seconds: Optional[float] = None):
+    FFMPEG_SECONDS.observe(seconds, kind=kind, status="ok" if returncode == 0 else "error")
+    if returncode == 0 and media_seconds and seconds > 0:
+        FFMPEG_SPEED.observe(media_seconds / seconds, kind=kind)
+    record_stage(f"ffmpeg_{kind}", seconds)
+
+def record_transcription(run: dict):
+    """Record the metrics a transcription backend reports with each result."""
+    labels = {"backend": run["backend"], "model": run["model"]}
+    if run.get("model_load_seconds") is not None:
+        WHISPER_LOAD_SECONDS.observe(run["model_load_seconds"], **labels)
+        record_stage("whisper_load", run["model_load_seconds"])
+    TRANSCRIPTION_SECONDS.observe(run["processing_seconds"], **labels)
+    record_stage("transcription", run["processing_seconds"])
+    if run.get("audio_seconds"):
+        TRANSCRIPTION_AUDIO_SECONDS.inc(run["audio_seconds"], **labels)
+        TRANSCRIPTION_RTF.observe(run["real_time_factor"], **labels)
+
+# Stage timings of the request being served, for its Server-Timing header
+request_stages = contextvars.ContextVar("request_stages", default=None)
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    stages = request_stages.get()
+    if stages is not None:
+        stages.append((stage, seconds))
+
+@contextmanager
+def timed(stage: str):
+    """Time a block as one pipeline stage."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start_time)
+
+def format_server_timing(stages: list, total: Optional[float] = None) -> str:
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in stages]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+class MetricsMiddleware:
+    """Time every HTTP request and report its stages in a Server-Timing header.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so file responses keep their zero-copy send extensions.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        stages = []
+        token = request_stages.set(stages)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timing = format_server_timing(stages, time.perf_counter() - start_time)
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_stages.reset(token)
+            # Route templates keep the label set small; unmatched paths share one label
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start_time,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status_code
+            )
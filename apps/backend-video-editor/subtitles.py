@@ -0,0 +1,174 @@
+"""Native SRT parsing and ASS generation for burned-in subtitles."""
+from functools import lru_cache
+from typing import NamedTuple, Optional
+import re
+
+# Same canvas ffmpeg uses when it converts SRT for libass, so font sizes and margins keep their scale
+ASS_PLAY_RES_X = 384
+ASS_PLAY_RES_Y = 288
+
+RTL_MARK = "‏"
+RTL_ISOLATE_START = "⁧"
+RTL_ISOLATE_END = "⁩"
+
+TIMING_LINE_RE = re.compile(
+    r"^(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})"
+)
+LEADING_PUNCTUATION_RE = re.compile(r"^([!?.,]+)(.+)")
+HEX_COLOR_RE = re.compile(r"^#?([0-9a-fA-F]{2})([0-9a-fA-F]{2})([0-9a-fA-F]{2})$")
+# SRT formatting tags libass understands as override codes; any other tag is dropped
+SRT_STYLE_TAG_RE = re.compile(r"<(/?)([ibu])>", re.IGNORECASE)
+SRT_OTHER_TAG_RE = re.compile(r"</?[a-zA-Z][^>]*>")
+
+class SubtitleError(ValueError):
+    """Raised when subtitle text or styles cannot be used for rendering."""
+
+class Cue(NamedTuple):
+    index: int
+    start: float
+    end: float
+    lines: tuple
+
+def parse_timing_line(line: str, line_number: int) -> tuple:
+    """Parse an SRT "start --> end" line into seconds."""
+    match = TIMING_LINE_RE.match(line)
+    if not match:
+        raise SubtitleError(f"Line {line_number}: malformed timestamp line {line!r}")
+    h1, m1, s1, ms1, h2, m2, s2, ms2 = match.groups()
+    start = int(h1) * 3600 + int(m1) * 60 + int(s1) + int(ms1.ljust(3, "0")) / 1000
+    end = int(h2) * 3600 + int(m2) * 60 + int(s2) + int(ms2.ljust(3, "0")) / 1000
+    if end < start:
+        raise SubtitleError(f"Line {line_number}: cue ends before it starts")
+    return start, end
+
+@lru_cache(maxsize=64)
+def parse_srt(text: str) -> tuple:
+    """Parse SRT text into cues in a single pass; stray text outside a cue is skipped like the editor does."""
+    cues = []
+    index, timing, lines = None, None, []
+
+    for line_number, raw_line in enumerate(text.splitlines(), 1):
+        line = raw_line.strip()
+        if not line:
+            if timing and lines:
+                cues.append(Cue(index, timing[0], timing[1], tuple(lines)))
+            index, timing, lines = None, None, []
+        elif timing is None and " --> " in line:
+            # A timing line without a number in front still starts a cue
+            timing = parse_timing_line(line, line_number)
+            index = index if index is not None else len(cues) + 1
+        elif timing is None and index is None and line.isdigit():
+            index = int(line)
+        elif timing is not None:
+            lines.append(line)
+
+    if timing and lines:
+        cues.append(Cue(index, timing[0], timing[1], tuple(lines)))
+    return tuple(cues)
+
+def validate_srt(text: str) -> tuple:
+    """Parse SRT text, raising SubtitleError if it is malformed or has no cues."""
+    cues = parse_srt(text)
+    if not cues:
+        raise SubtitleError("No subtitle cues found")
+    return cues
+
+def parse_hex_color(hex_color: str) -> tuple:
+    """Split a "#RRGGBB" color into its red, green and blue hex pairs."""
+    match = HEX_COLOR_RE.match(hex_color.strip())
+    if not match:
+        raise SubtitleError(f"Invalid color {hex_color!r}, expected #RRGGBB")
+    return match.groups()
+
+def to_ass_color(hex_color: str) -> str:
+    """Convert a "#RRGGBB" color to the ASS &HAABBGGRR form."""
+    r, g, b = parse_hex_color(hex_color)
+    return f"&H00{b}{g}{r}".upper()
+
+def format_srt_timestamp(seconds: float) -> str:
+    millis = round(seconds * 1000)
+    return f"{millis // 3600000:02d}:{millis // 60000 % 60:02d}:{millis // 1000 % 60:02d},{millis % 1000:03d}"
+
+def format_ass_timestamp(seconds: float) -> str:
+    centis = round(seconds * 100)
+    return f"{centis // 360000}:{centis // 6000 % 60:02d}:{centis // 100 % 60:02d}.{centis % 100:02d}"
+
+def process_rtl_line(line: str) -> str:
+    """Move leading punctuation of a right-to-left line to its end and isolate it as RTL text."""
+    match = LEADING_PUNCTUATION_RE.match(line)
+    if match:
+        line = match.group(2).strip() + match.group(1)
+    return f"{RTL_MARK}{RTL_ISOLATE_START}{line}{RTL_ISOLATE_END}"
+
+def to_ass_text(line: str) -> str:
+    """Escape a subtitle line for an ASS Dialogue event, keeping SRT italic, bold and underline tags."""
+    line = line.replace("{", "\\{").replace("}", "\\}")
+    line = SRT_STYLE_TAG_RE.sub(lambda m: "{\\" + m.group(2).lower() + ("0" if m.group(1) else "1") + "}", line)
+    return SRT_OTHER_TAG_RE.sub("", line)
+
+def shift_cues(cues: tuple, start: float = 0, end: Optional[float] = None) -> tuple:
+    """Keep the cues overlapping start-end, clipped to it and moved so start becomes zero."""
+    if not start and end is None:
+        return cues
+    return tuple(
+        cue._replace(start=max(cue.start, start) - start, end=(cue.end if end is None else min(cue.end, end)) - start)
+        for cue in cues
+        if cue.end > start and (end is None or cue.start < end)
+    )
+
+def cues_to_srt(cues: tuple) -> str:
+    """Render cues as SRT text."""
+    return "\n".join(
+        f"{i}\n{format_srt_timestamp(cue.start)} --> {format_srt_timestamp(cue.end)}\n" + "\n".join(cue.lines) + "\n"
+        for i, cue in enumerate(cues, 1)
+    )
+
+def cues_to_text(cues: tuple) -> str:
+    """Join the text of all cues, one subtitle line per line."""
+    return "".join(line + "\n" for cue in cues for line in cue.lines)
+
+def build_ass(cues: tuple, styles) -> str:
+    """Build a complete ASS script for cues with the editor's SubtitleStyles."""
+    rtl = styles.textDirection == "rtl"
+    style = ",".join(str(value) for value in (
+        "Default",
+        styles.fontType,
+        int(styles.fontSize),
+        to_ass_color(styles.color),
+        "&H000000FF",
+        to_ass_color(styles.borderColor),
+        "&H00000000",
+        0, 0, 0, 0,  # Bold, Italic, Underline, StrikeOut
+        100, 100, 0, 0,  # ScaleX, ScaleY, Spacing, Angle
+        1,  # BorderStyle: outline and shadow
+        int(styles.borderSize),
+        0,  # Shadow
+        int(styles.alignment),
+        0, 0,  # MarginL, MarginR
+        int(styles.marginV),
+        1  # Encoding
+    ))
+
+    events = []
+    for cue in cues:
+        lines = [process_rtl_line(line) if rtl else line for line in cue.lines]
+        text = "\\N".join(to_ass_text(line) for line in lines)
+        events.append(f"Dialogue: 0,{format_ass_timestamp(cue.start)},{format_ass_timestamp(cue.end)},Default,,0,0,0,,{text}")
+
+    return "\n".join([
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {ASS_PLAY_RES_X}",
+        f"PlayResY: {ASS_PLAY_RES_Y}",
+        "ScaledBorderAndShadow: yes",
+        "WrapStyle: 0",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: {style}",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        *events,
+        ""
+    ])
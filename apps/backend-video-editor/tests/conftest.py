@@ -0,0 +1,8 @@
+"""Import the backend from a scratch working directory, so the directories it creates do not land in the checkout."""
+from pathlib import Path
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(tempfile.mkdtemp(prefix="video-editor-tests-"))
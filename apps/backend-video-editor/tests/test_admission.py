@@ -0,0 +1,46 @@
+import pytest
+
+import admission
+from admission import CapacityPool, PoolFullError
+
+def test_pool_admits_running_and_queued_tasks_then_rejects():
+    pool = CapacityPool("test", concurrency=2, queue_size=1, threads=8)
+    tickets = [pool.admit() for _ in range(3)]
+    with pytest.raises(PoolFullError) as error:
+        pool.admit()
+    assert error.value.pool == "test"
+    assert error.value.retry_after == admission.DEFAULT_RETRY_AFTER_SECONDS
+
+    tickets[0].release()
+    tickets[0].release()
+    assert pool.get_status()["queued"] == 2
+    pool.admit()
+
+def test_running_tasks_are_counted():
+    pool = CapacityPool("test", concurrency=1, queue_size=1, threads=4)
+    with pool.admit():
+        status = pool.get_status()
+        assert (status["running"], status["queued"]) == (1, 0)
+    status = pool.get_status()
+    assert (status["running"], status["queued"]) == (0, 0)
+
+def test_run_gives_the_place_back_on_error():
+    pool = CapacityPool("test", concurrency=1, queue_size=0, threads=4)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        pool.admit().run(fail)
+    assert pool.admit().run(lambda value: value, 5) == 5
+
+def test_thread_budget_is_split_between_running_tasks():
+    assert CapacityPool("test", concurrency=3, queue_size=0, threads=8).threads_per_task == 2
+    assert CapacityPool("test", concurrency=4, queue_size=0, threads=2).threads_per_task == 1
+
+def test_retry_after_follows_recent_run_times():
+    pool = CapacityPool("test", concurrency=2, queue_size=0, threads=2)
+    pool.recent_run_seconds.extend([30, 50])
+    assert pool.get_retry_after() == 20
+    pool.recent_run_seconds.extend([10_000] * admission.RECENT_RUN_COUNT)
+    assert pool.get_retry_after() == admission.MAX_RETRY_AFTER_SECONDS
@@ -0,0 +1,33 @@
+import pytest
+
+from main import parse_range_header
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes = 10 - 20", (10, 20)),
+    ("BYTES=0-0", (0, 0)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+@pytest.mark.parametrize("header", [
+    "bytes=5-2",
+    "bytes=-",
+    "bytes=abc",
+    "bytes=1-x",
+    "bytes=--5",
+    "bytes=0-1,5-6",
+    "items=0-10",
+    "bytes=\u00b2-5",
+])
+def test_invalid_ranges_are_ignored(header):
+    assert parse_range_header(header, 1000) is None
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5000-6000", "bytes=-0"])
+def test_unsatisfiable_ranges_raise(header):
+    with pytest.raises(ValueError):
+        parse_range_header(header, 1000)
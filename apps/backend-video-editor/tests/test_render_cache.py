@@ -0,0 +1,41 @@
+import main
+from main import ProcessVideoRequest, get_canonical_request, get_render_cache_key
+
+def test_language_does_not_change_the_cache_key():
+    english = ProcessVideoRequest(target_ratio="9:16", language="english")
+    hebrew = ProcessVideoRequest(target_ratio="9:16", language="hebrew")
+    assert get_canonical_request(english) == get_canonical_request(hebrew)
+    assert get_render_cache_key("abc", english) == get_render_cache_key("abc", hebrew)
+
+def test_render_settings_change_the_cache_key():
+    base = ProcessVideoRequest(target_ratio="9:16")
+    assert get_canonical_request(base) != get_canonical_request(ProcessVideoRequest(target_ratio="16:9"))
+    assert get_canonical_request(base) != get_canonical_request(ProcessVideoRequest(target_ratio="9:16", position=20))
+    assert get_canonical_request(base) != get_canonical_request(ProcessVideoRequest(target_ratio="9:16", volume=50))
+
+def test_input_content_changes_the_cache_key():
+    request = ProcessVideoRequest(target_ratio="9:16")
+    assert get_render_cache_key("abc", request) != get_render_cache_key("abd", request)
+
+def test_canonical_request_ignores_field_order():
+    first = ProcessVideoRequest(target_ratio="9:16", position=20, volume=80)
+    second = ProcessVideoRequest(volume=80, position=20, target_ratio="9:16")
+    assert get_canonical_request(first) == get_canonical_request(second)
+
+def test_file_hash_memo_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "FILE_HASH_MEMO_SIZE", 2)
+    monkeypatch.setattr(main, "file_hashes", main.OrderedDict())
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"{index}.bin"
+        path.write_bytes(bytes([index]))
+        main.get_file_hash(path)
+        paths.append(path)
+    assert len(main.file_hashes) == 2
+    assert main.get_file_hash(paths[0], compute=False) is None
+    assert main.get_file_hash(paths[2], compute=False) is not None
+
+def test_keyed_lock_is_dropped_once_released():
+    with main.get_keyed_lock("key"):
+        assert "key" in main.keyed_locks
+    assert "key" not in main.keyed_locks
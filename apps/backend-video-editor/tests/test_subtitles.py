@@ -0,0 +1,59 @@
+import pytest
+
+from subtitles import Cue, SubtitleError, cues_to_srt, cues_to_text, parse_hex_color, parse_srt, shift_cues, validate_srt
+
+SRT = """1
+00:00:01,000 --> 00:00:02,500
+Hello
+world
+
+2
+00:00:03.25 --> 00:00:04,000
+Again
+"""
+
+def test_parse_srt():
+    assert parse_srt(SRT) == (
+        Cue(1, 1.0, 2.5, ("Hello", "world")),
+        Cue(2, 3.25, 4.0, ("Again",))
+    )
+
+def test_parse_srt_numbers_cues_without_an_index():
+    assert parse_srt("00:00:01,000 --> 00:00:02,000\nHi\n") == (Cue(1, 1.0, 2.0, ("Hi",)),)
+
+def test_parse_srt_skips_stray_text_and_empty_cues():
+    text = "stray\n\n1\n00:00:01,000 --> 00:00:02,000\n\n2\n00:00:03,000 --> 00:00:04,000\nKept\n"
+    assert parse_srt(text) == (Cue(2, 3.0, 4.0, ("Kept",)),)
+
+@pytest.mark.parametrize("text", [
+    "1\n00:00:01,000 --> nope\nHi\n",
+    "1\n00:00:05,000 --> 00:00:01,000\nHi\n",
+])
+def test_parse_srt_rejects_malformed_timings(text):
+    with pytest.raises(SubtitleError):
+        parse_srt(text)
+
+def test_validate_srt_requires_cues():
+    assert parse_srt("") == ()
+    with pytest.raises(SubtitleError):
+        validate_srt("")
+
+def test_cues_round_trip():
+    cues = parse_srt(SRT)
+    assert parse_srt(cues_to_srt(cues)) == cues
+    assert cues_to_text(cues) == "Hello\nworld\nAgain\n"
+
+def test_shift_cues_clips_to_the_trim():
+    cues = parse_srt(SRT)
+    assert shift_cues(cues) == cues
+    assert shift_cues(cues, 2, 3.5) == (
+        Cue(1, 0, 0.5, ("Hello", "world")),
+        Cue(2, 1.25, 1.5, ("Again",))
+    )
+    assert shift_cues(cues, 2.5) == (Cue(2, 0.75, 1.5, ("Again",)),)
+    assert shift_cues(cues, end=1) == ()
+
+def test_parse_hex_color():
+    assert parse_hex_color("#ff8000") == ("ff", "80", "00")
+    with pytest.raises(SubtitleError):
+        parse_hex_color("red")
@@ -0,0 +1,38 @@
+import pytest
+
+import main
+from main import find_cut_keyframe, resolve_cut_start
+
+KEYFRAMES = [0.0, 2.0, 4.1, 6.0]
+METADATA = {"fps": 25}
+
+@pytest.fixture(autouse=True)
+def keyframes(monkeypatch):
+    monkeypatch.setattr(main, "get_keyframe_times", lambda file_path, start=None, end=None: [
+        time for time in KEYFRAMES if (start is None or time >= start) and (end is None or time <= end)
+    ])
+
+@pytest.mark.parametrize("start, expected", [
+    (2.0, 2.0),
+    (2.01, 2.0),
+    (4.09, 4.1),
+    (3.0, None),
+    (5.5, None),
+])
+def test_cut_keyframe_without_snapping(start, expected):
+    assert find_cut_keyframe("input.mp4", METADATA, start) == expected
+
+@pytest.mark.parametrize("start, expected", [(3.0, 2.0), (5.5, 4.1), (6.0, 6.0)])
+def test_cut_keyframe_snaps_back(start, expected):
+    assert find_cut_keyframe("input.mp4", METADATA, start, snap_to_keyframes=True) == expected
+
+def test_cut_keyframe_outside_the_search_window():
+    start = KEYFRAMES[-1] + main.KEYFRAME_SEARCH_SECONDS + 1
+    assert find_cut_keyframe("input.mp4", METADATA, start, snap_to_keyframes=True) is None
+
+def test_resolve_cut_start():
+    # Filtered renders are re-encoded anyway, so they cut exactly where asked
+    assert resolve_cut_start("input.mp4", METADATA, "crop=1:1:0:0", 3.0, True) == ("crop=1:1:0:0", 3.0)
+    assert resolve_cut_start("input.mp4", METADATA, None, 0) == (None, 0)
+    assert resolve_cut_start("input.mp4", METADATA, None, 3.0, True) == (None, 2.0)
+    assert resolve_cut_start("input.mp4", METADATA, None, 3.0) == ("null", 3.0)
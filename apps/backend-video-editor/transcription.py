@@ -0,0 +1,386 @@
+"""Whisper model lifecycle and inference backends: per-language model choice, preloading, idle unload and optional worker processes."""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+import abc
+import gc
+import importlib.util
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Whisper model used for transcription, and per-language overrides such as "hebrew=large-v3,english=small.en"
+WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL", "medium")
+WHISPER_LANGUAGE_MODELS = dict(
+    item.strip().split("=", 1)
+    for item in os.getenv("WHISPER_LANGUAGE_MODELS", "").split(",")
+    if "=" in item
+)
+# Languages whose models are loaded and warmed up at startup ("auto" is the model for unset languages)
+WHISPER_PRELOAD = [language.strip() for language in os.getenv("WHISPER_PRELOAD", "").split(",") if language.strip()]
+# Unload models unused for this many seconds; 0 keeps them loaded for the life of the process
+WHISPER_IDLE_UNLOAD_SECONDS = float(os.getenv("WHISPER_IDLE_UNLOAD_SECONDS", "0"))
+# Host the models in long-lived worker processes, so API processes never import torch
+WHISPER_WORKER_PROCESS = os.getenv("WHISPER_WORKER_PROCESS", "false").lower() == "true"
+# Transcriptions running at the same time; with worker processes each one has a process and its own models
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", "1"))
+
+# Inference backend used when a request does not pick one; see TRANSCRIPTION_BACKENDS
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "whisper")
+
+WHISPER_LANGUAGE_CODES = {"hebrew": "he", "english": "en"}
+SAMPLE_RATE = 16000
+WARM_UP_SECONDS = 1
+
+# "backend/model" -> {"model", "loaded_at", "last_used", "in_use"}; guarded by models_lock
+loaded_models = {}
+models_lock = threading.Lock()
+load_locks = {}
+# backend -> {"runs", "audio_seconds", "processing_seconds"}; guarded by models_lock
+backend_totals = {}
+# The API process's view of the models in the worker processes, same layout without "model"; guarded by models_lock
+worker_models = {}
+idle_monitor = None
+worker_pool = None
+worker_pool_lock = threading.Lock()
+# CPU threads one transcription may use, set by the API from its capacity budget; 0 keeps the library default
+thread_budget = 0
+
+class PcmAudio(NamedTuple):
+    """A sample range of a 16 kHz mono int16 PCM file; it is read by the process that runs the model."""
+    path: str
+    start_sample: int = 0
+    end_sample: Optional[int] = None
+
+    def load(self) -> np.ndarray:
+        """Read the range as the float32 waveform Whisper expects, without decoding the video."""
+        samples = np.memmap(self.path, dtype=np.int16, mode="r")
+        return samples[self.start_sample:self.end_sample].astype(np.float32) / 32768.0
+
+def get_model_name(language: Optional[str] = None) -> str:
+    """Pick the Whisper model configured for an API language, falling back to WHISPER_MODEL."""
+    return WHISPER_LANGUAGE_MODELS.get(language or "auto", WHISPER_MODEL_NAME)
+
+# Backends
+
+class TranscriptionBackend(abc.ABC):
+    """Loads Whisper models and runs them; subclasses pick the inference engine."""
+    # Modules that must be importable for the backend to work
+    requires = ()
+
+    @abc.abstractmethod
+    def load(self, model_name: str):
+        """Load a Whisper model by name."""
+
+    @abc.abstractmethod
+    def transcribe(self, model, audio, language: Optional[str], initial_prompt: Optional[str]) -> dict:
+        """Transcribe into Whisper's result layout: {"text", "segments": [{"start", "end", "text"}]}."""
+
+    def set_threads(self, threads: int):
+        """Cap the CPU threads of the next inference run."""
+
+    def is_available(self) -> bool:
+        return all(importlib.util.find_spec(module) for module in self.requires)
+
+class WhisperBackend(TranscriptionBackend):
+    """Reference openai-whisper on PyTorch in full precision."""
+    requires = ("whisper",)
+
+    def load(self, model_name: str):
+        # Imported here so processes that never transcribe do not pay for torch
+        import whisper
+        return whisper.load_model(model_name)
+
+    def set_threads(self, threads: int):
+        import torch
+        torch.set_num_threads(threads)
+
+    def transcribe(self, model, audio, language: Optional[str], initial_prompt: Optional[str]) -> dict:
+        options = {"language": language} if language else {}
+        if initial_prompt:
+            options["initial_prompt"] = initial_prompt
+        return model.transcribe(audio, **options)
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """openai-whisper with its linear layers dynamically quantized to int8 for CPU inference."""
+
+    def load(self, model_name: str):
+        import torch
+        import whisper
+        model = whisper.load_model(model_name, device="cpu")
+        # whisper's Linear only adds a dtype cast to nn.Linear, which fp32 CPU inference does not need;
+        # quantize_dynamic only swaps modules whose type is exactly nn.Linear
+        for module in model.modules():
+            if isinstance(module, whisper.model.Linear):
+                module.__class__ = torch.nn.Linear
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def transcribe(self, model, audio, language: Optional[str], initial_prompt: Optional[str]) -> dict:
+        options = {"language": language, "fp16": False} if language else {"fp16": False}
+        if initial_prompt:
+            options["initial_prompt"] = initial_prompt
+        return model.transcribe(audio, **options)
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """CTranslate2 Whisper through the optional faster-whisper package, with int8 weights on CPU."""
+    requires = ("faster_whisper",)
+
+    def load(self, model_name: str):
+        from faster_whisper import WhisperModel
+        # CTranslate2 fixes its thread count when the model is created; 0 is its own default
+        return WhisperModel(model_name, device="cpu", compute_type="int8", cpu_threads=thread_budget)
+
+    def transcribe(self, model, audio, language: Optional[str], initial_prompt: Optional[str]) -> dict:
+        segments, _ = model.transcribe(audio, language=language, initial_prompt=initial_prompt)
+        # Segments are generated lazily while decoding; collecting them runs the transcription
+        segments = [{"start": segment.start, "end": segment.end, "text": segment.text} for segment in segments]
+        return {"text": "".join(segment["text"] for segment in segments), "segments": segments}
+
+TRANSCRIPTION_BACKENDS = {
+    "whisper": WhisperBackend(),
+    "whisper-int8": QuantizedWhisperBackend(),
+    "faster-whisper": FasterWhisperBackend()
+}
+
+def get_backend_name(backend: Optional[str] = None) -> str:
+    return backend or TRANSCRIPTION_BACKEND
+
+def get_available_backends() -> list:
+    return [name for name, backend in TRANSCRIPTION_BACKENDS.items() if backend.is_available()]
+
+def record_backend_run(backend: str, audio_seconds: Optional[float], processing_seconds: float):
+    with models_lock:
+        totals = backend_totals.setdefault(backend, {"runs": 0, "audio_seconds": 0.0, "processing_seconds": 0.0})
+        totals["runs"] += 1
+        if audio_seconds:
+            totals["audio_seconds"] += audio_seconds
+            totals["processing_seconds"] += processing_seconds
+
+# Model lifecycle
+
+def use_worker_process() -> bool:
+    # Processes started by this one (the worker itself, parallel transcription workers) run models in-process
+    return WHISPER_WORKER_PROCESS and multiprocessing.parent_process() is None
+
+def load_model(model_name: str, warm_up: bool = False, backend: Optional[str] = None):
+    """Return a loaded model, loading it on first use; loads of different models do not block each other."""
+    backend = get_backend_name(backend)
+    key = f"{backend}/{model_name}"
+    with models_lock:
+        entry = loaded_models.get(key)
+        if entry:
+            return entry["model"]
+        load_lock = load_locks.setdefault(key, threading.Lock())
+
+    with load_lock:
+        with models_lock:
+            if key in loaded_models:
+                return loaded_models[key]["model"]
+
+        engine = TRANSCRIPTION_BACKENDS[backend]
+        start_time = time.time()
+        model = engine.load(model_name)
+        logger.info(f"Loaded Whisper model {key} in {time.time() - start_time:.2f}s")
+        if warm_up:
+            # The first inference allocates buffers and picks kernels; do it before a user waits on it
+            start_time = time.time()
+            engine.transcribe(model, np.zeros(SAMPLE_RATE * WARM_UP_SECONDS, dtype=np.float32), "en", None)
+            logger.info(f"Warmed up Whisper model {key} in {time.time() - start_time:.2f}s")
+
+        with models_lock:
+            now = time.time()
+            loaded_models[key] = {"model": model, "loaded_at": now, "last_used": now, "in_use": 0}
+    start_idle_monitor()
+    return model
+
+def unload_idle_models(max_idle_seconds: float = WHISPER_IDLE_UNLOAD_SECONDS) -> list:
+    """Drop models that have not been used for max_idle_seconds and are not transcribing."""
+    with models_lock:
+        now = time.time()
+        idle = [
+            name for name, entry in loaded_models.items()
+            if entry["in_use"] == 0 and now - entry["last_used"] >= max_idle_seconds
+        ]
+        for name in idle:
+            del loaded_models[name]
+    if idle:
+        gc.collect()
+        logger.info(f"Unloaded idle Whisper models: {', '.join(idle)}")
+    return idle
+
+def run_idle_monitor():
+    while True:
+        time.sleep(max(1, min(60, WHISPER_IDLE_UNLOAD_SECONDS / 2)))
+        unload_idle_models()
+
+def start_idle_monitor():
+    global idle_monitor
+    if WHISPER_IDLE_UNLOAD_SECONDS <= 0:
+        return
+    with models_lock:
+        if idle_monitor is None:
+            idle_monitor = threading.Thread(target=run_idle_monitor, name="whisper-idle-monitor", daemon=True)
+            idle_monitor.start()
+
+def transcribe_in_process(audio, language: Optional[str] = None, initial_prompt: Optional[str] = None, backend: Optional[str] = None) -> dict:
+    """Transcribe with a model loaded in this process, adding real-time-factor metrics to the result."""
+    backend = get_backend_name(backend)
+    model_name = get_model_name(language)
+    if isinstance(audio, PcmAudio):
+        audio = audio.load()
+    with models_lock:
+        was_loaded = f"{backend}/{model_name}" in loaded_models
+    load_start = time.time()
+    model = load_model(model_name, backend=backend)
+    load_seconds = None if was_loaded else time.time() - load_start
+    with models_lock:
+        # The model may have been unloaded since load_model returned; in_use keeps this reference counted
+        entry = loaded_models.setdefault(f"{backend}/{model_name}", {"model": model, "loaded_at": time.time(), "last_used": 0, "in_use": 0})
+        entry["in_use"] += 1
+
+    if thread_budget:
+        TRANSCRIPTION_BACKENDS[backend].set_threads(thread_budget)
+    start_time = time.time()
+    try:
+        result = TRANSCRIPTION_BACKENDS[backend].transcribe(model, audio, WHISPER_LANGUAGE_CODES.get(language, language), initial_prompt)
+    finally:
+        with models_lock:
+            entry["in_use"] -= 1
+            entry["last_used"] = time.time()
+
+    processing_seconds = time.time() - start_time
+    # Media paths are decoded by the backend, so their length is only known from the decoded arrays
+    audio_seconds = len(audio) / SAMPLE_RATE if isinstance(audio, np.ndarray) else None
+    record_backend_run(backend, audio_seconds, processing_seconds)
+    result["metrics"] = {
+        "backend": backend,
+        "model": model_name,
+        "audio_seconds": audio_seconds,
+        "processing_seconds": round(processing_seconds, 3),
+        # Set when this call had to load the model first
+        "model_load_seconds": round(load_seconds, 3) if load_seconds is not None else None,
+        # Below 1 is faster than real time
+        "real_time_factor": round(processing_seconds / audio_seconds, 3) if audio_seconds else None
+    }
+    return result
+
+def preload_in_process(languages: list, warm_up: bool = True, backend: Optional[str] = None) -> list:
+    """Load (and warm up) the models of the given API languages in this process."""
+    model_names = list(dict.fromkeys(get_model_name(None if language == "auto" else language) for language in languages))
+    for model_name in model_names:
+        load_model(model_name, warm_up, backend)
+    return model_names
+
+def describe_models(models: dict) -> dict:
+    """Describe "backend/model" entries and the speed of each backend; the caller holds models_lock."""
+    now = time.time()
+    return {
+        "loaded": [
+            {
+                "backend": key.split("/", 1)[0],
+                "model": key.split("/", 1)[1],
+                "loaded_seconds_ago": round(now - entry["loaded_at"], 1),
+                "idle_seconds": round(now - entry["last_used"], 1),
+                "in_use": entry["in_use"]
+            }
+            for key, entry in models.items()
+        ],
+        "backends": {
+            name: {
+                "runs": totals["runs"],
+                "audio_seconds": round(totals["audio_seconds"], 3),
+                "processing_seconds": round(totals["processing_seconds"], 3),
+                "real_time_factor": round(totals["processing_seconds"] / totals["audio_seconds"], 3) if totals["audio_seconds"] else None
+            }
+            for name, totals in backend_totals.items()
+        }
+    }
+
+def get_model_status_in_process() -> dict:
+    with models_lock:
+        return describe_models(loaded_models)
+
+def set_thread_budget(threads: int):
+    """Cap the CPU threads of each transcription in this process; a worker process started later inherits it."""
+    global thread_budget
+    thread_budget = threads
+
+def get_worker_pool() -> ProcessPoolExecutor:
+    global worker_pool
+    with worker_pool_lock:
+        if worker_pool is None:
+            # spawn rather than fork: the API process runs threads, and the child must import torch cleanly
+            worker_pool = ProcessPoolExecutor(
+                max_workers=max(1, TRANSCRIBE_CONCURRENCY),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=set_thread_budget,
+                initargs=(thread_budget,)
+            )
+            logger.info(f"Started up to {max(1, TRANSCRIBE_CONCURRENCY)} Whisper worker processes")
+        return worker_pool
+
+@contextmanager
+def track_worker_model(key: str):
+    """Record in this process that a worker process is using a "backend/model", for get_model_status."""
+    with models_lock:
+        now = time.time()
+        entry = worker_models.setdefault(key, {"loaded_at": now, "last_used": now, "in_use": 0})
+        entry["in_use"] += 1
+    try:
+        yield
+    finally:
+        with models_lock:
+            entry["in_use"] -= 1
+            entry["last_used"] = time.time()
+
+def transcribe(audio, language: Optional[str] = None, initial_prompt: Optional[str] = None, backend: Optional[str] = None) -> dict:
+    """Transcribe a media path, PcmAudio range or 16 kHz mono float32 array, in a worker process if configured."""
+    if not use_worker_process():
+        return transcribe_in_process(audio, language, initial_prompt, backend)
+    backend = get_backend_name(backend)
+    with track_worker_model(f"{backend}/{get_model_name(language)}"):
+        result = get_worker_pool().submit(transcribe_in_process, audio, language, initial_prompt, backend).result()
+    record_backend_run(backend, result["metrics"]["audio_seconds"], result["metrics"]["processing_seconds"])
+    return result
+
+def preload(languages: Optional[list] = None, warm_up: bool = True, backend: Optional[str] = None) -> list:
+    """Load and warm up the models of the given languages (default WHISPER_PRELOAD), returning their names."""
+    languages = languages if languages is not None else WHISPER_PRELOAD
+    if not use_worker_process():
+        return preload_in_process(languages, warm_up, backend)
+    # One preload per worker process; the pool hands them to idle workers, so this is best effort
+    futures = [get_worker_pool().submit(preload_in_process, languages, warm_up, backend) for _ in range(max(1, TRANSCRIBE_CONCURRENCY))]
+    model_names = [future.result() for future in futures][0]
+    with models_lock:
+        now = time.time()
+        for model_name in model_names:
+            worker_models.setdefault(f"{get_backend_name(backend)}/{model_name}", {"loaded_at": now, "last_used": now, "in_use": 0})
+    return model_names
+
+def get_model_status() -> dict:
+    """Describe the models currently loaded and the speed of each backend, without waiting for a running transcription."""
+    if not use_worker_process():
+        return get_model_status_in_process()
+    with models_lock:
+        if WHISPER_IDLE_UNLOAD_SECONDS > 0:
+            # The workers unload idle models on the same schedule
+            now = time.time()
+            for key in [key for key, entry in worker_models.items() if entry["in_use"] == 0 and now - entry["last_used"] >= WHISPER_IDLE_UNLOAD_SECONDS]:
+                del worker_models[key]
+        return describe_models(worker_models)
+
+def shutdown():
+    """Stop the worker processes, if any were started."""
+    global worker_pool
+    with worker_pool_lock:
+        if worker_pool is not None:
+            worker_pool.shutdown(cancel_futures=True)
+            worker_pool = None
+        with models_lock:
+            worker_models.clear()
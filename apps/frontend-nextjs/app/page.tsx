@@ -40,6 +40,50 @@ interface SubtitleStyles {
   fontType: string;
 }
 
+// Follow a queued render job over server-sent events until it finishes,
+// reporting progress along the way, and return its result payload
+async function waitForRenderJob(
+  jobId: string,
+  onProgress: (percent: number) => void
+) {
+  await new Promise<void>((resolve, reject) => {
+    const events = new EventSource(
+      `http://localhost:8000/api/jobs/${jobId}/events`
+    );
+
+    events.addEventListener("progress", (event) => {
+      const job = JSON.parse((event as MessageEvent).data);
+
+      if (typeof job.progress?.percent === "number") {
+        onProgress(job.progress.percent);
+      }
+
+      if (
+        job.status === "completed" ||
+        job.status === "failed" ||
+        job.status === "cancelled"
+      ) {
+        events.close();
+        resolve();
+      }
+    });
+
+    events.onerror = () => {
+      events.close();
+      reject(new Error("Lost connection while processing video"));
+    };
+  });
+
+  const response = await fetch(`http://localhost:8000/api/jobs/${jobId}/result`);
+  const result = await response.json();
+
+  if (!response.ok) {
+    throw new Error(result.detail?.message || "Failed to process video");
+  }
+
+  return result;
+}
+
 export default function Home() {
   // Flow control
   const [currentSection, setCurrentSection] = useState<
@@ -209,7 +253,7 @@ export default function Home() {
         setError("");
 
         const response = await fetch(
-          `http://localhost:8000/api/videos/${videoMetadata.fileId}/transcribe`,
+          `http://localhost:8000/api/videos/${videoMetadata.fileId}/transcribe/stream`,
           {
             method: "POST",
             headers: {
@@ -221,33 +265,63 @@ export default function Home() {
           }
         );
 
-        const result = await response.json();
-
-        if (!response.ok) {
+        if (!response.ok || !response.body) {
+          const result = await response.json();
           throw new Error(
             result.detail?.message || "Failed to transcribe video"
           );
         }
 
-        if (result.success) {
-          setTranscriptionData({
-            text: result.data.text,
-            styles: {
-              textDirection: lang === "hebrew" ? "rtl" : "ltr",
-              fontSize: 16,
-              color: "#fcfc00",
-              borderSize: 1,
-              borderColor: "#000000",
-              verticalPosition: 90,
-              volume: 100,
-              marginV: 100,
-              alignment: "2",
-              fontType: INITIAL_SUBTITLE_FONTS,
-            },
-          });
+        // Segments arrive as NDJSON while Whisper is still running; open the
+        // editor on the first one and keep appending the rest
+        const styles: SubtitleStyles = {
+          textDirection: lang === "hebrew" ? "rtl" : "ltr",
+          fontSize: 16,
+          color: "#fcfc00",
+          borderSize: 1,
+          borderColor: "#000000",
+          verticalPosition: 90,
+          volume: 100,
+          marginV: 100,
+          alignment: "2",
+          fontType: INITIAL_SUBTITLE_FONTS,
+        };
+        const blocks: string[] = [];
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = "";
+
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+
+          buffered += decoder.decode(value, { stream: true });
+          const lines = buffered.split("\n");
+          buffered = lines.pop() || "";
+
+          for (const line of lines) {
+            if (!line.trim()) continue;
+            const message = JSON.parse(line);
+
+            if (message.error) {
+              throw new Error(
+                message.error.message || "Failed to transcribe video"
+              );
+            }
+
+            if (message.done) continue;
+
+            blocks.push(
+              `${message.index}\n${message.start_timestamp} --> ${message.end_timestamp}\n${message.text}\n`
+            );
+            setTranscriptionData({ text: blocks.join("\n"), styles });
+            setCurrentSection("edit");
+          }
+        }
+
+        if (blocks.length === 0) {
+          setTranscriptionData({ text: "", styles });
           setCurrentSection("edit");
-        } else {
-          throw new Error("Transcription failed");
         }
       } catch (err) {
         setError(
@@ -304,6 +378,10 @@ export default function Home() {
               styles: subtitleStyles,
             }
           : undefined,
+        ...(trimData[1] > trimData[0] && {
+          trim_start: trimData[0],
+          trim_end: trimData[1],
+        }),
       };
 
       const response = await fetch(
@@ -317,12 +395,14 @@ export default function Home() {
         }
       );
 
-      const result = await response.json();
+      const queued = await response.json();
 
       if (!response.ok) {
-        throw new Error(result.detail?.message || "Failed to process video");
+        throw new Error(queued.detail?.message || "Failed to process video");
       }
 
+      const result = await waitForRenderJob(queued.data.job_id, setProgress);
+
       if (result.success) {
         setProcessedFiles({
           videoUrl: `http://localhost:8000/api/files/${result.data.output_file
@@ -465,7 +545,10 @@ export default function Home() {
 
         {currentSection === "process" && (
           <div className="space-y-4 mx-auto bg-gray-800 rounded-lg shadow-xl p-6">
-            <ProgressBar progress={progress} text="Processing video..." />
+            <ProgressBar
+              progress={progress}
+              text={`Processing video... ${Math.round(progress)}%`}
+            />
           </div>
         )}
 